@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the blacklist lookup done by ``twilio_view``.
+
+``hit`` looks up a blacklisted caller and ``miss`` one that isn't. The
+``uncached`` variants query the database every time.
+
+The ``blacklist-rules`` group matches a number against prefix rule tries of
+growing size, which should all cost about the same.
+
+The ``blacklist-import`` group compares ``twilio_blacklist_import`` with
+saving the same callers one ``update_or_create`` at a time.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django_dynamic_fixture import G
+
+from django_twilio.blacklist import is_blacklisted
+from django_twilio.trie import PrefixTrie
+from django_twilio.models import Caller
+from django_twilio.utils import get_blacklisted_response
+
+from conftest import prepare
+
+
+pytestmark = pytest.mark.django_db
+
+BLACKLISTED = '+15005550001'
+ALLOWED = '+15005550000'
+
+
+@pytest.fixture(autouse=True)
+def callers():
+    G(Caller, phone_number=BLACKLISTED, blacklisted=True)
+    G(Caller, phone_number=ALLOWED, blacklisted=False)
+
+
+@pytest.fixture
+def uncached(settings):
+    settings.DJANGO_TWILIO_BLACKLIST_CACHE_SIZE = 0
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_hit(benchmark):
+    assert benchmark(is_blacklisted, BLACKLISTED)
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_miss(benchmark):
+    assert not benchmark(is_blacklisted, ALLOWED)
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_hit_uncached(benchmark, uncached):
+    assert benchmark(is_blacklisted, BLACKLISTED)
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_miss_uncached(benchmark, uncached):
+    assert not benchmark(is_blacklisted, ALLOWED)
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_response_hit(benchmark, voice_request):
+    assert benchmark(get_blacklisted_response, voice_request) is not None
+
+
+@pytest.mark.benchmark(group='blacklist')
+def test_response_miss(benchmark, factory):
+    request = prepare(
+        factory.post_form('/test_app/decorators/str_view/', {'From': ALLOWED}))
+    assert benchmark(get_blacklisted_response, request) is None
+
+
+@pytest.mark.benchmark(group='blacklist-rules')
+@pytest.mark.parametrize('size', [1, 1000, 100000])
+def test_rules_match(benchmark, size):
+    # Seven digit prefixes, like blocks of US numbers.
+    trie = PrefixTrie(
+        (i, '+1{:06d}'.format(i * 7 % 1000000)) for i in range(size))
+    trie.add(size, '+1555123')
+    assert benchmark(trie.match, '+15551230000') == '+1555123'
+
+
+@pytest.mark.benchmark(group='blacklist-rules')
+def test_rules_miss(benchmark):
+    trie = PrefixTrie(
+        (i, '+1{:06d}'.format(i * 7 % 1000000)) for i in range(100000))
+    assert benchmark(trie.match, '+447700900123') is None
+
+
+IMPORT_SIZE = 2000
+
+
+@pytest.fixture
+def dnc_list(tmp_path):
+    path = tmp_path / 'dnc.csv'
+    path.write_text('phone_number\n' + ''.join(
+        '+1415{:07d}\n'.format(i) for i in range(IMPORT_SIZE)))
+    return str(path)
+
+
+@pytest.mark.benchmark(group='blacklist-import')
+def test_import(benchmark, dnc_list):
+    benchmark.pedantic(
+        call_command, ('twilio_blacklist_import', dnc_list),
+        {'stdout': StringIO()}, rounds=5)
+    assert Caller.objects.count() == IMPORT_SIZE + 2
+
+
+@pytest.mark.benchmark(group='blacklist-import')
+def test_import_one_by_one(benchmark):
+    def import_callers():
+        for i in range(IMPORT_SIZE):
+            Caller.objects.update_or_create(
+                phone_number='+1415{:07d}'.format(i),
+                defaults={'blacklisted': True})
+
+    benchmark.pedantic(import_callers, rounds=1)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of sending a batch of messages.
+
+The client is a stand-in that sleeps as long as a request to Twilio might
+take. ``serial`` calls ``messages.create`` in a loop, which is what
+``send_bulk_messages`` replaces; ``threads`` and ``asyncio`` go through
+``send_bulk_messages`` and ``asend_bulk_messages`` with the default
+concurrency, and no rate limit.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from django_twilio.bulk import asend_bulk_messages, send_bulk_messages
+
+
+COUNT = 100
+LATENCY = 0.002
+
+
+class Messages(object):
+
+    def create(self, **kwargs):
+        time.sleep(LATENCY)
+        return SimpleNamespace(sid='SM1')
+
+    async def create_async(self, **kwargs):
+        await asyncio.sleep(LATENCY)
+        return SimpleNamespace(sid='SM1')
+
+
+CLIENT = SimpleNamespace(messages=Messages())
+
+
+def messages():
+    for i in range(COUNT):
+        yield {'to': '+1500555{:04d}'.format(i), 'from_': '+15005550006',
+               'body': 'Hello from the benchmarks!'}
+
+
+@pytest.mark.benchmark(group='bulk')
+def test_serial(benchmark):
+    def send():
+        return [CLIENT.messages.create(**message) for message in messages()]
+
+    assert len(benchmark(send)) == COUNT
+
+
+@pytest.mark.benchmark(group='bulk')
+def test_threads(benchmark):
+    def send():
+        return list(send_bulk_messages(messages(), CLIENT, rate=10 ** 6))
+
+    assert len(benchmark(send)) == COUNT
+
+
+@pytest.mark.benchmark(group='bulk')
+def test_asyncio(benchmark):
+    async def collect():
+        return [
+            result async for result in asend_bulk_messages(
+                messages(), CLIENT, rate=10 ** 6)
+        ]
+
+    assert len(benchmark(lambda: asyncio.run(collect()))) == COUNT
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of looking up a user's Twilio credentials.
+
+``discover`` is ``discover_twilio_credentials``, which queries the database on
+every call. ``resolve`` is the cached ``resolve_twilio_credentials``, after
+its first call.
+"""
+
+import pytest
+from django.contrib.auth.models import User
+
+from django_twilio.credentials import resolve_twilio_credentials
+from django_twilio.models import Credential
+from django_twilio.utils import discover_twilio_credentials
+
+
+@pytest.fixture
+def user(db):
+    user = User.objects.create(username='benchmark')
+    Credential.objects.create(
+        name='Benchmark', user=user,
+        account_sid='ACXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+        auth_token='Y' * 32)
+    return user
+
+
+@pytest.mark.benchmark(group='credentials')
+def test_discover(benchmark, user):
+    assert benchmark(discover_twilio_credentials, user)[1] == 'Y' * 32
+
+
+@pytest.mark.benchmark(group='credentials')
+def test_resolve(benchmark, user):
+    resolve_twilio_credentials(user)
+    assert benchmark(resolve_twilio_credentials, user)[1] == 'Y' * 32
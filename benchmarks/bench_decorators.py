@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of a full ``twilio_view`` round trip: forgery check, blacklist
+lookup, the view itself and conversion of what it returns to a response.
+"""
+
+import pytest
+from django_dynamic_fixture import G
+
+from django_twilio.models import Caller
+from django_twilio.views import say
+from test_project.test_app.views import bytes_view, str_view, verb_view
+
+from conftest import VOICE_PAYLOAD
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.benchmark(group='twilio_view')
+@pytest.mark.parametrize('view', [str_view, bytes_view, verb_view],
+                         ids=['str', 'bytes', 'verb'])
+def test_round_trip(benchmark, voice_request, view):
+    assert benchmark(view, voice_request).status_code == 200
+
+
+@pytest.mark.benchmark(group='twilio_view')
+def test_round_trip_blacklisted(benchmark, voice_request):
+    G(Caller, phone_number=VOICE_PAYLOAD['From'], blacklisted=True)
+    response = benchmark(str_view, voice_request)
+    assert b'<Reject' in response.content
+
+
+@pytest.mark.benchmark(group='twilio_view')
+def test_round_trip_cached_view(benchmark, voice_request):
+    response = benchmark(say, voice_request, text='Hello, world!')
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='twilio_view')
+def test_round_trip_timed(benchmark, settings, voice_request):
+    settings.DJANGO_TWILIO_TIMING = True
+    settings.DJANGO_TWILIO_SERVER_TIMING = True
+    response = benchmark(str_view, voice_request)
+    assert response.has_header('Server-Timing')
+
+
+@pytest.mark.benchmark(group='twilio_view')
+def test_round_trip_metrics(benchmark, settings, voice_request):
+    settings.DJANGO_TWILIO_METRICS = True
+    assert benchmark(str_view, voice_request).status_code == 200
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the time it takes a worker to set Django up and import
+django_twilio, in a fresh interpreter.
+
+``extra_info`` records the cumulative time ``python -X importtime`` reports
+for the ``django_twilio`` modules, which is less noisy than the total.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from test_project.test_app.client import IMPORT_SCRIPT, import_times
+
+
+@pytest.mark.benchmark(group='import')
+def test_import(benchmark):
+    benchmark.extra_info.update(
+        (name, micros) for name, micros in import_times().items()
+        if name.startswith('django_twilio'))
+    benchmark.pedantic(
+        subprocess.run, args=([sys.executable, '-c', IMPORT_SCRIPT],),
+        kwargs={'check': True}, rounds=5)
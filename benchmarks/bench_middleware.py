@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of ``TwilioWebhookMiddleware``: checking a webhook, and passing
+over a request for some other path.
+"""
+
+import pytest
+from django.http import HttpResponse
+
+from django_twilio.middleware import TwilioWebhookMiddleware
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def middleware(settings):
+    settings.DJANGO_TWILIO_WEBHOOK_PREFIXES = [
+        '/twilio/', '/test_app/decorators/', '/sms/']
+    return TwilioWebhookMiddleware(lambda request: HttpResponse())
+
+
+@pytest.mark.benchmark(group='middleware')
+def test_webhook(benchmark, middleware, voice_request):
+    assert benchmark(middleware.process_request, voice_request) is None
+    assert voice_request.twilio.type == 'voice'
+
+
+@pytest.mark.benchmark(group='middleware')
+def test_other_path(benchmark, middleware, factory):
+    request = factory.get('/admin/')
+    assert benchmark(middleware.process_request, request) is None
+    assert not hasattr(request, 'twilio')
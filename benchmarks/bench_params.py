@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of getting the parameters of a fresh urlencoded webhook to the
+forgery check, the blacklist lookup and ``decompose``.
+
+``querydict`` is how that used to work: Django builds ``request.POST``, which
+the validator and the blacklist read, and ``decompose`` copies with
+``.dict()``. ``params`` parses the body once, with
+``django_twilio.request.get_params``, and shares the result.
+"""
+
+import pytest
+from django.conf import settings
+
+from django_twilio.request import TwilioRequest, decompose, get_params
+from django_twilio.validator import get_validator
+
+from conftest import MMS_PAYLOAD, VOICE_PAYLOAD
+
+
+def querydict(request, validator):
+    params = request.POST
+    assert validator.validate(
+        request.build_absolute_uri(), params,
+        request.headers['x-twilio-signature'])
+    params['From']
+    return TwilioRequest(params.dict())
+
+
+def params(request, validator):
+    assert validator.validate(
+        request.build_absolute_uri(), get_params(request),
+        request.headers['x-twilio-signature'])
+    get_params(request)['From']
+    return decompose(request)
+
+
+@pytest.mark.parametrize('handle', [querydict, params])
+@pytest.mark.parametrize('payload', [VOICE_PAYLOAD, MMS_PAYLOAD],
+                         ids=['voice', 'mms'])
+def test_parse(benchmark, factory, payload, handle):
+    benchmark.group = 'params-' + ('voice' if payload is VOICE_PAYLOAD else 'mms')
+    validator = get_validator(settings.TWILIO_AUTH_TOKEN)
+
+    def setup():
+        request = factory.post_form('/test_app/decorators/str_view/', payload)
+        return (request, validator), {}
+
+    result = benchmark.pedantic(handle, setup=setup, rounds=500)
+    assert result.from_ == payload['From']
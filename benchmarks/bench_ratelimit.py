@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the per-caller rate limit.
+
+``allowed`` counts a caller under the limit, in this process (``local``) and
+in a cache (``shared``, using the local memory backend, so the numbers leave
+out the network round trip to Redis or Memcached). ``blocked`` turns away a
+caller already over the limit, which the local tier answers without the cache.
+"""
+
+import pytest
+
+from django_twilio.ratelimit import RateLimiter
+
+from conftest import VOICE_PAYLOAD
+
+
+CALLER = VOICE_PAYLOAD['From']
+
+
+@pytest.mark.benchmark(group='ratelimit')
+@pytest.mark.parametrize('cache_alias', [None, 'default'],
+                         ids=['local', 'shared'])
+def test_allowed(benchmark, cache_alias):
+    limiter = RateLimiter(10 ** 9, 60, cache_alias=cache_alias)
+    assert benchmark(limiter.allow, CALLER)
+
+
+@pytest.mark.benchmark(group='ratelimit')
+def test_blocked(benchmark):
+    limiter = RateLimiter(1, 3600)
+    limiter.allow(CALLER)
+    assert not benchmark(limiter.allow, CALLER)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of ``django_twilio.request.decompose``.
+
+``decompose`` stores its result on the request, so the ``_again`` variants
+measure every call after the first, and ``legacy`` what each call used to
+cost. ``test_mms_allocations`` uses ``tracemalloc`` to count the memory
+allocated by decomposing an MMS payload three times (once by the blacklist
+check and twice by a view, say), and records it in the benchmark's
+``extra_info``.
+"""
+
+import tracemalloc
+
+import pytest
+
+from django_twilio.request import TwilioRequest, decompose
+
+from conftest import MEDIA_COUNT, MMS_PAYLOAD, VOICE_PAYLOAD, prepare
+
+
+def legacy_decompose(request):
+    return TwilioRequest(request.POST.dict())
+
+
+@pytest.fixture
+def mms_request(factory):
+    return prepare(factory.post_form('/test_app/decorators/str_view/', MMS_PAYLOAD))
+
+
+@pytest.mark.benchmark(group='decompose')
+def test_voice(benchmark, factory):
+    def setup():
+        request = prepare(factory.post_form('/', {'CallSid': 'CA1'}))
+        return (request,), {}
+
+    result = benchmark.pedantic(decompose, setup=setup, rounds=500)
+    assert result.type == 'voice'
+
+
+@pytest.mark.benchmark(group='decompose')
+def test_voice_again(benchmark, voice_request):
+    decompose(voice_request)
+    assert benchmark(decompose, voice_request).type == 'voice'
+
+
+@pytest.mark.benchmark(group='decompose')
+def test_message_again(benchmark, message_request):
+    decompose(message_request)
+    assert benchmark(decompose, message_request).type == 'message'
+
+
+@pytest.mark.benchmark(group='decompose-mms')
+def test_mms_again(benchmark, mms_request):
+    decompose(mms_request)
+    assert benchmark(decompose, mms_request).nummedia == str(MEDIA_COUNT)
+
+
+@pytest.mark.benchmark(group='decompose-mms')
+def test_mms_legacy(benchmark, mms_request):
+    assert benchmark(legacy_decompose, mms_request).nummedia == str(MEDIA_COUNT)
+
+
+def allocated(func, request, calls=3):
+    """Return the bytes still allocated after ``calls`` calls of
+    ``func(request)``, keeping every result alive the way a view would.
+    """
+    tracemalloc.start()
+    try:
+        results = [func(request) for _ in range(calls)]
+        size = tracemalloc.get_traced_memory()[0]
+        del results
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark(group='decompose-mms')
+def test_mms_allocations(benchmark, factory):
+    def fresh():
+        return prepare(factory.post_form('/', MMS_PAYLOAD))
+
+    memoized = allocated(decompose, fresh())
+    legacy = allocated(legacy_decompose, fresh())
+    benchmark.extra_info['bytes_allocated'] = memoized
+    benchmark.extra_info['bytes_allocated_legacy'] = legacy
+    assert memoized < legacy
+
+    def decompose_three_times(request):
+        for _ in range(3):
+            decompose(request)
+
+    def setup():
+        return (fresh(),), {}
+
+    benchmark.pedantic(decompose_three_times, setup=setup, rounds=500)
+
+
+def retained(cls, parameters, count=1000):
+    """Return the average bytes retained by an instance of ``cls``."""
+    tracemalloc.start()
+    try:
+        instances = [cls(parameters) for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        del instances
+        return size // count
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark(group='twilio-request')
+@pytest.mark.parametrize('payload', [VOICE_PAYLOAD, MMS_PAYLOAD],
+                         ids=['voice', 'mms'])
+def test_build(benchmark, payload):
+    benchmark.extra_info['bytes_per_instance'] = retained(
+        TwilioRequest, payload)
+    benchmark(TwilioRequest, payload)
+
+
+@pytest.mark.benchmark(group='twilio-request')
+def test_typed_field(benchmark):
+    twilio_request = TwilioRequest(MMS_PAYLOAD)
+    assert benchmark(lambda: twilio_request.num_media) == MEDIA_COUNT
+
+
+@pytest.mark.benchmark(group='twilio-request')
+def test_string_field(benchmark):
+    twilio_request = TwilioRequest(MMS_PAYLOAD)
+    assert benchmark(lambda: twilio_request.nummedia) == str(MEDIA_COUNT)
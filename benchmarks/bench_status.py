@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the status callback views.
+
+``buffered`` is what a callback costs the request that delivers it, and
+``unbuffered`` what it costs with ``DJANGO_TWILIO_STATUS_BUFFER_SIZE = 0``.
+The ``save`` group compares saving a batch of callbacks one at a time with
+the ``bulk_create`` the background thread does.
+"""
+
+import pytest
+from django.utils import timezone
+
+from django_twilio import status
+from django_twilio.models import MessageStatus
+from django_twilio.status import StatusBuffer
+from django_twilio.views import message_status
+
+from conftest import prepare
+
+
+pytestmark = pytest.mark.django_db
+
+BATCH = 500
+
+STATUS_PAYLOAD = {
+    'AccountSid': 'ACXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'ApiVersion': '2010-04-01',
+    'From': '+15005550006',
+    'MessageSid': 'SMXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'MessageStatus': 'delivered',
+    'SmsSid': 'SMXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'SmsStatus': 'delivered',
+    'To': '+15005550001',
+}
+
+
+@pytest.fixture(autouse=True)
+def status_buffer(settings):
+    # Nothing is saved in the background while we measure.
+    settings.DJANGO_TWILIO_STATUS_FLUSH_INTERVAL = 3600
+    settings.DJANGO_TWILIO_STATUS_BATCH_SIZE = 10 ** 9
+    settings.DJANGO_TWILIO_STATUS_BUFFER_SIZE = 10 ** 9
+    yield settings
+    status.reset()
+
+
+@pytest.fixture
+def status_request(factory):
+    return prepare(
+        factory.post_form('/test_app/status/message/', STATUS_PAYLOAD))
+
+
+@pytest.mark.benchmark(group='status-view')
+def test_buffered(benchmark, status_request):
+    assert benchmark(message_status, status_request).status_code == 204
+
+
+@pytest.mark.benchmark(group='status-view')
+def test_unbuffered(benchmark, settings, status_request):
+    settings.DJANGO_TWILIO_STATUS_BUFFER_SIZE = 0
+    assert benchmark(message_status, status_request).status_code == 204
+
+
+def messages():
+    return [
+        MessageStatus(
+            message_sid='SM{:032d}'.format(i), account_sid='AC1',
+            status='delivered', received_at=timezone.now())
+        for i in range(BATCH)
+    ]
+
+
+@pytest.mark.benchmark(group='status-save')
+def test_save_each(benchmark):
+    def save(instances):
+        for instance in instances:
+            instance.save()
+
+    benchmark.pedantic(
+        save, setup=lambda: ((messages(),), {}), rounds=10)
+
+
+@pytest.mark.benchmark(group='status-save')
+def test_bulk_create(benchmark):
+    buffer = StatusBuffer(max_size=0, batch_size=BATCH)
+    benchmark.pedantic(
+        buffer._save, setup=lambda: ((messages(),), {}), rounds=10)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of TwiML serialization: the twilio library's ElementTree based
+``str(response)`` (``etree``) against ``django_twilio.twiml.render``.
+"""
+
+import pytest
+from twilio.twiml.messaging_response import MessagingResponse
+from twilio.twiml.voice_response import Dial, VoiceResponse
+
+from django_twilio.twiml import render
+
+
+def say():
+    r = VoiceResponse()
+    r.say('Hello, world!', voice='alice', language='en-US')
+    return r
+
+
+def gather():
+    r = VoiceResponse()
+    g = r.gather(action='/menu/', method='POST', num_digits=1, timeout=5)
+    g.say('For sales, press 1. For support, press 2.')
+    g.say('To hear these options again, press 9.')
+    r.redirect('/menu/')
+    return r
+
+
+def conference():
+    r = VoiceResponse()
+    d = Dial()
+    d.conference('Room 1', start_conference_on_enter=True,
+                 wait_url='http://twimlets.com/holdmusic?Bucket=x',
+                 wait_method='POST')
+    r.append(d)
+    return r
+
+
+def message():
+    r = MessagingResponse()
+    r.message('Thanks for the message & have a <great> day!',
+              media='https://example.com/cat.gif')
+    return r
+
+
+DOCUMENTS = [say, gather, conference, message]
+
+
+def etree(response):
+    return str(response).encode('utf-8')
+
+
+@pytest.mark.parametrize('build', DOCUMENTS, ids=lambda f: f.__name__)
+def test_render(benchmark, build):
+    benchmark.group = 'twiml-' + build.__name__
+    response = build()
+    assert benchmark(render, response) == etree(response)
+
+
+@pytest.mark.parametrize('build', DOCUMENTS, ids=lambda f: f.__name__)
+def test_etree(benchmark, build):
+    benchmark.group = 'twiml-' + build.__name__
+    benchmark(etree, build())
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of ``twilio_view``'s forgery check.
+
+``legacy`` builds a fresh ``RequestValidator`` for every request, which is
+what ``twilio_view`` used to do, for comparison.
+"""
+
+import pytest
+from django.conf import settings
+from twilio.request_validator import RequestValidator
+
+from django_twilio.decorators import _check_forgery
+from django_twilio.settings import get_webhook_settings
+
+
+@pytest.mark.benchmark(group='validation')
+def test_validate(benchmark, voice_request):
+    validator = get_webhook_settings().validator
+
+    assert benchmark(_check_forgery, voice_request, validator) is None
+
+
+@pytest.mark.benchmark(group='validation')
+def test_validate_legacy(benchmark, voice_request):
+    def validate(request):
+        validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+        return validator.validate(
+            request.build_absolute_uri(),
+            request.POST,
+            request.headers['x-twilio-signature'],
+        )
+
+    assert benchmark(validate, voice_request)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fixtures shared by the webhook benchmarks.
+
+The benchmarks aren't part of the regular test run. Run them with::
+
+    pytest benchmarks --benchmark-autosave
+
+and compare against the last saved run with ``--benchmark-compare`` (see the
+``bench`` and ``bench-compare`` Makefile targets).
+"""
+
+import pytest
+from django.conf import settings as django_settings
+
+from django_twilio import blacklist, credentials, twiml
+from django_twilio.request import get_params
+from test_project.test_app.utils import TwilioRequestFactory
+
+
+VOICE_PAYLOAD = {
+    'AccountSid': 'ACXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'ApiVersion': '2010-04-01',
+    'CallSid': 'CAXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'CallStatus': 'ringing',
+    'Called': '+15005550006',
+    'Caller': '+15005550001',
+    'Direction': 'inbound',
+    'From': '+15005550001',
+    'To': '+15005550006',
+}
+
+MESSAGE_PAYLOAD = {
+    'AccountSid': 'ACXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'ApiVersion': '2010-04-01',
+    'Body': 'Hello from the benchmarks!',
+    'From': '+15005550001',
+    'MessageSid': 'SMXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX',
+    'NumMedia': '0',
+    'NumSegments': '1',
+    'SmsStatus': 'received',
+    'To': '+15005550006',
+}
+
+MEDIA_COUNT = 10
+
+MMS_PAYLOAD = dict(MESSAGE_PAYLOAD, NumMedia=str(MEDIA_COUNT))
+for i in range(MEDIA_COUNT):
+    MMS_PAYLOAD['MediaUrl{}'.format(i)] = (
+        'https://api.twilio.com/2010-04-01/Accounts/ACXXXXXXXXXXXXXXXXXXXXXXXX'
+        'XXXXXXXX/Messages/MMXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX/Media/'
+        'ME{:032d}'.format(i))
+    MMS_PAYLOAD['MediaContentType{}'.format(i)] = 'image/jpeg'
+
+
+@pytest.fixture(autouse=True)
+def webhook_settings(settings):
+    # Measure what a production deployment pays for every request.
+    settings.DEBUG = False
+    settings.DJANGO_TWILIO_FORGERY_PROTECTION = True
+    settings.DJANGO_TWILIO_BLACKLIST_CHECK = True
+    yield settings
+    blacklist.reset()
+    credentials.reset()
+    twiml.reset_response_cache()
+
+
+@pytest.fixture
+def factory():
+    return TwilioRequestFactory(token=django_settings.TWILIO_AUTH_TOKEN)
+
+
+def prepare(request):
+    """Parse the parameters of ``request`` up front: that only happens once
+    per request, and it isn't what we're measuring.
+    """
+    get_params(request)
+    return request
+
+
+@pytest.fixture
+def voice_request(factory):
+    return prepare(
+        factory.post_form('/test_app/decorators/str_view/', VOICE_PAYLOAD))
+
+
+@pytest.fixture
+def message_request(factory):
+    return prepare(
+        factory.post_form('/test_app/decorators/str_view/', MESSAGE_PAYLOAD))
@@ -7,7 +7,9 @@ various components through the django admin panel (if enabled).
 
 from django.contrib import admin
 
-from .models import Caller, Credential
+from .models import (
+    BlacklistRule, Caller, CallStatus, Credential, MessageStatus,
+)
 
 
 @admin.register(Caller)
@@ -18,4 +20,33 @@ class CallerAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'blacklisted')
 
 
+@admin.register(BlacklistRule)
+class BlacklistRuleAdmin(admin.ModelAdmin):
+    """Admin panel integration for
+    :class:`django_twilio.models.BlacklistRule`.
+    """
+    list_display = ('prefix', 'description', 'active')
+    list_filter = ('active',)
+    search_fields = ('prefix', 'description')
+
+
 admin.site.register(Credential)
+
+
+@admin.register(MessageStatus)
+class MessageStatusAdmin(admin.ModelAdmin):
+    """Admin panel integration for
+    :class:`django_twilio.models.MessageStatus`.
+    """
+    list_display = ('message_sid', 'status', 'error_code', 'received_at')
+    list_filter = ('status',)
+    search_fields = ('message_sid',)
+
+
+@admin.register(CallStatus)
+class CallStatusAdmin(admin.ModelAdmin):
+    """Admin panel integration for :class:`django_twilio.models.CallStatus`.
+    """
+    list_display = ('call_sid', 'status', 'call_duration', 'received_at')
+    list_filter = ('status',)
+    search_fields = ('call_sid',)
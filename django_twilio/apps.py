@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+from django.apps import AppConfig
+
+
+class DjangoTwilioConfig(AppConfig):
+    name = 'django_twilio'
+    verbose_name = 'Django Twilio'
+    default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        # Connect our signal receivers.
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+ASGI helpers.
+"""
+
+
+class LifespanMiddleware(object):
+    """
+    ASGI middleware that handles the server's lifespan events, closing the
+    connections of :mod:`django_twilio.async_client` when it shuts down.
+
+    Django's own ASGI application doesn't support the lifespan protocol, so
+    wrap it in your ``asgi.py``::
+
+        from django.core.asgi import get_asgi_application
+        from django_twilio.asgi import LifespanMiddleware
+
+        application = LifespanMiddleware(get_asgi_application())
+
+    Every other connection is passed on to the wrapped application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Connections are opened as they are needed.
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Imported here, so aiohttp is only loaded on shutdown by
+                # projects that didn't use it.
+                from .async_client import aclose
+                try:
+                    await aclose()
+                except Exception as e:
+                    await send({
+                        'type': 'lifespan.shutdown.failed',
+                        'message': str(e),
+                    })
+                else:
+                    await send({'type': 'lifespan.shutdown.complete'})
+                return
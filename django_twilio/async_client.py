@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Twilio REST clients for async code.
+
+The clients handed out here are backed by the Twilio library's aiohttp based
+``AsyncTwilioHttpClient``, so their ``*_async`` methods (``await
+client.messages.create_async(...)`` and so on) don't block the event loop::
+
+    from django_twilio.async_client import aget_user_client
+
+    client = await aget_user_client(request.user)
+    await client.messages.create_async(to=..., from_=..., body=...)
+
+Like :func:`django_twilio.client.get_client`, there is one cached client per
+``(account_sid, auth_token)``, and they all share one pooled session, which
+follows the same ``DJANGO_TWILIO_HTTP_*`` settings. An aiohttp session can
+only be used by the event loop it was created in, so each event loop gets a
+registry of its own. Close it with :func:`aclose` before the loop stops; in
+an ASGI deployment, :class:`django_twilio.asgi.LifespanMiddleware` does that
+when the server shuts down. Loops run by ``asyncio.run`` (which
+``async_to_sync`` uses too) close their registry themselves as they shut
+down; the registries of loops closed in any other way are dropped the next
+time a new loop asks for one.
+"""
+
+import asyncio
+
+from aiohttp import ClientConnectorError, ClientSession, TCPConnector
+from aiohttp_retry import ExponentialRetry, RetryClient
+from django.conf import settings
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+
+from .client import (
+    DEFAULT_BACKOFF, DEFAULT_CLIENT_CACHE_SIZE, DEFAULT_POOL_SIZE,
+    DEFAULT_RETRIES, RETRY_METHODS, RETRY_STATUSES, ClientRegistry)
+from .credentials import aresolve_twilio_credentials
+
+
+# Event loop -> ClientRegistry. A registry's session keeps its loop alive, so
+# the registries of closed loops have to be dropped by hand.
+_registries = {}
+
+
+class PooledAsyncHttpClient(AsyncTwilioHttpClient):
+    """
+    An ``AsyncTwilioHttpClient`` that applies its ``timeout`` to every
+    request, as the synchronous ``TwilioHttpClient`` does.
+    """
+
+    async def request(self, method, url, params=None, data=None,
+                      headers=None, auth=None, timeout=None,
+                      allow_redirects=False):
+        if timeout is None:
+            timeout = self.timeout
+        return await super().request(
+            method, url, params=params, data=data, headers=headers,
+            auth=auth, timeout=timeout, allow_redirects=allow_redirects)
+
+
+class Retry(ExponentialRetry):
+    """
+    Exponential backoff that releases the responses it retries, which
+    aiohttp_retry leaves open, so their connections go back to the pool.
+    """
+
+    def get_timeout(self, attempt, response=None):
+        if response is not None:
+            response.release()
+        return super().get_timeout(attempt, response)
+
+
+def build_async_http_client(pool_size=DEFAULT_POOL_SIZE,
+                            retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                            timeout=None):
+    """Return an async HTTP client opening at most ``pool_size`` connections
+    to each Twilio host, and retrying failed requests like
+    :func:`django_twilio.client.build_http_client` does.
+
+    This must be called from a running event loop, which is the only one
+    that may use the client.
+    """
+    http_client = PooledAsyncHttpClient(
+        pool_connections=False, timeout=timeout)
+    http_client.session = RetryClient(
+        client_session=ClientSession(
+            connector=TCPConnector(limit_per_host=pool_size)),
+        retry_options=Retry(
+            attempts=retries + 1,
+            start_timeout=backoff,
+            statuses=set(RETRY_STATUSES),
+            methods=set(RETRY_METHODS),
+            retry_all_server_errors=False,
+            # Failing to connect means nothing was sent, so any request can
+            # be retried.
+            exceptions={ClientConnectorError},
+        ),
+    )
+    return http_client
+
+
+def get_registry():
+    """Return the :class:`django_twilio.client.ClientRegistry` of async
+    clients for the running event loop, building it if needed.
+
+    :raises RuntimeError: If no event loop is running.
+    """
+    loop = asyncio.get_running_loop()
+    registry = _registries.get(loop)
+    if registry is None:
+        _discard_closed_loops()
+        registry = ClientRegistry(
+            getattr(settings, 'DJANGO_TWILIO_CLIENT_CACHE_SIZE',
+                    DEFAULT_CLIENT_CACHE_SIZE),
+            build_async_http_client(
+                pool_size=getattr(
+                    settings, 'DJANGO_TWILIO_HTTP_POOL_SIZE',
+                    DEFAULT_POOL_SIZE),
+                retries=getattr(
+                    settings, 'DJANGO_TWILIO_HTTP_RETRIES', DEFAULT_RETRIES),
+                backoff=getattr(
+                    settings, 'DJANGO_TWILIO_HTTP_BACKOFF', DEFAULT_BACKOFF),
+                timeout=getattr(settings, 'DJANGO_TWILIO_HTTP_TIMEOUT', None),
+            ),
+        )
+        # Start an async generator that stays suspended until the loop's
+        # shutdown_asyncgens() closes it. The registry holds it, since the
+        # loop only keeps a weak reference.
+        registry.shutdown_hook = _close_on_shutdown(loop)
+        try:
+            registry.shutdown_hook.__anext__().send(None)
+        except StopIteration:
+            pass
+        _registries[loop] = registry
+    return registry
+
+
+def get_client(account_sid, auth_token):
+    """Return a cached async ``Client`` for ``account_sid`` and
+    ``auth_token``, for use in the running event loop.
+    """
+    return get_registry().get(account_sid, auth_token)
+
+
+async def aget_user_client(user=None):
+    """Return a cached async ``Client`` for the credentials of ``user``, as
+    found by :func:`django_twilio.credentials.aresolve_twilio_credentials`
+    (the project's default credentials without a ``user``).
+    """
+    return get_client(*await aresolve_twilio_credentials(user))
+
+
+async def aclose():
+    """Close the connections of the running event loop's clients, and
+    forget them.
+    """
+    registry = _registries.pop(asyncio.get_running_loop(), None)
+    if registry is not None:
+        await registry.http_client.close()
+
+
+def reset():
+    """Forget the clients of every event loop, so they are rebuilt from the
+    current settings on next use. Their sessions are closed by the loops
+    they belong to, if those are still running.
+    """
+    for loop, registry in list(_registries.items()):
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(
+                registry.http_client.close(), loop)
+        elif loop.is_closed():
+            _close_abandoned(registry.http_client)
+    _registries.clear()
+
+
+async def _close_on_shutdown(loop):
+    try:
+        yield
+    finally:
+        registry = _registries.pop(loop, None)
+        if registry is not None:
+            await registry.http_client.close()
+
+
+def _discard_closed_loops():
+    for loop, registry in list(_registries.items()):
+        if loop.is_closed() and _registries.pop(loop, None) is not None:
+            _close_abandoned(registry.http_client)
+
+
+def _close_abandoned(http_client):
+    # Nothing can be awaited once a loop is closed, but aiohttp closes the
+    # connector of a closed loop without suspending, so the coroutine runs
+    # to completion in a single step.
+    coro = http_client.close()
+    try:
+        coro.send(None)
+    except StopIteration:
+        pass
+    else:
+        coro.close()
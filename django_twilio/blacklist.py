@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+"""
+Blacklist lookups for incoming Twilio requests.
+
+Lookups are served from a per-process :class:`django_twilio.cache.LRUCache`
+so that repeat callers (blacklisted or not) don't cost a database query. The
+cache is cleared whenever a :class:`django_twilio.models.Caller` is saved or
+deleted in this process; other processes pick up changes once the cache TTL
+expires.
+
+If ``DJANGO_TWILIO_BLACKLIST_SNAPSHOT`` points at a snapshot written by the
+``twilio_blacklist_snapshot`` management command, lookups are answered from
+that memory-mapped file instead (see :mod:`django_twilio.snapshot`), and so
+are the blacklist rules below, which the snapshot carries too.
+
+Numbers are checked against the prefixes of every active
+:class:`django_twilio.models.BlacklistRule` first, using a
+:class:`django_twilio.trie.PrefixTrie` loaded once per process. Saving or
+deleting a rule updates this process's trie in place; other processes reload
+theirs once ``DJANGO_TWILIO_BLACKLIST_RULES_TTL`` seconds have passed.
+"""
+
+import re
+import time
+
+import django
+import phonenumbers
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import LRUCache, MISSING
+from .models import BlacklistRule, Caller
+from .snapshot import BlacklistSnapshot
+from .trie import PrefixTrie
+
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_CACHE_TTL = 60
+DEFAULT_SNAPSHOT_CHECK_INTERVAL = 1.0
+DEFAULT_RULES_TTL = 60
+
+REJECT_REASONS = ('rejected', 'busy')
+
+E164_RE = re.compile(r'\+[1-9][0-9]{1,14}\Z')
+
+_cache = MISSING
+_snapshot = MISSING
+_rejections = None
+_rules = MISSING
+_rules_expire = None
+
+
+def get_cache():
+    """Return the blacklist cache for this process, or ``None`` if caching
+    has been disabled with ``DJANGO_TWILIO_BLACKLIST_CACHE_SIZE = 0``.
+    """
+    global _cache
+    if _cache is MISSING:
+        size = getattr(
+            settings, 'DJANGO_TWILIO_BLACKLIST_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        ttl = getattr(
+            settings, 'DJANGO_TWILIO_BLACKLIST_CACHE_TTL', DEFAULT_CACHE_TTL)
+        _cache = LRUCache(size, ttl) if size else None
+    return _cache
+
+
+def get_snapshot():
+    """Return the blacklist snapshot for this process, or ``None`` if
+    ``DJANGO_TWILIO_BLACKLIST_SNAPSHOT`` isn't set.
+    """
+    global _snapshot
+    if _snapshot is MISSING:
+        path = getattr(settings, 'DJANGO_TWILIO_BLACKLIST_SNAPSHOT', None)
+        interval = getattr(
+            settings,
+            'DJANGO_TWILIO_BLACKLIST_SNAPSHOT_CHECK_INTERVAL',
+            DEFAULT_SNAPSHOT_CHECK_INTERVAL,
+        )
+        _snapshot = BlacklistSnapshot(path, interval) if path else None
+    return _snapshot
+
+
+def get_rules():
+    """Return the :class:`django_twilio.trie.PrefixTrie` of every active
+    :class:`django_twilio.models.BlacklistRule`, loading it from the database
+    the first time, and again every ``DJANGO_TWILIO_BLACKLIST_RULES_TTL``
+    seconds. While a blacklist snapshot is in use, the rules written into it
+    are returned instead.
+    """
+    rules = _get_loaded_rules()
+    if rules is None:
+        rules = _load_rules()
+    return rules
+
+
+def _get_loaded_rules():
+    """Return the rule trie, or ``None`` if it needs to be (re)loaded."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        rules = snapshot.get_rules()
+        # Fall back to the database until a snapshot has been written.
+        if rules is not None:
+            return rules
+    if _rules is MISSING:
+        return None
+    if _rules_expire is not None and _rules_expire <= time.monotonic():
+        return None
+    return _rules
+
+
+def _load_rules():
+    global _rules, _rules_expire
+    ttl = getattr(settings, 'DJANGO_TWILIO_BLACKLIST_RULES_TTL',
+                  DEFAULT_RULES_TTL)
+    rules = PrefixTrie(
+        BlacklistRule.objects.filter(active=True).values_list('pk', 'prefix'))
+    _rules = rules
+    _rules_expire = None if ttl is None else time.monotonic() + ttl
+    return rules
+
+
+def update_rule(rule):
+    """Add or remove ``rule`` from this process's rule trie, depending on
+    whether it is active.
+    """
+    if _rules is MISSING:
+        return
+    if rule.active:
+        _rules.add(rule.pk, rule.prefix)
+    else:
+        _rules.discard(rule.pk)
+
+
+def discard_rule(pk):
+    """Remove the rule with primary key ``pk`` from this process's rule
+    trie.
+    """
+    if _rules is not MISSING:
+        _rules.discard(pk)
+
+
+def get_rejection(request_type):
+    """Return the TwiML, as bytes, used to turn away a blacklisted caller.
+
+    Voice calls are rejected with ``<Reject>``, using the reason set by
+    ``DJANGO_TWILIO_BLACKLIST_REJECT_REASON``. Twilio has no way to reject a
+    message, so everything else gets an empty ``<Message>``, and Twilio
+    doesn't reply to the sender.
+
+    :param str request_type: ``'voice'``, ``'message'`` or ``'unknown'``, as
+        returned by :func:`django_twilio.request.get_request_type`.
+    """
+    global _rejections
+    if _rejections is None:
+        _rejections = _build_rejections()
+    voice, message = _rejections
+    return voice if request_type == 'voice' else message
+
+
+def _build_rejections():
+    from twilio.twiml.messaging_response import Message
+    from twilio.twiml.voice_response import VoiceResponse
+
+    reason = getattr(settings, 'DJANGO_TWILIO_BLACKLIST_REJECT_REASON', None)
+    if reason is not None and reason not in REJECT_REASONS:
+        raise ImproperlyConfigured(
+            'DJANGO_TWILIO_BLACKLIST_REJECT_REASON must be one of {}, '
+            'not {!r}.'.format(', '.join(REJECT_REASONS), reason))
+    voice = VoiceResponse()
+    voice.reject(reason=reason)
+    return str(voice).encode('utf-8'), str(Message()).encode('utf-8')
+
+
+def reset():
+    """Drop the blacklist cache, snapshot, rules and rejection responses so
+    that they are rebuilt from the current settings on next use.
+    """
+    global _cache, _snapshot, _rejections, _rules, _rules_expire
+    _cache = _snapshot = _rules = MISSING
+    _rejections = _rules_expire = None
+
+
+def clear_cache():
+    """Forget every cached blacklist lookup."""
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def is_blacklisted(phone_number):
+    """Return whether ``phone_number`` belongs to a blacklisted
+    :class:`django_twilio.models.Caller`, or starts with the prefix of an
+    active :class:`django_twilio.models.BlacklistRule`.
+
+    :param str phone_number: The ``From`` value of an incoming request.
+    """
+    if get_rules().match(phone_number) is not None:
+        return True
+    blacklisted = _lookup(phone_number)
+    if blacklisted is MISSING:
+        cache = get_cache()
+        if cache is None:
+            return _query(phone_number)
+        generation = cache.generation
+        blacklisted = _query(phone_number)
+        cache.set(phone_number, blacklisted, generation=generation)
+    return blacklisted
+
+
+async def ais_blacklisted(phone_number):
+    """Async version of :func:`is_blacklisted`, which queries the database
+    (on a cache miss) through Django's async ORM.
+    """
+    rules = _get_loaded_rules()
+    if rules is None:
+        rules = await sync_to_async(_load_rules)()
+    if rules.match(phone_number) is not None:
+        return True
+    blacklisted = _lookup(phone_number)
+    if blacklisted is MISSING:
+        cache = get_cache()
+        if cache is None:
+            return await _aquery(phone_number)
+        generation = cache.generation
+        blacklisted = await _aquery(phone_number)
+        cache.set(phone_number, blacklisted, generation=generation)
+    return blacklisted
+
+
+def normalize_phone_number(phone_number, region=None):
+    """Return ``phone_number`` in E.164 format, or ``None`` if it isn't a
+    possible phone number.
+
+    Numbers already in E.164 format are returned as they are, without being
+    parsed.
+
+    :param str region: The region numbers without a country code are dialled
+        from. Defaults to the ``PHONENUMBER_DEFAULT_REGION`` setting.
+    """
+    phone_number = phone_number.strip()
+    if E164_RE.match(phone_number):
+        return phone_number
+    if region is None:
+        region = getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None)
+    try:
+        number = phonenumbers.parse(phone_number, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(
+        number, phonenumbers.PhoneNumberFormat.E164)
+
+
+if django.VERSION >= (4, 1):
+    def upsert_callers(callers, using=None, batch_size=None):
+        """Save the unsaved :class:`django_twilio.models.Caller` objects
+        ``callers`` in bulk, updating ``blacklisted`` for phone numbers that
+        already exist.
+
+        No phone number may appear twice in ``callers``. Like
+        ``bulk_create``, this doesn't send ``post_save`` signals.
+        """
+        Caller.objects.using(using).bulk_create(
+            callers,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['phone_number'],
+            update_fields=['blacklisted'],
+        )
+else:
+    def upsert_callers(callers, using=None, batch_size=None):
+        # Without update_conflicts, insert the new callers and update the
+        # rest with one UPDATE per blacklisted value.
+        manager = Caller.objects.using(using)
+        manager.bulk_create(
+            callers, batch_size=batch_size, ignore_conflicts=True)
+        step = batch_size or len(callers) or 1
+        for blacklisted in (True, False):
+            numbers = [
+                str(caller.phone_number)
+                for caller in callers if caller.blacklisted is blacklisted
+            ]
+            for i in range(0, len(numbers), step):
+                manager.filter(
+                    phone_number__in=numbers[i:i + step],
+                ).exclude(blacklisted=blacklisted).update(
+                    blacklisted=blacklisted)
+
+
+def _lookup(phone_number):
+    """Answer a lookup without the database if we can, returning ``MISSING``
+    otherwise.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        blacklisted = snapshot.lookup(phone_number)
+        # Fall back to the database until a snapshot has been written.
+        if blacklisted is not None:
+            return blacklisted
+
+    cache = get_cache()
+    if cache is None:
+        return MISSING
+    return cache.get(phone_number, MISSING)
+
+
+def _query(phone_number):
+    return Caller.objects.filter(
+        phone_number=phone_number, blacklisted=True).exists()
+
+
+if django.VERSION >= (4, 1):
+    async def _aquery(phone_number):
+        return await Caller.objects.filter(
+            phone_number=phone_number, blacklisted=True).aexists()
+else:
+    _aquery = sync_to_async(_query)
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sending large batches of messages.
+
+:func:`send_bulk_messages` sends every message of an iterable (a queryset
+iterator, a generator reading a CSV file...) from a pool of threads, and
+yields a :class:`MessageResult` for each one as soon as it is done. Only a
+few messages per thread are read ahead of the ones being sent, so a campaign
+of a million messages takes no more memory than one of a hundred.
+
+Twilio queues the messages a number sends faster than its messages-per-second
+limit, and answers ``429 Too Many Requests`` once that queue is full. So each
+sender (a ``from_`` number or a ``messaging_service_sid``) is throttled to
+its own rate with a token bucket, ``DJANGO_TWILIO_BULK_RATE`` messages per
+second unless ``DJANGO_TWILIO_BULK_RATES`` says otherwise. Messages answered
+with a ``429`` or ``5xx`` status are retried after an exponential backoff
+with full jitter, so that the threads don't all retry at once.
+
+:func:`asend_bulk_messages` does the same with asyncio tasks and the clients
+of :mod:`django_twilio.async_client`.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from twilio.base.exceptions import TwilioRestException
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 1.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 30.0
+
+#: The statuses messages are retried for. Twilio hasn't accepted a message
+#: it answered with a ``429``; a ``5xx`` status is less certain, and may
+#: rarely lead to a message being sent twice.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# How many messages are read ahead for each worker.
+READ_AHEAD = 2
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token bucket, letting through ``rate`` calls to
+    :meth:`acquire` per second on average, and up to ``burst`` at once.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning the number of seconds to wait before
+        using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens can go negative: callers queue up for the ones to come,
+            # in the order they asked.
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Take a token, sleeping until it can be used."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self):
+        """Async version of :meth:`acquire`."""
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class MessageResult(object):
+    """
+    The outcome of sending one message.
+
+    :attr message: The keyword arguments the message was created with.
+    :attr instance: The Twilio ``MessageInstance``, if it was sent.
+    :attr error: The exception that stopped it from being sent, if it wasn't.
+    :attr attempts: How many times it was sent to Twilio.
+    """
+
+    __slots__ = ('message', 'instance', 'error', 'attempts')
+
+    def __init__(self, message, instance=None, error=None, attempts=1):
+        self.message = message
+        self.instance = instance
+        self.error = error
+        self.attempts = attempts
+
+    def __repr__(self):
+        if self.ok:
+            return '<MessageResult {}>'.format(self.sid)
+        return '<MessageResult {!r}>'.format(self.error)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def sid(self):
+        return self.instance.sid if self.instance is not None else None
+
+
+class BulkSender(object):
+    """
+    Sends messages for :func:`send_bulk_messages` and
+    :func:`asend_bulk_messages`, which document its arguments.
+    """
+
+    def __init__(self, client, from_=None, rate=None, rates=None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF,
+                 retry_statuses=RETRY_STATUSES):
+        if rate is None:
+            rate = getattr(settings, 'DJANGO_TWILIO_BULK_RATE', DEFAULT_RATE)
+        if rates is None:
+            rates = getattr(settings, 'DJANGO_TWILIO_BULK_RATES', {})
+        if rate <= 0 or any(r <= 0 for r in rates.values()):
+            raise ValueError('Message rates must be positive.')
+        self.client = client
+        self.from_ = from_ or getattr(
+            settings, 'TWILIO_DEFAULT_CALLERID', None)
+        self.rate = rate
+        self.rates = rates
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, message):
+        """Return the keyword arguments to create ``message`` with, and the
+        token bucket of its sender.
+        """
+        kwargs = dict(message)
+        if 'from_' not in kwargs and 'messaging_service_sid' not in kwargs:
+            kwargs['from_'] = self.from_
+        sender = kwargs.get('messaging_service_sid') or kwargs.get('from_')
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(sender)
+                if bucket is None:
+                    bucket = self._buckets[sender] = TokenBucket(
+                        self.rates.get(sender, self.rate))
+        return kwargs, bucket
+
+    def send(self, message):
+        """Send ``message``, returning its :class:`MessageResult`."""
+        kwargs, bucket = self.prepare(message)
+        attempt = 0
+        while True:
+            attempt += 1
+            bucket.acquire()
+            try:
+                instance = self.client.messages.create(**kwargs)
+            except Exception as e:
+                delay = self.get_retry_delay(e, attempt)
+                if delay is None:
+                    return MessageResult(message, error=e, attempts=attempt)
+                time.sleep(delay)
+            else:
+                return MessageResult(message, instance, attempts=attempt)
+
+    async def asend(self, message):
+        """Async version of :meth:`send`."""
+        kwargs, bucket = self.prepare(message)
+        attempt = 0
+        while True:
+            attempt += 1
+            await bucket.aacquire()
+            try:
+                instance = await self.client.messages.create_async(**kwargs)
+            except Exception as e:
+                delay = self.get_retry_delay(e, attempt)
+                if delay is None:
+                    return MessageResult(message, error=e, attempts=attempt)
+                await asyncio.sleep(delay)
+            else:
+                return MessageResult(message, instance, attempts=attempt)
+
+    def get_retry_delay(self, error, attempt):
+        """Return how long to wait before retrying after ``error``, or
+        ``None`` if the message shouldn't be retried.
+        """
+        if (attempt > self.retries
+                or not isinstance(error, TwilioRestException)
+                or error.status not in self.retry_statuses):
+            return None
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+def send_bulk_messages(messages, client=None, from_=None,
+                       workers=DEFAULT_WORKERS, **kwargs):
+    """Send ``messages`` from a pool of ``workers`` threads, yielding a
+    :class:`MessageResult` for each one, in the order they finish.
+
+    :param messages: An iterable of dicts of the keyword arguments of
+        ``client.messages.create`` (``to``, ``body``, ``from_``...). It is
+        read as the messages are sent.
+    :param client: The ``Client`` to send them with. Defaults to
+        :data:`django_twilio.client.twilio_client`. Set
+        ``DJANGO_TWILIO_HTTP_POOL_SIZE`` to at least ``workers``, so that
+        every thread keeps its connection to Twilio alive.
+    :param str from_: The sender of messages that have neither a ``from_``
+        nor a ``messaging_service_sid``. Defaults to
+        ``TWILIO_DEFAULT_CALLERID``.
+    :param int workers: The number of messages sent at the same time.
+    :param float rate: The number of messages each sender may send per
+        second. Defaults to ``DJANGO_TWILIO_BULK_RATE``, or ``1``.
+    :param dict rates: The rates of particular senders, by number or
+        messaging service SID. Defaults to ``DJANGO_TWILIO_BULK_RATES``.
+    :param int retries: How many times a message is retried.
+    :param float backoff: The longest, in seconds, the first retry of a
+        message waits; each retry waits up to twice as long as the last.
+    :param float max_backoff: The longest any retry waits.
+    :param retry_statuses: The HTTP statuses that are retried.
+
+    Errors are reported in the results rather than raised. Closing the
+    generator early stops sending after the messages already under way.
+    """
+    if workers < 1:
+        raise ValueError('workers must be positive.')
+    if client is None:
+        from .client import twilio_client
+        client = twilio_client
+    sender = BulkSender(client, from_, **kwargs)
+    messages = iter(messages)
+    pending = set()
+    executor = ThreadPoolExecutor(
+        workers, thread_name_prefix='django_twilio_bulk')
+    try:
+        while True:
+            while len(pending) < workers * READ_AHEAD:
+                try:
+                    message = next(messages)
+                except StopIteration:
+                    break
+                pending.add(executor.submit(sender.send, message))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+async def asend_bulk_messages(messages, client=None, from_=None,
+                              concurrency=DEFAULT_WORKERS, **kwargs):
+    """Async version of :func:`send_bulk_messages`, sending up to
+    ``concurrency`` messages at once from asyncio tasks.
+
+    ``messages`` may be an iterable or an async iterable, and ``client``
+    defaults to the async client for the project's default credentials (see
+    :mod:`django_twilio.async_client`). Use it with ``async for``.
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be positive.')
+    if client is None:
+        from .async_client import aget_user_client
+        client = await aget_user_client()
+    sender = BulkSender(client, from_, **kwargs)
+    if hasattr(messages, '__aiter__'):
+        messages = messages.__aiter__()
+    else:
+        messages = _aiter(messages)
+    pending = set()
+    try:
+        while True:
+            while len(pending) < concurrency:
+                try:
+                    message = await messages.__anext__()
+                except StopAsyncIteration:
+                    break
+                pending.add(asyncio.ensure_future(sender.asend(message)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Small in-process caches used to keep database queries off the webhook hot
+path.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+class LRUCache(object):
+    """
+    A thread-safe, bounded, least-recently-used cache with an optional
+    time-to-live for each entry.
+
+    :param int maxsize: The maximum number of entries to keep. The least
+        recently used entry is evicted once this size is exceeded.
+    :param float ttl: The number of seconds an entry stays valid, or ``None``
+        to keep entries until they are evicted or invalidated.
+
+    Every call to :meth:`pop` or :meth:`clear` bumps :attr:`generation`.
+    Callers that compute a value outside of the cache can pass the generation
+    they started with to :meth:`set`, so a value computed before an
+    invalidation never makes it into the cache afterwards.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation=None):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.generation += 1
+            try:
+                return self._data.pop(key)[0]
+            except KeyError:
+                return default
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
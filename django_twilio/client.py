@@ -2,14 +2,193 @@
 
 """
 Twilio REST client helpers.
+
+``twilio_client`` is built from the project's default credentials. To talk to
+other (sub)accounts, use :func:`get_client`, which hands out one cached
+``Client`` per ``(account_sid, auth_token)``. Every client it builds shares a
+single pooled HTTP session (see :func:`get_http_client`), so the TLS
+connections to Twilio are kept alive and reused across clients and threads,
+instead of being set up again for every new ``Client``.
+
+Nothing is built until it is first used: ``twilio_client`` is a lazy object,
+and the Twilio REST library (and ``requests``, which it is built on) are only
+imported then, which keeps them out of the startup time and memory of
+processes that never call Twilio.
 """
 
-from twilio.rest import Client
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache import MISSING
+from .credentials import get_default_credentials, resolve_twilio_credentials
+
+
+DEFAULT_CLIENT_CACHE_SIZE = 100
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+#: The responses that are retried, for the methods in ``RETRY_METHODS``.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+#: Requests that are safe to repeat. Creating a message or a call (a
+#: ``POST``) is only retried when the connection failed before it was sent,
+#: so a retry can never send it twice.
+RETRY_METHODS = frozenset(
+    ['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'])
+
+_http_client = MISSING
+_registry = MISSING
+
+
+def build_http_client(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                      backoff=DEFAULT_BACKOFF, timeout=None):
+    """Return a ``TwilioHttpClient`` whose session keeps up to
+    ``pool_size`` connections to each Twilio host alive, and retries failed
+    requests up to ``retries`` times, waiting ``backoff``, ``2 * backoff``,
+    ``4 * backoff``... seconds in between (or what ``Retry-After`` asks for).
+    """
+    from requests.adapters import HTTPAdapter
+    from twilio.http.http_client import TwilioHttpClient
+    from urllib3.util.retry import Retry
+
+    http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+    adapter = HTTPAdapter(
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            # Let the last response through, so the Twilio library raises
+            # its usual TwilioRestException for it.
+            raise_on_status=False,
+        ),
+    )
+    http_client.session.mount('https://', adapter)
+    http_client.session.mount('http://', adapter)
+    return http_client
+
+
+def get_http_client():
+    """Return the ``TwilioHttpClient`` shared by the clients of
+    :func:`get_client`, built from the ``DJANGO_TWILIO_HTTP_*`` settings.
+    """
+    global _http_client
+    if _http_client is MISSING:
+        _http_client = build_http_client(
+            pool_size=getattr(
+                settings, 'DJANGO_TWILIO_HTTP_POOL_SIZE', DEFAULT_POOL_SIZE),
+            retries=getattr(
+                settings, 'DJANGO_TWILIO_HTTP_RETRIES', DEFAULT_RETRIES),
+            backoff=getattr(
+                settings, 'DJANGO_TWILIO_HTTP_BACKOFF', DEFAULT_BACKOFF),
+            timeout=getattr(settings, 'DJANGO_TWILIO_HTTP_TIMEOUT', None),
+        )
+    return _http_client
+
+
+class ClientRegistry(object):
+    """
+    A bounded, thread-safe cache of ``Client`` objects, one per
+    ``(account_sid, auth_token)``.
+
+    :param int maxsize: The maximum number of clients to keep. The least
+        recently used client is evicted once this size is exceeded; it keeps
+        working for whoever still holds it.
+    :param http_client: The ``TwilioHttpClient`` every client shares.
+
+    Concurrent calls to :meth:`get` for the same credentials always return
+    the same client, for as long as it stays in the registry.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CLIENT_CACHE_SIZE, http_client=None):
+        self.maxsize = maxsize
+        self.http_client = http_client
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, credentials):
+        return credentials in self._clients
+
+    def get(self, account_sid, auth_token):
+        """Return the client for ``account_sid`` and ``auth_token``, building
+        it if needed.
+        """
+        from twilio.rest import Client
+
+        key = (account_sid, auth_token)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # Building a Client doesn't touch the network, so holding
+                # the lock for it is cheap.
+                client = self._clients[key] = Client(
+                    account_sid, auth_token, http_client=self.http_client)
+                while len(self._clients) > self.maxsize:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+            return client
+
+    def discard(self, account_sid, auth_token):
+        """Forget the client for ``account_sid`` and ``auth_token``."""
+        with self._lock:
+            self._clients.pop((account_sid, auth_token), None)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+def get_registry():
+    """Return this process's :class:`ClientRegistry`, sized by
+    ``DJANGO_TWILIO_CLIENT_CACHE_SIZE``.
+    """
+    global _registry
+    if _registry is MISSING:
+        _registry = ClientRegistry(
+            getattr(settings, 'DJANGO_TWILIO_CLIENT_CACHE_SIZE',
+                    DEFAULT_CLIENT_CACHE_SIZE),
+            get_http_client(),
+        )
+    return _registry
+
+
+def get_client(account_sid, auth_token):
+    """Return a cached ``Client`` for ``account_sid`` and ``auth_token``,
+    sharing the pooled HTTP session of every other client.
+    """
+    return get_registry().get(account_sid, auth_token)
+
+
+def get_user_client(user=None):
+    """Return a cached ``Client`` for the credentials of ``user``, as found
+    by :func:`django_twilio.credentials.resolve_twilio_credentials`.
+    """
+    return get_client(*resolve_twilio_credentials(user))
+
+
+def _get_default_client():
+    return get_client(*get_default_credentials())
+
 
-from .settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+#: The client for the project's default credentials (see
+#: :mod:`django_twilio.settings`), built the first time it is used.
+twilio_client = SimpleLazyObject(_get_default_client)
 
 
-twilio_client = Client(
-    TWILIO_ACCOUNT_SID,
-    TWILIO_AUTH_TOKEN,
-)
+def reset():
+    """Drop the cached clients and close the shared HTTP session, so both
+    are rebuilt from the current settings on next use.
+    """
+    global _http_client, _registry
+    if _http_client is not MISSING:
+        _http_client.session.close()
+    _http_client = _registry = MISSING
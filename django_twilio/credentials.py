@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cached lookups of the :class:`django_twilio.models.Credential` rows used to
+serve many Twilio (sub)accounts from one project.
+
+Lookups are cached per process in a :class:`django_twilio.cache.LRUCache`,
+which is cleared whenever a ``Credential`` is saved or deleted in this
+process. Other processes pick up changes once the cache TTL expires.
+
+:func:`resolve_twilio_credentials` is a cached version of
+:func:`django_twilio.utils.discover_twilio_credentials`, for code that looks
+up a user's credentials on every outbound request. It shares that cache, and
+remembers the environment/settings fallback until :func:`reset` is called
+(which happens when a ``TWILIO_*`` setting changes).
+"""
+
+import os
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import LRUCache, MISSING
+from .models import Credential
+
+
+DEFAULT_CACHE_SIZE = 1000
+DEFAULT_CACHE_TTL = 300
+
+SID = 'TWILIO_ACCOUNT_SID'
+AUTH = 'TWILIO_AUTH_TOKEN'
+
+_auth_tokens = MISSING
+_default_credentials = MISSING
+
+
+def get_cache():
+    """Return the credential cache for this process, or ``None`` if caching
+    has been disabled with ``DJANGO_TWILIO_CREDENTIAL_CACHE_SIZE = 0``.
+    """
+    global _auth_tokens
+    if _auth_tokens is MISSING:
+        size = getattr(
+            settings, 'DJANGO_TWILIO_CREDENTIAL_CACHE_SIZE',
+            DEFAULT_CACHE_SIZE)
+        ttl = getattr(
+            settings, 'DJANGO_TWILIO_CREDENTIAL_CACHE_TTL', DEFAULT_CACHE_TTL)
+        _auth_tokens = LRUCache(size, ttl) if size else None
+    return _auth_tokens
+
+
+def reset():
+    """Drop the credential cache so that it is rebuilt from the current
+    settings on next use.
+    """
+    global _auth_tokens, _default_credentials
+    _auth_tokens = _default_credentials = MISSING
+
+
+def clear_cache():
+    """Forget every cached credential lookup."""
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def get_auth_token(account_sid):
+    """Return the auth token of the :class:`django_twilio.models.Credential`
+    for ``account_sid``, or ``None`` if there isn't one.
+    """
+    cache = get_cache()
+    if cache is None:
+        return _query_auth_token(account_sid)
+
+    auth_token = cache.get(account_sid, MISSING)
+    if auth_token is MISSING:
+        generation = cache.generation
+        auth_token = _query_auth_token(account_sid)
+        cache.set(account_sid, auth_token, generation=generation)
+    return auth_token
+
+
+async def aget_auth_token(account_sid):
+    """Async version of :func:`get_auth_token`."""
+    cache = get_cache()
+    if cache is None:
+        return await _aquery_auth_token(account_sid)
+
+    auth_token = cache.get(account_sid, MISSING)
+    if auth_token is MISSING:
+        generation = cache.generation
+        auth_token = await _aquery_auth_token(account_sid)
+        cache.set(account_sid, auth_token, generation=generation)
+    return auth_token
+
+
+def resolve_twilio_credentials(user=None):
+    """Return the ``(account_sid, auth_token)`` to use for ``user``, the way
+    :func:`django_twilio.utils.discover_twilio_credentials` does, from the
+    cache when possible.
+
+    The :class:`django_twilio.models.Credential` of ``user`` is looked up
+    with at most one query, and cached by user id. Without a ``user``, or if
+    they have no ``Credential``, the ``TWILIO_ACCOUNT_SID`` and
+    ``TWILIO_AUTH_TOKEN`` environment variables or settings are used.
+
+    :raises AttributeError: If no credentials can be found.
+    """
+    user_id = getattr(user, 'pk', None) if user else None
+    if user_id is not None:
+        key = ('user', user_id)
+        cache = get_cache()
+        if cache is None:
+            credentials = _query_user_credentials(user_id)
+        else:
+            credentials = cache.get(key, MISSING)
+            if credentials is MISSING:
+                generation = cache.generation
+                credentials = _query_user_credentials(user_id)
+                cache.set(key, credentials, generation=generation)
+        if credentials is not None:
+            return credentials
+    return get_default_credentials()
+
+
+async def aresolve_twilio_credentials(user=None):
+    """Async version of :func:`resolve_twilio_credentials`."""
+    user_id = getattr(user, 'pk', None) if user else None
+    if user_id is not None:
+        key = ('user', user_id)
+        cache = get_cache()
+        if cache is None:
+            credentials = await _aquery_user_credentials(user_id)
+        else:
+            credentials = cache.get(key, MISSING)
+            if credentials is MISSING:
+                generation = cache.generation
+                credentials = await _aquery_user_credentials(user_id)
+                cache.set(key, credentials, generation=generation)
+        if credentials is not None:
+            return credentials
+    return get_default_credentials()
+
+
+def get_default_credentials():
+    """Return the ``(account_sid, auth_token)`` from the environment, or
+    failing that the settings, reading them only once.
+
+    :raises AttributeError: If neither has both values.
+    """
+    global _default_credentials
+    if _default_credentials is MISSING:
+        if SID in os.environ and AUTH in os.environ:
+            _default_credentials = os.environ[SID], os.environ[AUTH]
+        elif hasattr(settings, SID) and hasattr(settings, AUTH):
+            _default_credentials = (
+                settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        else:
+            # Not cached, so credentials added later are found.
+            raise AttributeError(
+                "Could not find {sid} or {auth} in environment variables, "
+                "User credentials, or django project settings.".format(
+                    sid=SID,
+                    auth=AUTH,
+                )
+            )
+    return _default_credentials
+
+
+def _user_credentials_queryset(user_id):
+    # Credential.user is one-to-one, so there is at most one row.
+    return (
+        Credential.objects
+        .filter(user=user_id)
+        .values_list('account_sid', 'auth_token')[:1]
+    )
+
+
+def _query_user_credentials(user_id):
+    for credentials in _user_credentials_queryset(user_id):
+        return credentials
+    return None
+
+
+if django.VERSION >= (4, 1):
+    async def _aquery_user_credentials(user_id):
+        async for credentials in _user_credentials_queryset(user_id):
+            return credentials
+        return None
+else:
+    _aquery_user_credentials = sync_to_async(_query_user_credentials)
+
+
+def _auth_token_queryset(account_sid):
+    return (
+        Credential.objects
+        .filter(account_sid=account_sid)
+        .order_by('pk')
+        .values_list('auth_token', flat=True)
+    )
+
+
+def _query_auth_token(account_sid):
+    return _auth_token_queryset(account_sid).first()
+
+
+if django.VERSION >= (4, 1):
+    async def _aquery_auth_token(account_sid):
+        return await _auth_token_queryset(account_sid).afirst()
+else:
+    _aquery_auth_token = sync_to_async(_query_auth_token)
@@ -4,21 +4,40 @@
 Useful decorators.
 """
 
-from functools import wraps
+import hashlib
+from functools import partial, wraps
+
+try:
+    from asgiref.sync import iscoroutinefunction
+except ImportError:  # asgiref < 3.6
+    from asyncio import iscoroutinefunction
 
 from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control)
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.http import (
     HttpRequest, HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed)
 
 from twilio.twiml import TwiML as Verb
-from twilio.request_validator import RequestValidator
 
-from .settings import TWILIO_AUTH_TOKEN
-from .utils import get_blacklisted_response
+from .credentials import aget_auth_token, get_auth_token
+from .idempotency import (
+    aclaim_or_wait, claim_or_wait, get_idempotency_key, get_store, to_entry)
+from .request import get_params
+from .settings import get_webhook_settings
+from .timing import StageTimer
+from .twiml import get_response_cache, render
+from .utils import (
+    aget_blacklisted_response, aget_rate_limited_response,
+    get_blacklisted_response, get_rate_limited_response,
+)
+from .validator import get_validator
 
 
-def twilio_view(f):
+def twilio_view(f=None, multi_tenant=False, idempotent=False,
+                rate_limit=True):
     """
     This decorator provides several helpful shortcuts for writing Twilio views.
 
@@ -32,6 +51,10 @@ def twilio_view(f):
         - It enforces the blacklist. If you've got any ``Caller``s who are
           blacklisted, any requests from them will be rejected.
 
+        - It enforces ``DJANGO_TWILIO_RATE_LIMIT``, if set: callers over the
+          limit are rejected the same way (see
+          :mod:`django_twilio.ratelimit`).
+
         - It allows your view to (optionally) return TwiML to pass back to
           Twilio's servers instead of building an ``HttpResponse`` object
           manually.
@@ -43,6 +66,14 @@ def twilio_view(f):
             The forgery protection checks ONLY happen if ``settings.DEBUG =
             False`` (aka, your site is in production).
 
+        - It can time each stage of a request, to help you find out why a
+          webhook is slow, and keep metrics of your webhook traffic. See
+          :mod:`django_twilio.timing` and :mod:`django_twilio.metrics`.
+
+        - It supports ``async def`` views. Those are wrapped in a coroutine
+          that looks the blacklist up through Django's async ORM, so they run
+          natively under ASGI without a thread hop.
+
     Usage::
 
         from twilio import twiml
@@ -52,65 +83,323 @@ def twilio_view(f):
             r = twiml.Response()
             r.message('Thanks for the SMS message!')
             return r
+
+    Pass ``multi_tenant=True`` to validate requests for any of your Twilio
+    subaccounts. The request signature is then checked against the auth token
+    of the :class:`django_twilio.models.Credential` whose ``account_sid``
+    matches the ``AccountSid`` Twilio sent::
+
+        @twilio_view(multi_tenant=True)
+        def my_view(request):
+            ...
+
+    Pass ``idempotent=True`` to run your view only once per webhook delivery.
+    Twilio retries webhooks that time out; a retry with the same
+    ``CallSid``/``MessageSid``/``SmsSid`` and signature gets the stored
+    response of the first delivery instead (see
+    :mod:`django_twilio.idempotency`)::
+
+        @twilio_view(idempotent=True)
+        def my_expensive_view(request):
+            ...
+
+    Pass ``rate_limit=False`` to leave the view out of
+    ``DJANGO_TWILIO_RATE_LIMIT``, for example for status callbacks, whose
+    ``From`` is your own number::
+
+        @twilio_view(rate_limit=False)
+        def my_status_callback(request):
+            ...
     """
-    @csrf_exempt
-    @wraps(f)
-    def decorator(request_or_self, *args, **kwargs):
-        # When using `method_decorator` on class methods,
-        # I haven't been able to get any class views.
-        # i would like more research before just taking the check out.
-        class_based_view = not isinstance(request_or_self, HttpRequest)
-        if not class_based_view:
-            request = request_or_self
-        else:
-            assert len(args) >= 1
-            request = args[0]
-
-        # Turn off Twilio authentication when explicitly requested, or
-        # in debug mode. Otherwise things do not work properly. For
-        # more information, see the docs.
-        use_forgery_protection = getattr(
-            settings,
-            'DJANGO_TWILIO_FORGERY_PROTECTION',
-            not settings.DEBUG,
-        )
-        if use_forgery_protection:
-
-            if request.method not in ['GET', 'POST']:
-                return HttpResponseNotAllowed(request.method)
-
-            # Forgery check
+    if f is None:
+        return partial(
+            twilio_view, multi_tenant=multi_tenant, idempotent=idempotent,
+            rate_limit=rate_limit)
+
+    if iscoroutinefunction(f):
+        async def ahandle(request_or_self, request, webhook_settings, timer,
+                          args, kwargs):
+            # TwilioWebhookMiddleware has already checked this request.
+            checked = getattr(request, '_twilio_checked', False)
+
+            if webhook_settings.forgery_protection and not checked:
+                if multi_tenant:
+                    validator = await _aget_tenant_validator(
+                        request, webhook_settings)
+                else:
+                    validator = webhook_settings.validator
+                forbidden_resp = _check_forgery(request, validator)
+                if timer is not None:
+                    timer.mark('forgery')
+                if forbidden_resp:
+                    return forbidden_resp
+
+            if webhook_settings.blacklist_check and not checked:
+                blacklisted_resp = await aget_blacklisted_response(request)
+                if timer is not None:
+                    timer.mark('blacklist')
+                if blacklisted_resp:
+                    return blacklisted_resp
+
+            if webhook_settings.rate_limit and rate_limit and not checked:
+                rate_limited_resp = await aget_rate_limited_response(request)
+                if timer is not None:
+                    timer.mark('ratelimit')
+                if rate_limited_resp:
+                    return rate_limited_resp
+
+            key = None
+            if idempotent:
+                store = get_store()
+                key = get_idempotency_key(request)
+                if key is not None:
+                    duplicate_resp = await aclaim_or_wait(store, key)
+                    if timer is not None:
+                        timer.mark('idempotency')
+                    if duplicate_resp is not None:
+                        return duplicate_resp
+
             try:
-                validator = RequestValidator(TWILIO_AUTH_TOKEN)
-                url = request.build_absolute_uri()
-                signature = request.headers['x-twilio-signature']
-            except (AttributeError, KeyError):
-                return HttpResponseForbidden()
-
-            if request.method == 'POST':
-                if not validator.validate(url, request.POST, signature):
-                    return HttpResponseForbidden()
-            if request.method == 'GET':
-                if not validator.validate(url, request.GET, signature):
-                    return HttpResponseForbidden()
-
-        # Blacklist check, by default is true
-        check_blacklist = getattr(
-            settings,
-            'DJANGO_TWILIO_BLACKLIST_CHECK',
-            True
-        )
-        if check_blacklist:
+                response = await f(request_or_self, *args, **kwargs)
+                if timer is not None:
+                    timer.mark('view')
+                response = _to_http_response(response)
+            except BaseException:
+                if key is not None:
+                    await store.arelease(key)
+                raise
+
+            if key is not None:
+                entry = to_entry(response)
+                if entry is not None:
+                    await store.aset(key, entry)
+                else:
+                    await store.arelease(key)
+            if timer is not None:
+                timer.mark('render')
+            return response
+
+        @wraps(f)
+        async def async_decorator(request_or_self, *args, **kwargs):
+            request = _get_request(request_or_self, args)
+            webhook_settings = get_webhook_settings()
+            if not webhook_settings.instrument:
+                return await ahandle(
+                    request_or_self, request, webhook_settings, None,
+                    args, kwargs)
+
+            timer = StageTimer()
+            response = await ahandle(
+                request_or_self, request, webhook_settings, timer,
+                args, kwargs)
+            return timer.finish(f, request, response, webhook_settings)
+
+        # Equivalent to @csrf_exempt, which only learned to wrap coroutine
+        # functions in Django 5.0.
+        async_decorator.csrf_exempt = True
+        return async_decorator
+
+    def handle(request_or_self, request, webhook_settings, timer, args,
+               kwargs):
+        # TwilioWebhookMiddleware has already checked this request.
+        checked = getattr(request, '_twilio_checked', False)
+
+        if webhook_settings.forgery_protection and not checked:
+            if multi_tenant:
+                validator = _get_tenant_validator(request, webhook_settings)
+            else:
+                validator = webhook_settings.validator
+            forbidden_resp = _check_forgery(request, validator)
+            if timer is not None:
+                timer.mark('forgery')
+            if forbidden_resp:
+                return forbidden_resp
+
+        if webhook_settings.blacklist_check and not checked:
             blacklisted_resp = get_blacklisted_response(request)
+            if timer is not None:
+                timer.mark('blacklist')
             if blacklisted_resp:
                 return blacklisted_resp
 
-        response = f(request_or_self, *args, **kwargs)
+        if webhook_settings.rate_limit and rate_limit and not checked:
+            rate_limited_resp = get_rate_limited_response(request)
+            if timer is not None:
+                timer.mark('ratelimit')
+            if rate_limited_resp:
+                return rate_limited_resp
 
-        if isinstance(response, (str, bytes)):
-            return HttpResponse(response, content_type='application/xml')
-        elif isinstance(response, Verb):
-            return HttpResponse(str(response), content_type='application/xml')
-        else:
-            return response
+        key = None
+        if idempotent:
+            store = get_store()
+            key = get_idempotency_key(request)
+            if key is not None:
+                duplicate_resp = claim_or_wait(store, key)
+                if timer is not None:
+                    timer.mark('idempotency')
+                if duplicate_resp is not None:
+                    return duplicate_resp
+
+        try:
+            response = f(request_or_self, *args, **kwargs)
+            if timer is not None:
+                timer.mark('view')
+            response = _to_http_response(response)
+        except BaseException:
+            if key is not None:
+                store.release(key)
+            raise
+
+        if key is not None:
+            entry = to_entry(response)
+            if entry is not None:
+                store.set(key, entry)
+            else:
+                store.release(key)
+        if timer is not None:
+            timer.mark('render')
+        return response
+
+    @csrf_exempt
+    @wraps(f)
+    def decorator(request_or_self, *args, **kwargs):
+        request = _get_request(request_or_self, args)
+        webhook_settings = get_webhook_settings()
+        if not webhook_settings.instrument:
+            return handle(
+                request_or_self, request, webhook_settings, None, args, kwargs)
+
+        timer = StageTimer()
+        response = handle(
+            request_or_self, request, webhook_settings, timer, args, kwargs)
+        return timer.finish(f, request, response, webhook_settings)
     return decorator
+
+
+def cache_twiml(f):
+    """
+    Render the TwiML returned by ``f`` once for each set of arguments, and
+    serve the stored bytes afterwards.
+
+    This is meant for views whose response only depends on their URLconf
+    arguments, like the ones in :mod:`django_twilio.views`, so it must be
+    applied below :func:`twilio_view`::
+
+        @twilio_view
+        @cache_twiml
+        def menu(request, text):
+            r = VoiceResponse()
+            r.say(text)
+            return r
+
+    Responses to GET requests carry an ``ETag`` header, and a
+    ``Cache-Control`` header if ``DJANGO_TWILIO_TWIML_CACHE_MAX_AGE`` is set,
+    so that clients can cache them as well.
+    """
+    @wraps(f)
+    def decorator(request, *args, **kwargs):
+        cache = get_response_cache()
+        key = (f, args, tuple(sorted(kwargs.items())))
+        try:
+            entry = cache.get(key) if cache is not None else None
+        except TypeError:
+            # Unhashable arguments (a list of media URLs, for example) just
+            # aren't cached.
+            cache = None
+            entry = None
+
+        if entry is None:
+            response = f(request, *args, **kwargs)
+            if not isinstance(response, (str, bytes, Verb)):
+                return response
+            content = _to_http_response(response).content
+            entry = (content, quote_etag(hashlib.md5(content).hexdigest()))
+            if cache is not None:
+                cache.set(key, entry)
+
+        content, etag = entry
+        response = HttpResponse(content, content_type='application/xml')
+        if request.method in ('GET', 'HEAD'):
+            response['ETag'] = etag
+            max_age = getattr(
+                settings, 'DJANGO_TWILIO_TWIML_CACHE_MAX_AGE', None)
+            if max_age is not None:
+                patch_cache_control(response, max_age=max_age)
+            response = get_conditional_response(
+                request, etag=etag, response=response)
+        return response
+    return decorator
+
+
+def _get_request(request_or_self, args):
+    # When using `method_decorator` on class methods,
+    # I haven't been able to get any class views.
+    # i would like more research before just taking the check out.
+    class_based_view = not isinstance(request_or_self, HttpRequest)
+    if not class_based_view:
+        return request_or_self
+    else:
+        assert len(args) >= 1
+        return args[0]
+
+
+def _check_forgery(request, validator):
+    """Return an error response if ``request`` wasn't signed by Twilio,
+    ``None`` otherwise.
+
+    :param validator: The validator to check the request signature with, or
+        ``None`` if we have no auth token to check it against.
+    """
+    if request.method not in ['GET', 'POST']:
+        return HttpResponseNotAllowed(request.method)
+
+    # Forgery check
+    try:
+        url = request.build_absolute_uri()
+        signature = request.headers['x-twilio-signature']
+    except (AttributeError, KeyError):
+        return HttpResponseForbidden()
+    if validator is None:
+        return HttpResponseForbidden()
+
+    if not validator.validate(url, get_params(request), signature):
+        return HttpResponseForbidden()
+
+    return None
+
+
+def _get_account_sid(request):
+    return get_params(request).get('AccountSid')
+
+
+def _get_tenant_validator(request, webhook_settings):
+    """Return the validator for the account that ``request`` claims to be
+    for, or ``None`` if we don't know that account.
+    """
+    account_sid = _get_account_sid(request)
+    if not account_sid:
+        return None
+    if account_sid == webhook_settings.account_sid:
+        return webhook_settings.validator
+    auth_token = get_auth_token(account_sid)
+    return get_validator(auth_token) if auth_token else None
+
+
+async def _aget_tenant_validator(request, webhook_settings):
+    """Async version of :func:`_get_tenant_validator`."""
+    account_sid = _get_account_sid(request)
+    if not account_sid:
+        return None
+    if account_sid == webhook_settings.account_sid:
+        return webhook_settings.validator
+    auth_token = await aget_auth_token(account_sid)
+    return get_validator(auth_token) if auth_token else None
+
+
+def _to_http_response(response):
+    if isinstance(response, (str, bytes)):
+        return HttpResponse(response, content_type='application/xml')
+    elif isinstance(response, Verb):
+        return HttpResponse(render(response), content_type='application/xml')
+    else:
+        return response
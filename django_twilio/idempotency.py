@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deduplication of webhooks that Twilio delivers more than once.
+
+When a webhook times out, Twilio retries it with the same ``CallSid`` (or
+``MessageSid``/``SmsSid``) and the same signature. Views decorated with
+``twilio_view(idempotent=True)`` store their rendered response under that pair
+and hand the stored bytes back to any retry, without running the view again.
+
+A delivery claims its key before the view runs. A retry arriving while the
+claim is held waits up to ``DJANGO_TWILIO_IDEMPOTENCY_WAIT`` seconds for the
+first delivery's response rather than running the view a second time, and is
+answered with a ``503`` if the response isn't ready by then. The claim is
+released if the view fails or its response can't be stored, so the next retry
+runs the view again.
+
+Responses are kept in the store named by ``DJANGO_TWILIO_IDEMPOTENCY_STORE``:
+:class:`LocMemResponseStore` (the default) keeps them in a per-process LRU,
+while :class:`CacheResponseStore` shares them between processes through a
+Django cache backend.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from .cache import LRUCache
+from .request import get_params
+
+
+DEFAULT_STORE = 'django_twilio.idempotency.LocMemResponseStore'
+DEFAULT_TIMEOUT = 3600
+DEFAULT_CLAIM_TIMEOUT = 60
+DEFAULT_WAIT = 10
+
+# How often, in seconds, a retry checks whether the delivery holding the
+# claim has stored its response.
+POLL_INTERVAL = 0.05
+
+# What CacheResponseStore keeps under a claimed key until the response is
+# stored.
+PENDING = 'django_twilio:idempotency:pending'
+
+SID_PARAMETERS = ('CallSid', 'MessageSid', 'SmsSid')
+
+_store = None
+
+
+class LocMemResponseStore(object):
+    """
+    Keeps responses in a per-process LRU cache.
+
+    :param int maxsize: The maximum number of responses to keep.
+    :param float timeout: The number of seconds to keep each response.
+    :param float claim_timeout: The number of seconds a claim lasts if its
+        response is never stored or released.
+    """
+
+    def __init__(self, maxsize=1000, timeout=DEFAULT_TIMEOUT,
+                 claim_timeout=DEFAULT_CLAIM_TIMEOUT):
+        self.claim_timeout = claim_timeout
+        self._cache = LRUCache(maxsize, timeout)
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, entry):
+        self._cache.set(key, entry)
+        self.release(key)
+
+    def claim(self, key):
+        """Claim ``key``, returning ``False`` if it already has a response or
+        an unexpired claim.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._cache.get(key) is not None:
+                return False
+            expires = self._claims.get(key)
+            if expires is not None and expires > now:
+                return False
+            self._claims[key] = now + self.claim_timeout
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._claims.pop(key, None)
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, entry):
+        self.set(key, entry)
+
+    async def aclaim(self, key):
+        return self.claim(key)
+
+    async def arelease(self, key):
+        self.release(key)
+
+
+class CacheResponseStore(object):
+    """
+    Keeps responses in a Django cache backend, so that every process serving
+    your webhooks sees them.
+
+    :param str alias: The ``CACHES`` alias to use.
+    :param float timeout: The number of seconds to keep each response.
+    :param str key_prefix: Prepended to every cache key.
+    :param float claim_timeout: The number of seconds a claim lasts if its
+        response is never stored or released.
+
+    Claims are taken with ``cache.add``, so they only hold across processes
+    with backends whose ``add`` is atomic (Memcached, Redis, the database
+    cache).
+    """
+
+    def __init__(self, alias='default', timeout=DEFAULT_TIMEOUT,
+                 key_prefix='django_twilio:idempotency:',
+                 claim_timeout=DEFAULT_CLAIM_TIMEOUT):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.claim_timeout = claim_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        entry = self.cache.get(self.key_prefix + key)
+        return None if entry == PENDING else entry
+
+    def set(self, key, entry):
+        self.cache.set(self.key_prefix + key, entry, self.timeout)
+
+    def claim(self, key):
+        return self.cache.add(
+            self.key_prefix + key, PENDING, self.claim_timeout)
+
+    def release(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+    async def aget(self, key):
+        entry = await self.cache.aget(self.key_prefix + key)
+        return None if entry == PENDING else entry
+
+    async def aset(self, key, entry):
+        await self.cache.aset(self.key_prefix + key, entry, self.timeout)
+
+    async def aclaim(self, key):
+        return await self.cache.aadd(
+            self.key_prefix + key, PENDING, self.claim_timeout)
+
+    async def arelease(self, key):
+        await self.cache.adelete(self.key_prefix + key)
+
+
+def get_store():
+    """Return the response store configured by
+    ``DJANGO_TWILIO_IDEMPOTENCY_STORE`` and
+    ``DJANGO_TWILIO_IDEMPOTENCY_STORE_OPTIONS``.
+    """
+    global _store
+    if _store is None:
+        store_class = import_string(getattr(
+            settings, 'DJANGO_TWILIO_IDEMPOTENCY_STORE', DEFAULT_STORE))
+        options = getattr(
+            settings, 'DJANGO_TWILIO_IDEMPOTENCY_STORE_OPTIONS', {})
+        _store = store_class(**options)
+    return _store
+
+
+def reset_store():
+    global _store
+    _store = None
+
+
+def get_idempotency_key(request):
+    """Return the key that identifies deliveries of the same webhook, or
+    ``None`` if ``request`` has no call or message SID to key on.
+    """
+    data = get_params(request)
+    for name in SID_PARAMETERS:
+        sid = data.get(name)
+        if sid:
+            break
+    else:
+        return None
+
+    signature = request.headers.get('x-twilio-signature')
+    if not signature:
+        # Without forgery protection there may be no signature, so key on
+        # what it would have covered instead.
+        digest = hashlib.sha1(request.get_full_path().encode('utf-8'))
+        for key, values in sorted(data.lists()):
+            for value in values:
+                digest.update(b'\0' + key.encode('utf-8'))
+                digest.update(b'\0' + value.encode('utf-8'))
+        signature = digest.hexdigest()
+    return '{sid}:{signature}'.format(sid=sid, signature=signature)
+
+
+def claim_or_wait(store, key):
+    """Claim ``key`` in ``store`` for this delivery.
+
+    Returns ``None`` once the key is claimed: the view should run, and its
+    response be stored (or the claim released). Otherwise returns the response
+    to answer this delivery with: the one stored for ``key``, waiting up to
+    ``DJANGO_TWILIO_IDEMPOTENCY_WAIT`` seconds for the delivery holding the
+    claim to store it, or a ``503`` if it doesn't.
+    """
+    deadline = None
+    while not store.claim(key):
+        entry = store.get(key)
+        if entry is not None:
+            return from_entry(entry)
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + getattr(
+                settings, 'DJANGO_TWILIO_IDEMPOTENCY_WAIT', DEFAULT_WAIT)
+        if now >= deadline:
+            return HttpResponse(status=503)
+        time.sleep(POLL_INTERVAL)
+    return None
+
+
+async def aclaim_or_wait(store, key):
+    """Async version of :func:`claim_or_wait`."""
+    deadline = None
+    while not await store.aclaim(key):
+        entry = await store.aget(key)
+        if entry is not None:
+            return from_entry(entry)
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + getattr(
+                settings, 'DJANGO_TWILIO_IDEMPOTENCY_WAIT', DEFAULT_WAIT)
+        if now >= deadline:
+            return HttpResponse(status=503)
+        await asyncio.sleep(POLL_INTERVAL)
+    return None
+
+
+def to_entry(response):
+    """Return what to store for ``response``, or ``None`` if it shouldn't be
+    replayed to retries.
+    """
+    if response.status_code != 200 or response.streaming:
+        return None
+    return (response.status_code, response['Content-Type'], response.content)
+
+
+def from_entry(entry):
+    """Rebuild a response from a stored entry."""
+    status_code, content_type, content = entry
+    return HttpResponse(content, status=status_code, content_type=content_type)
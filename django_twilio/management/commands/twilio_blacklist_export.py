@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from django_twilio.models import Caller
+
+
+class Echo(object):
+    """A file-like object whose ``write`` returns what it's given, so a
+    ``csv.writer`` can format one row at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+class Command(BaseCommand):
+    help = (
+        'Write blacklisted callers to a CSV file that '
+        'twilio_blacklist_import can read back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            help='The CSV file to write. Defaults to standard output.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Export every caller, not only the blacklisted ones.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='The number of callers fetched from the database at a '
+                 'time. Defaults to 2000.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database to export from. Defaults to "default".',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        callers = Caller.objects.using(options['database'])
+        if not options['all']:
+            callers = callers.filter(blacklisted=True)
+        # iterator() streams rows from the database instead of loading the
+        # whole table into memory.
+        rows = (
+            callers
+            .order_by('pk')
+            .values_list('phone_number', 'blacklisted')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        path = options['output']
+        if path:
+            try:
+                f = open(path, 'w', newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError(
+                    'Could not open {path}: {error}'.format(
+                        path=path, error=e))
+            with f:
+                count = self.export(rows, csv.writer(f).writerow)
+            self.stdout.write(
+                'Exported {count} callers to {path}.'.format(
+                    count=count, path=path))
+        else:
+            writer = csv.writer(Echo())
+
+            def writerow(row):
+                self.stdout.write(writer.writerow(row), ending='')
+
+            self.export(rows, writerow)
+
+    def export(self, rows, writerow):
+        """Write a header and then every ``(phone_number, blacklisted)`` row,
+        returning the number of callers written.
+        """
+        writerow(('phone_number', 'blacklisted'))
+        count = 0
+        for phone_number, blacklisted in rows:
+            writerow((str(phone_number), 'true' if blacklisted else 'false'))
+            count += 1
+        return count
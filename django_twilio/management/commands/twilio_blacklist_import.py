@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import sys
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from django_twilio import blacklist
+from django_twilio.blacklist import normalize_phone_number, upsert_callers
+from django_twilio.models import Caller
+
+
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'f', 'no', 'n')
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update callers from a CSV file of phone numbers, such as '
+        'a do-not-call list. Numbers are blacklisted unless the file has a '
+        '"blacklisted" column saying otherwise.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='The CSV file to read, or "-" to read standard input.',
+        )
+        parser.add_argument(
+            '--column', default='phone_number',
+            help='The header of the column holding the phone numbers. '
+                 'Defaults to "phone_number".',
+        )
+        parser.add_argument(
+            '--no-header', action='store_true',
+            help='The file has no header row: phone numbers are read from '
+                 'the first column, and the second column, if any, says '
+                 'whether they are blacklisted.',
+        )
+        parser.add_argument(
+            '--region',
+            default=getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None),
+            help='The region numbers without a country code are dialled '
+                 'from. Defaults to the PHONENUMBER_DEFAULT_REGION setting.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='The number of callers written by each INSERT. Defaults '
+                 'to 1000.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=50000,
+            help='The number of rows imported in each transaction. Defaults '
+                 'to 50000.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database to import into. Defaults to "default".',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError(
+                '--batch-size and --chunk-size must be positive.')
+
+        path = options['path']
+        if path == '-':
+            imported, skipped = self.load(sys.stdin, options)
+        else:
+            try:
+                f = open(path, newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(
+                    'Could not open {path}: {error}'.format(
+                        path=path, error=e))
+            with f:
+                imported, skipped = self.load(f, options)
+
+        # bulk_create() doesn't send post_save, which is what usually keeps
+        # the blacklist cache up to date.
+        blacklist.clear_cache()
+
+        self.stdout.write(
+            'Imported {imported} callers, skipped {skipped} rows.'.format(
+                imported=imported, skipped=skipped))
+        if getattr(settings, 'DJANGO_TWILIO_BLACKLIST_SNAPSHOT', None):
+            self.stdout.write(
+                'Run twilio_blacklist_snapshot to update the blacklist '
+                'snapshot.')
+
+    def load(self, f, options):
+        """Import every row of the CSV file ``f``, returning the number of
+        callers imported and the number of rows skipped.
+        """
+        reader = csv.reader(f)
+        if options['no_header']:
+            number_index, blacklisted_index = 0, 1
+        else:
+            header = [name.strip() for name in next(reader, [])]
+            try:
+                number_index = header.index(options['column'])
+            except ValueError:
+                raise CommandError(
+                    'The file has no {column!r} column.'.format(
+                        column=options['column']))
+            try:
+                blacklisted_index = header.index('blacklisted')
+            except ValueError:
+                blacklisted_index = None
+
+        imported = skipped = 0
+        rows = enumerate(reader, start=1 if options['no_header'] else 2)
+        while True:
+            chunk = list(islice(rows, options['chunk_size']))
+            if not chunk:
+                return imported, skipped
+
+            # Later rows win, and no number may appear twice in one upsert.
+            numbers = {}
+            for line, row in chunk:
+                parsed = self.parse_row(
+                    row, number_index, blacklisted_index, options['region'])
+                if parsed is None:
+                    skipped += 1
+                    if options['verbosity'] >= 2:
+                        self.stderr.write(
+                            'Skipped line {line}: {row}'.format(
+                                line=line, row=','.join(row)))
+                else:
+                    phone_number, blacklisted = parsed
+                    numbers[phone_number] = blacklisted
+
+            callers = [
+                Caller(phone_number=phone_number, blacklisted=blacklisted)
+                for phone_number, blacklisted in numbers.items()
+            ]
+            with transaction.atomic(using=options['database']):
+                upsert_callers(
+                    callers, options['database'], options['batch_size'])
+            imported += len(callers)
+            if options['verbosity'] >= 2:
+                self.stdout.write(
+                    'Imported {count} callers.'.format(count=imported))
+
+    def parse_row(self, row, number_index, blacklisted_index, region):
+        """Return the ``(phone_number, blacklisted)`` of a CSV row, or
+        ``None`` if it isn't valid.
+        """
+        try:
+            phone_number = normalize_phone_number(row[number_index], region)
+        except IndexError:
+            return None
+        if phone_number is None:
+            return None
+
+        blacklisted = True
+        if blacklisted_index is not None and blacklisted_index < len(row):
+            value = row[blacklisted_index].strip().lower()
+            if value in FALSE_VALUES:
+                blacklisted = False
+            elif value and value not in TRUE_VALUES:
+                return None
+        return phone_number, blacklisted
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from django_twilio.models import BlacklistRule, Caller
+from django_twilio.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Write every blacklisted caller and active blacklist rule into the '
+        'memory-mapped blacklist snapshot read by django_twilio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            default=getattr(
+                settings, 'DJANGO_TWILIO_BLACKLIST_SNAPSHOT', None),
+            help='The snapshot file to write. Defaults to the '
+                 'DJANGO_TWILIO_BLACKLIST_SNAPSHOT setting.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        if not path:
+            raise CommandError(
+                'No output file given, and DJANGO_TWILIO_BLACKLIST_SNAPSHOT '
+                'is not set.')
+
+        phone_numbers = (
+            Caller.objects
+            .filter(blacklisted=True)
+            .values_list('phone_number', flat=True)
+            .iterator()
+        )
+        prefixes = BlacklistRule.objects.filter(
+            active=True).values_list('prefix', flat=True)
+        count = write_snapshot(path, phone_numbers, prefixes)
+        self.stdout.write(
+            'Wrote {count} blacklisted numbers to {path}.'.format(
+                count=count, path=path))
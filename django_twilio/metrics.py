@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-process metrics for webhook traffic.
+
+With ``DJANGO_TWILIO_METRICS = True``, ``twilio_view`` counts the requests it
+rejects and the responses it sends, and records how long each view took. The
+metrics can be served to Prometheus by
+:func:`django_twilio.views.metrics`.
+
+Each thread updates its own shard of every metric, so recording a sample
+never takes a lock; shards are merged when the metrics are read. When a
+thread exits, its shard is folded into the registry's totals, so servers
+that start a thread per connection don't keep a shard for each one. Counts
+are kept per process, like Django's other in-memory caches.
+"""
+
+import itertools
+import threading
+import weakref
+from bisect import bisect_left
+
+
+#: The upper bounds, in seconds, of the buckets of :data:`VIEW_DURATION`.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+class Registry(object):
+    """
+    A collection of metrics, recorded into per-thread shards.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        # The shards of live threads, and the merged samples of the threads
+        # that have exited.
+        self._shards = {}
+        self._retired = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create and register a :class:`Counter`."""
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        """Create and register a :class:`Histogram`."""
+        return self._register(
+            Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(
+                    'A metric named {!r} already exists.'.format(metric.name))
+            self._metrics.append(metric)
+        return metric
+
+    def shard(self):
+        """Return the calling thread's shard, a dict of samples keyed by
+        ``(metric, labelvalues)``.
+        """
+        try:
+            return self._local.owner.shard
+        except AttributeError:
+            owner = self._local.owner = _ShardOwner()
+            shard = owner.shard = {}
+            shard_id = next(self._ids)
+            with self._lock:
+                self._shards[shard_id] = shard
+            # The thread-local owner goes away when the thread exits.
+            weakref.finalize(owner, self._retire, shard_id)
+            return shard
+
+    def _retire(self, shard_id):
+        with self._lock:
+            shard = self._shards.pop(shard_id)
+            for key, value in shard.items():
+                self._retired[key] = key[0].merge(
+                    self._retired.get(key), value)
+
+    def collect(self):
+        """Return ``(metric, samples)`` for every registered metric, where
+        ``samples`` maps label values to the merged value of every shard.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+            # Retired values are replaced rather than updated, so a shallow
+            # copy is enough.
+            shards = list(self._shards.values()) + [dict(self._retired)]
+
+        merged = {metric: {} for metric in metrics}
+        for shard in shards:
+            # Copying a dict doesn't release the GIL, so the owning thread
+            # can't resize it underneath us.
+            for (metric, labelvalues), value in shard.copy().items():
+                samples = merged[metric]
+                if labelvalues in samples:
+                    samples[labelvalues] = metric.merge(
+                        samples[labelvalues], value)
+                else:
+                    samples[labelvalues] = metric.merge(None, value)
+        return [(metric, merged[metric]) for metric in metrics]
+
+    def clear(self):
+        """Forget every recorded sample."""
+        with self._lock:
+            for shard in self._shards.values():
+                shard.clear()
+            self._retired.clear()
+
+
+class _ShardOwner(object):
+    # Kept in a thread-local, so that it dies with its thread; a dict can't
+    # be weakly referenced.
+    __slots__ = ('shard', '__weakref__')
+
+
+class Counter(object):
+    """
+    A value that only goes up.
+    """
+
+    type = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labelvalues, amount=1):
+        """Add ``amount`` to the counter for ``labelvalues``."""
+        shard = self.registry.shard()
+        key = (self, labelvalues)
+        shard[key] = shard.get(key, 0) + amount
+
+    def merge(self, total, value):
+        return value if total is None else total + value
+
+    def samples(self, labelvalues, value):
+        yield self.name, self.labelnames, labelvalues, value
+
+
+class Histogram(object):
+    """
+    Counts observations in fixed buckets, as well as their count and sum.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        """Record ``value`` in the histogram for ``labelvalues``."""
+        shard = self.registry.shard()
+        key = (self, labelvalues)
+        try:
+            counts = shard[key]
+        except KeyError:
+            # One count per bucket, then one for +Inf, then the sum.
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def samples(self, labelvalues, value):
+        labelnames = self.labelnames + ('le',)
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            yield (self.name + '_bucket', labelnames,
+                   labelvalues + (_format_value(bound),), cumulative)
+        count = cumulative + value[-2]
+        yield (self.name + '_bucket', labelnames,
+               labelvalues + ('+Inf',), count)
+        yield self.name + '_sum', self.labelnames, labelvalues, value[-1]
+        yield self.name + '_count', self.labelnames, labelvalues, count
+
+
+def generate_text(registry):
+    """Return every metric in ``registry`` in the Prometheus text exposition
+    format.
+    """
+    lines = []
+    for metric, samples in registry.collect():
+        lines.append('# HELP {} {}'.format(
+            metric.name, _escape(metric.documentation, help=True)))
+        lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+        for labelvalues in sorted(samples):
+            for name, labelnames, values, value in metric.samples(
+                    labelvalues, samples[labelvalues]):
+                if labelnames:
+                    labels = ','.join(
+                        '{}="{}"'.format(k, _escape(v))
+                        for k, v in zip(labelnames, values))
+                    name = '{}{{{}}}'.format(name, labels)
+                lines.append('{} {}'.format(name, _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value, help=False):
+    value = str(value).replace('\\', r'\\').replace('\n', r'\n')
+    return value if help else value.replace('"', r'\"')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+REGISTRY = Registry()
+
+FORGED_REQUESTS = REGISTRY.counter(
+    'django_twilio_forged_requests_total',
+    'Requests rejected because their Twilio signature was missing or '
+    'invalid.',
+)
+BLACKLISTED_REQUESTS = REGISTRY.counter(
+    'django_twilio_blacklisted_requests_total',
+    'Requests rejected because the caller is blacklisted.',
+    ('request_type',),
+)
+RATE_LIMITED_REQUESTS = REGISTRY.counter(
+    'django_twilio_rate_limited_requests_total',
+    'Requests rejected because the caller is over the rate limit.',
+    ('request_type',),
+)
+RESPONSES = REGISTRY.counter(
+    'django_twilio_responses_total',
+    'Responses sent by twilio_view.',
+    ('request_type', 'status'),
+)
+VIEW_DURATION = REGISTRY.histogram(
+    'django_twilio_view_duration_seconds',
+    'Time spent running the view, by URL name.',
+    ('view',),
+)
+
+
+def record_request(view, request, request_type, response, timings):
+    """Record the metrics of one request handled by ``twilio_view``, or
+    rejected by ``TwilioWebhookMiddleware``.
+
+    :param view: The view function that handled ``request``, or the
+        middleware class that rejected it.
+    :param dict timings: The nanoseconds spent in each stage, as recorded by
+        :class:`django_twilio.timing.StageTimer`.
+    """
+    if 'view' in timings:
+        VIEW_DURATION.observe(
+            timings['view'] / 1e9, _get_view_name(view, request))
+    elif timings:
+        # The request was rejected by the last stage that ran.
+        rejected_by = next(reversed(timings))
+        if rejected_by == 'forgery' and response.status_code == 403:
+            FORGED_REQUESTS.inc()
+        elif rejected_by == 'blacklist':
+            BLACKLISTED_REQUESTS.inc(request_type)
+        elif rejected_by == 'ratelimit':
+            RATE_LIMITED_REQUESTS.inc(request_type)
+    RESPONSES.inc(request_type, str(response.status_code))
+
+
+def _get_view_name(view, request):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.url_name:
+        return match.view_name
+    return '{}.{}'.format(view.__module__, view.__qualname__)
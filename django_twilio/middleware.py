@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Middleware that handles every Twilio webhook under a set of URL prefixes.
+"""
+
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+from .decorators import _check_forgery, _get_tenant_validator
+from .request import decompose, get_params, is_status_callback
+from .settings import get_webhook_settings
+from .timing import StageTimer
+from .utils import get_blacklisted_response, get_rate_limited_response
+
+
+class TwilioWebhookMiddleware(MiddlewareMixin):
+    """
+    Does what :func:`django_twilio.decorators.twilio_view` does before it
+    calls your view, once, for every request whose path starts with one of
+    ``DJANGO_TWILIO_WEBHOOK_PREFIXES``:
+
+        - It rejects requests that weren't signed by Twilio (when forgery
+          protection is on), requests from blacklisted callers, and requests
+          over the rate limit (when ``DJANGO_TWILIO_RATE_LIMIT`` is set).
+          Status callbacks aren't counted against the rate limit, since
+          their ``From`` is one of your own numbers.
+
+        - It exempts the request from CSRF checks.
+
+        - It sets ``request.twilio`` to a
+          :class:`django_twilio.request.TwilioRequest` of the request's
+          parameters, which :func:`django_twilio.request.decompose` returns
+          from then on.
+
+    ``twilio_view`` doesn't check a request again once this middleware has,
+    so views under those prefixes, class-based or not, don't need to be
+    decorated at all. Set ``DJANGO_TWILIO_WEBHOOK_MULTI_TENANT = True`` to
+    validate requests the way ``twilio_view(multi_tenant=True)`` does.
+
+    With ``DJANGO_TWILIO_TIMING`` or ``DJANGO_TWILIO_METRICS`` on, the
+    requests it rejects are timed and counted like the ones ``twilio_view``
+    rejects, with this class as the sender of ``webhook_timed``.
+    """
+
+    def __init__(self, get_response):
+        prefixes = getattr(settings, 'DJANGO_TWILIO_WEBHOOK_PREFIXES', ())
+        if not prefixes:
+            raise MiddlewareNotUsed()
+        super(TwilioWebhookMiddleware, self).__init__(get_response)
+        # Try longer prefixes first, so a regex alternation picks the most
+        # specific one.
+        self.match_prefix = re.compile('|'.join(
+            re.escape(prefix)
+            for prefix in sorted(prefixes, key=len, reverse=True)
+        )).match
+        self.multi_tenant = getattr(
+            settings, 'DJANGO_TWILIO_WEBHOOK_MULTI_TENANT', False)
+
+    def process_request(self, request):
+        if not self.match_prefix(request.path_info):
+            return None
+
+        webhook_settings = get_webhook_settings()
+        if not webhook_settings.instrument:
+            rejected_resp = self.check(request, webhook_settings, None)
+        else:
+            timer = StageTimer()
+            rejected_resp = self.check(request, webhook_settings, timer)
+            if rejected_resp:
+                rejected_resp = timer.finish(
+                    type(self), request, rejected_resp, webhook_settings)
+        if rejected_resp:
+            return rejected_resp
+
+        # Twilio can't send a CSRF token.
+        request._dont_enforce_csrf_checks = True
+        request._twilio_checked = True
+        decompose(request)
+        return None
+
+    def check(self, request, webhook_settings, timer):
+        """Return the response rejecting ``request``, or ``None`` if it
+        passes every check, marking each check on ``timer`` if there is one.
+        """
+        if webhook_settings.forgery_protection:
+            if self.multi_tenant:
+                validator = _get_tenant_validator(request, webhook_settings)
+            else:
+                validator = webhook_settings.validator
+            forbidden_resp = _check_forgery(request, validator)
+            if timer is not None:
+                timer.mark('forgery')
+            if forbidden_resp:
+                return forbidden_resp
+
+        if webhook_settings.blacklist_check:
+            blacklisted_resp = get_blacklisted_response(request)
+            if timer is not None:
+                timer.mark('blacklist')
+            if blacklisted_resp:
+                return blacklisted_resp
+
+        if (webhook_settings.rate_limit
+                and not is_status_callback(get_params(request))):
+            rate_limited_resp = get_rate_limited_response(request)
+            if timer is not None:
+                timer.mark('ratelimit')
+            if rate_limited_resp:
+                return rate_limited_resp
+        return None
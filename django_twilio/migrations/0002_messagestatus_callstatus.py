@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallStatus',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('call_sid', models.CharField(db_index=True, max_length=34)),
+                ('account_sid', models.CharField(max_length=34)),
+                ('status', models.CharField(max_length=20)),
+                ('call_duration', models.PositiveIntegerField(blank=True, null=True)),
+                ('sequence_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('from_number', models.CharField(blank=True, max_length=128)),
+                ('to_number', models.CharField(blank=True, max_length=128)),
+                ('received_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'call statuses',
+            },
+        ),
+        migrations.CreateModel(
+            name='MessageStatus',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_sid', models.CharField(db_index=True, max_length=34)),
+                ('account_sid', models.CharField(max_length=34)),
+                ('status', models.CharField(max_length=20)),
+                ('error_code', models.PositiveIntegerField(blank=True, null=True)),
+                ('from_number', models.CharField(blank=True, max_length=128)),
+                ('to_number', models.CharField(blank=True, max_length=128)),
+                ('received_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'message statuses',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models, migrations
+import django.core.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio', '0002_messagestatus_callstatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlacklistRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=16, unique=True, validators=[django.core.validators.RegexValidator('^\\+[0-9]{1,15}\\Z', 'Enter a "+" followed by up to 15 digits.')])),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('active', models.BooleanField(default=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from django.core.validators import RegexValidator
 from django.db import models
 from django.conf import settings
 
@@ -32,6 +33,39 @@ class Caller(models.Model):
         app_label = 'django_twilio'
 
 
+class BlacklistRule(models.Model):
+    """
+    Blacklists every caller whose phone number starts with a prefix.
+
+    :param char prefix: The start of an `E.164
+        <http://en.wikipedia.org/wiki/E.164>`_ phone number: ``+1555123``
+        blacklists ``+15551230000`` to ``+15551239999``, and ``+44`` every UK
+        number.
+    :param char description: Why the numbers are blacklisted.
+    :param bool active: Designates whether the rule is enforced.
+
+    """
+    prefix = models.CharField(
+        max_length=16,
+        unique=True,
+        validators=[RegexValidator(
+            r'^\+[0-9]{1,15}\Z',
+            'Enter a "+" followed by up to 15 digits.',
+        )],
+    )
+    description = models.CharField(max_length=255, blank=True)
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return '{prefix}*{status}'.format(
+            prefix=self.prefix,
+            status='' if self.active else ' (inactive)',
+        )
+
+    class Meta:
+        app_label = 'django_twilio'
+
+
 class Credential(models.Model):
     """
     A Credential model is a set of SID / AUTH tokens for the Twilio.com API
@@ -60,3 +94,70 @@ class Credential(models.Model):
 
     class Meta:
         app_label = 'django_twilio'
+
+
+class MessageStatus(models.Model):
+    """
+    A status callback Twilio sent for a message, saved by
+    :func:`django_twilio.views.message_status`.
+
+    :param char message_sid: The ``MessageSid`` of the message.
+    :param char account_sid: The ``AccountSid`` the message belongs to.
+    :param char status: The ``MessageStatus``: ``queued``, ``sent``,
+        ``delivered``, ``undelivered``, ``failed`` and so on.
+    :param int error_code: The ``ErrorCode`` of a failed message, if any.
+    :param char from_number: The ``From`` number.
+    :param char to_number: The ``To`` number.
+    :param datetime received_at: When the callback was received.
+
+    """
+    message_sid = models.CharField(max_length=34, db_index=True)
+    account_sid = models.CharField(max_length=34)
+    status = models.CharField(max_length=20)
+    error_code = models.PositiveIntegerField(null=True, blank=True)
+    from_number = models.CharField(max_length=128, blank=True)
+    to_number = models.CharField(max_length=128, blank=True)
+    received_at = models.DateTimeField()
+
+    def __str__(self):
+        return '{sid}: {status}'.format(
+            sid=self.message_sid, status=self.status)
+
+    class Meta:
+        app_label = 'django_twilio'
+        verbose_name_plural = 'message statuses'
+
+
+class CallStatus(models.Model):
+    """
+    A status callback Twilio sent for a call, saved by
+    :func:`django_twilio.views.call_status`.
+
+    :param char call_sid: The ``CallSid`` of the call.
+    :param char account_sid: The ``AccountSid`` the call belongs to.
+    :param char status: The ``CallStatus``: ``ringing``, ``in-progress``,
+        ``completed``, ``busy`` and so on.
+    :param int call_duration: The ``CallDuration`` in seconds, once the call
+        has completed.
+    :param int sequence_number: The ``SequenceNumber`` of the callback, which
+        orders callbacks for the same call.
+    :param char from_number: The ``From`` number.
+    :param char to_number: The ``To`` number.
+    :param datetime received_at: When the callback was received.
+
+    """
+    call_sid = models.CharField(max_length=34, db_index=True)
+    account_sid = models.CharField(max_length=34)
+    status = models.CharField(max_length=20)
+    call_duration = models.PositiveIntegerField(null=True, blank=True)
+    sequence_number = models.PositiveIntegerField(null=True, blank=True)
+    from_number = models.CharField(max_length=128, blank=True)
+    to_number = models.CharField(max_length=128, blank=True)
+    received_at = models.DateTimeField()
+
+    def __str__(self):
+        return '{sid}: {status}'.format(sid=self.call_sid, status=self.status)
+
+    class Meta:
+        app_label = 'django_twilio'
+        verbose_name_plural = 'call statuses'
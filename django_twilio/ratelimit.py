@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-caller rate limiting for ``twilio_view``.
+
+With ``DJANGO_TWILIO_RATE_LIMIT = (requests, seconds)``, each ``From`` number
+may make ``requests`` requests every ``seconds`` seconds. Requests over the
+limit get the same rejection as blacklisted callers, before the view runs.
+Webhooks of the calls you place (``Direction=outbound-api`` or
+``outbound-dial``) come from your own number, so they are counted against
+their ``To`` number instead.
+
+Requests are counted with a sliding window: the count of the current fixed
+window, plus the count of the previous one weighted by how much of it the
+sliding window still covers. Counts for the current window live in the cache
+named by ``DJANGO_TWILIO_RATE_LIMIT_CACHE``, so every process shares them,
+and are incremented atomically there. Each process also keeps a local tier of
+the counts of finished windows (which no longer change) and of callers
+already over the limit, so the callers sending the most requests only cost
+one cache round trip per window. Set ``DJANGO_TWILIO_RATE_LIMIT_CACHE =
+None`` to count in each process alone.
+
+With ``DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_AFTER`` set, a caller rejected that
+many times by one process is blacklisted for good. Callers are saved in
+batches, in the background, like status callbacks (see
+:mod:`django_twilio.status`).
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import blacklist
+from .cache import LRUCache, MISSING
+from .models import Caller
+from .status import StatusBuffer
+
+
+DEFAULT_CACHE = 'default'
+DEFAULT_LOCAL_SIZE = 10000
+DEFAULT_BLACKLIST_BATCH_SIZE = 100
+DEFAULT_BLACKLIST_INTERVAL = 10.0
+
+KEY_PREFIX = 'django_twilio:ratelimit:'
+
+logger = logging.getLogger('django_twilio.ratelimit')
+
+_limiter = MISSING
+
+
+class RateLimiter(object):
+    """
+    Counts requests per phone number over a sliding window.
+
+    :param int limit: The number of requests allowed per ``period``.
+    :param float period: The length of the window, in seconds.
+    :param str cache_alias: The ``CACHES`` alias to count in, or ``None`` to
+        count in this process only.
+    :param int local_size: The number of phone numbers each part of the
+        local tier remembers.
+    :param int blacklist_after: Blacklist a phone number once it has been
+        rejected this many times, or ``None`` to never do so.
+    :param promotions: The :class:`PromotionBuffer` that blacklists them.
+    """
+
+    def __init__(self, limit, period, cache_alias=DEFAULT_CACHE,
+                 local_size=DEFAULT_LOCAL_SIZE, blacklist_after=None,
+                 promotions=None):
+        self.limit = limit
+        self.period = period
+        self.cache_alias = cache_alias
+        self.blacklist_after = blacklist_after
+        self.promotions = promotions
+        # Phone number -> when the window it went over the limit in ends.
+        self._blocked = LRUCache(local_size, period)
+        # (phone number, window) -> count, for finished windows, and for the
+        # current one when counting locally.
+        self._counts = LRUCache(local_size, 2 * period)
+        # Phone number -> times rejected.
+        self._offences = LRUCache(local_size)
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def allow(self, phone_number):
+        """Count a request from ``phone_number``, returning whether it is
+        within the limit.
+        """
+        now = time.time()
+        if self._is_blocked(phone_number, now):
+            return self._reject(phone_number)
+        window = int(now // self.period)
+        previous = self._get_previous(phone_number, window)
+        if previous is MISSING:
+            current, previous = self._incr_both(phone_number, window)
+        else:
+            current = self._incr(phone_number, window)
+        return self._check(phone_number, now, window, current, previous)
+
+    async def aallow(self, phone_number):
+        """Async version of :meth:`allow`."""
+        now = time.time()
+        if self._is_blocked(phone_number, now):
+            return self._reject(phone_number)
+        window = int(now // self.period)
+        previous = self._get_previous(phone_number, window)
+        if self.cache_alias is None:
+            current = self._incr(phone_number, window)
+            if previous is MISSING:
+                previous = 0
+        else:
+            current = await self._aincr_shared(phone_number, window)
+            if previous is MISSING:
+                previous = await self.cache.aget(
+                    self._key(phone_number, window - 1), 0)
+                self._counts.set((phone_number, window - 1), previous)
+        return self._check(phone_number, now, window, current, previous)
+
+    def _check(self, phone_number, now, window, current, previous):
+        elapsed = (now - window * self.period) / self.period
+        if previous * (1 - elapsed) + current <= self.limit:
+            return True
+        self._blocked.set(phone_number, (window + 1) * self.period)
+        return self._reject(phone_number)
+
+    def _reject(self, phone_number):
+        if self.blacklist_after is not None:
+            with self._lock:
+                offences = self._offences.get(phone_number, 0) + 1
+                self._offences.set(phone_number, offences)
+            if offences == self.blacklist_after:
+                self.promotions.add(
+                    Caller(phone_number=phone_number, blacklisted=True))
+        return False
+
+    def _is_blocked(self, phone_number, now):
+        until = self._blocked.get(phone_number)
+        return until is not None and until > now
+
+    def _get_previous(self, phone_number, window):
+        if self.cache_alias is None:
+            return self._counts.get((phone_number, window - 1), 0)
+        return self._counts.get((phone_number, window - 1), MISSING)
+
+    def _incr_both(self, phone_number, window):
+        # The first request of a window also fetches (and remembers) the
+        # final count of the previous one.
+        current = self._incr(phone_number, window)
+        previous = self.cache.get(self._key(phone_number, window - 1), 0)
+        self._counts.set((phone_number, window - 1), previous)
+        return current, previous
+
+    def _incr(self, phone_number, window):
+        if self.cache_alias is None:
+            key = (phone_number, window)
+            with self._lock:
+                count = self._counts.get(key, 0) + 1
+                self._counts.set(key, count)
+            return count
+
+        cache = self.cache
+        key = self._key(phone_number, window)
+        # Keep counts long enough to serve as the previous window.
+        cache.add(key, 0, timeout=2 * self.period)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The key was evicted in between.
+            cache.set(key, 1, timeout=2 * self.period)
+            return 1
+
+    async def _aincr_shared(self, phone_number, window):
+        cache = self.cache
+        key = self._key(phone_number, window)
+        await cache.aadd(key, 0, timeout=2 * self.period)
+        try:
+            return await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, timeout=2 * self.period)
+            return 1
+
+    def _key(self, phone_number, window):
+        return '{}{}:{}'.format(KEY_PREFIX, phone_number, window)
+
+
+class PromotionBuffer(StatusBuffer):
+    """
+    Blacklists the callers it is given, in batches, in the background.
+    """
+
+    def _save(self, batch):
+        # A caller may have been queued by more than one thread.
+        callers = list({str(c.phone_number): c for c in batch}.values())
+        try:
+            blacklist.upsert_callers(callers, self.using, self.batch_size)
+        except Exception:
+            logger.exception(
+                'Could not blacklist %d rate limited callers.', len(callers))
+            return
+        # upsert_callers() doesn't send the signal that usually does this.
+        blacklist.clear_cache()
+
+
+def get_limiter():
+    """Return the rate limiter configured by the
+    ``DJANGO_TWILIO_RATE_LIMIT*`` settings, or ``None`` if rate limiting is
+    off.
+    """
+    global _limiter
+    if _limiter is MISSING:
+        rate = getattr(settings, 'DJANGO_TWILIO_RATE_LIMIT', None)
+        if not rate:
+            _limiter = None
+            return None
+        limit, period = rate
+        blacklist_after = getattr(
+            settings, 'DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_AFTER', None)
+        promotions = None
+        if blacklist_after is not None:
+            promotions = PromotionBuffer(
+                batch_size=getattr(
+                    settings, 'DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_BATCH_SIZE',
+                    DEFAULT_BLACKLIST_BATCH_SIZE),
+                flush_interval=getattr(
+                    settings, 'DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_INTERVAL',
+                    DEFAULT_BLACKLIST_INTERVAL),
+            )
+            atexit.register(promotions.close)
+        _limiter = RateLimiter(
+            limit,
+            period,
+            cache_alias=getattr(
+                settings, 'DJANGO_TWILIO_RATE_LIMIT_CACHE', DEFAULT_CACHE),
+            local_size=getattr(
+                settings, 'DJANGO_TWILIO_RATE_LIMIT_LOCAL_SIZE',
+                DEFAULT_LOCAL_SIZE),
+            blacklist_after=blacklist_after,
+            promotions=promotions,
+        )
+    return _limiter
+
+
+def reset():
+    """Throw the rate limiter away, blacklisting the callers it has queued,
+    so the next request builds a new one from the current settings.
+    """
+    global _limiter
+    if _limiter is not MISSING and _limiter is not None:
+        if _limiter.promotions is not None:
+            atexit.unregister(_limiter.promotions.close)
+            _limiter.promotions.close()
+    _limiter = MISSING
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
+from collections.abc import Mapping
+from functools import cached_property
+from urllib.parse import parse_qsl
+
 import django
+from django.conf import settings
+from django.core.exceptions import TooManyFieldsSent
 from django.http import HttpRequest
+from django.http.request import RawPostDataException
 from django.core.handlers.wsgi import WSGIRequest
 
 if django.get_version() > "3.0.0":
@@ -10,11 +17,194 @@ if django.get_version() > "3.0.0":
 from .exceptions import NotDjangoRequestException
 
 
+class WebhookParams(Mapping):
+    '''
+    The parameters of a Twilio webhook, as an immutable mapping.
+
+    Like a QueryDict, looking a key up returns its last value and getlist
+    returns all of them, but only keys that were actually repeated keep a
+    list around.
+    '''
+
+    __slots__ = ('_values', '_lists')
+
+    def __init__(self, pairs=()):
+        pairs = list(pairs)
+        self._values = dict(pairs)
+        self._lists = None
+        if len(self._values) != len(pairs):
+            lists = {}
+            for key, value in pairs:
+                lists.setdefault(key, []).append(value)
+            self._lists = {
+                key: values for key, values in lists.items()
+                if len(values) > 1
+            }
+
+    @classmethod
+    def parse(cls, query_string, encoding=None):
+        '''
+        Parse a urlencoded query string (bytes or text) the way QueryDict
+        does.
+        '''
+        encoding = encoding or settings.DEFAULT_CHARSET
+        if isinstance(query_string, bytes):
+            try:
+                query_string = query_string.decode(encoding)
+            except UnicodeDecodeError:
+                query_string = query_string.decode('iso-8859-1')
+        try:
+            return cls(parse_qsl(
+                query_string,
+                keep_blank_values=True,
+                encoding=encoding,
+                max_num_fields=settings.DATA_UPLOAD_MAX_NUMBER_FIELDS,
+            ))
+        except ValueError as e:
+            raise TooManyFieldsSent(
+                'The number of GET/POST parameters exceeded '
+                'settings.DATA_UPLOAD_MAX_NUMBER_FIELDS.') from e
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return '<WebhookParams: {!r}>'.format(dict(self.lists()))
+
+    def getlist(self, key, default=None):
+        if self._lists is not None and key in self._lists:
+            return list(self._lists[key])
+        if key in self._values:
+            return [self._values[key]]
+        return [] if default is None else default
+
+    def lists(self):
+        for key in self._values:
+            yield key, self.getlist(key)
+
+    def dict(self):
+        return dict(self._values)
+
+
+def get_params(request):
+    '''
+    Return the parameters Twilio sent with request as a WebhookParams: the
+    query string of a GET request, or the body of any other request.
+
+    Twilio posts small urlencoded bodies, which are parsed straight from
+    request.body instead of building request.POST. The result is stored on
+    the request, so it is only parsed once.
+    '''
+    try:
+        return request._twilio_params
+    except AttributeError:
+        pass
+    encoding = request.encoding
+    if request.method == 'GET':
+        params = WebhookParams.parse(
+            request.META.get('QUERY_STRING', ''), encoding)
+    elif request.content_type == 'application/x-www-form-urlencoded':
+        try:
+            params = WebhookParams.parse(request.body, encoding)
+        except RawPostDataException:
+            params = WebhookParams(_pairs(request.POST))
+    else:
+        params = WebhookParams(_pairs(request.POST))
+    request._twilio_params = params
+    return params
+
+
+def _pairs(querydict):
+    for key, values in querydict.lists():
+        for value in values:
+            yield key, value
+
+
+def get_request_type(parameters):
+    '''
+    Classify a Twilio request as 'voice', 'message' or 'unknown' from its
+    parameters, the same way TwilioRequest does (parameter names are
+    case-insensitive).
+    '''
+    callsid = messagesid = None
+    for key, value in parameters.items():
+        key = key.lower()
+        if key == 'callsid':
+            callsid = value
+        elif key == 'messagesid':
+            messagesid = value
+    if callsid:
+        return 'voice'
+    elif messagesid:
+        return 'message'
+    else:
+        return 'unknown'
+
+
+#: Message statuses only incoming messages have.
+INCOMING_MESSAGE_STATUSES = frozenset(['receiving', 'received'])
+
+#: Call statuses only status callbacks have; a call that reaches a webhook
+#: is still ringing or in progress.
+FINAL_CALL_STATUSES = frozenset(
+    ['completed', 'busy', 'failed', 'no-answer', 'canceled'])
+
+
+def is_status_callback(parameters):
+    '''
+    Return whether a Twilio request is a message or call status callback,
+    rather than an incoming message or call, from its parameters (parameter
+    names are case-insensitive).
+
+    The ``From`` of a status callback for an outgoing message or call is one
+    of your own numbers.
+    '''
+    message_status = call_status = None
+    for key, value in parameters.items():
+        key = key.lower()
+        if key in ('messagestatus', 'smsstatus'):
+            message_status = message_status or value
+        elif key == 'callstatus':
+            call_status = value
+        elif key in ('callbacksource', 'sequencenumber'):
+            # Only sent with call progress events.
+            return True
+    if message_status:
+        return message_status not in INCOMING_MESSAGE_STATUSES
+    return call_status in FINAL_CALL_STATUSES
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class TwilioRequest(object):
     '''
     Primarily a collection of key/values from a Twilio HTTP request.
     Also has some additional attributes to support development with the
     Twilio API
+
+    Each parameter is an attribute named after its lowercased key (From is
+    from_), holding the string Twilio sent. The num_media, num_segments,
+    call_duration, media_urls, media_content_types and coordinates
+    attributes hold typed versions of the matching parameters; each is
+    converted on first access and is a plain attribute after that.
     '''
 
     def __init__(self, parameters):
@@ -30,18 +220,51 @@ class TwilioRequest(object):
                 setattr(self, 'from_', value)
             else:
                 setattr(self, key.lower(), value)
-        if getattr(self, 'callsid', False):
-            self.type = 'voice'
-        elif getattr(self, 'messagesid', False):
-            self.type = 'message'
-        else:
-            self.type = 'unknown'
+        self.type = get_request_type(parameters)
+
+    @cached_property
+    def num_media(self):
+        return _to_int(getattr(self, 'nummedia', None)) or 0
+
+    @cached_property
+    def num_segments(self):
+        return _to_int(getattr(self, 'numsegments', None))
+
+    @cached_property
+    def call_duration(self):
+        return _to_int(getattr(self, 'callduration', None))
+
+    @cached_property
+    def media_urls(self):
+        return [getattr(self, 'mediaurl{}'.format(i), None)
+                for i in range(self.num_media)]
+
+    @cached_property
+    def media_content_types(self):
+        return [getattr(self, 'mediacontenttype{}'.format(i), None)
+                for i in range(self.num_media)]
+
+    @cached_property
+    def coordinates(self):
+        '''
+        (latitude, longitude) as floats for messages that share a location,
+        None otherwise.
+        '''
+        latitude = _to_float(getattr(self, 'latitude', None))
+        longitude = _to_float(getattr(self, 'longitude', None))
+        if latitude is None or longitude is None:
+            return None
+        return latitude, longitude
 
 
 def decompose(request):
     '''
     Decompose takes a Django HttpRequest object and tries to collect the
     Twilio-specific POST parameters and return them in a TwilioRequest object.
+
+    The TwilioRequest is stored on the request as request.twilio, so the
+    parameters are only copied and classified once, however many times
+    decompose is called (TwilioWebhookMiddleware sets it up front).
     '''
     request_types = [HttpRequest, WSGIRequest]
     try:
@@ -51,7 +274,11 @@ def decompose(request):
     if type(request) not in request_types:
         raise NotDjangoRequestException(
             'The request parameter is not a Django HttpRequest object')
-    if request.method == 'POST':
-        return TwilioRequest(request.POST.dict())
-    if request.method == 'GET':
-        return TwilioRequest(request.GET.dict())
+    try:
+        return request.twilio
+    except AttributeError:
+        pass
+    if request.method not in ('GET', 'POST'):
+        return None
+    request.twilio = TwilioRequest(get_params(request))
+    return request.twilio
@@ -2,8 +2,77 @@
 
 """
 django_twilio specific settings.
+
+``TWILIO_ACCOUNT_SID`` and ``TWILIO_AUTH_TOKEN`` are the project's default
+credentials, found by
+:func:`django_twilio.credentials.get_default_credentials`. They are looked up
+the first time they are used rather than when this module is imported, so
+importing it doesn't fail for projects that only use per-user credentials.
 """
 
+from django.conf import settings
+
+from .credentials import get_default_credentials
 from .utils import discover_twilio_credentials
+from .validator import get_validator
+
+
+def __getattr__(name):
+    if name == 'TWILIO_ACCOUNT_SID':
+        return get_default_credentials()[0]
+    if name == 'TWILIO_AUTH_TOKEN':
+        return get_default_credentials()[1]
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+class WebhookSettings(object):
+    """
+    The settings :func:`django_twilio.decorators.twilio_view` needs on every
+    request, read once and shared by every view.
+
+    Use :func:`get_webhook_settings` rather than creating these directly; the
+    shared instance is thrown away whenever Django's ``setting_changed``
+    signal fires for one of the settings involved.
+    """
+
+    def __init__(self):
+        self.forgery_protection = getattr(
+            settings,
+            'DJANGO_TWILIO_FORGERY_PROTECTION',
+            not settings.DEBUG,
+        )
+        self.blacklist_check = getattr(
+            settings,
+            'DJANGO_TWILIO_BLACKLIST_CHECK',
+            True,
+        )
+        self.rate_limit = bool(
+            getattr(settings, 'DJANGO_TWILIO_RATE_LIMIT', None))
+        self.timing = getattr(settings, 'DJANGO_TWILIO_TIMING', False)
+        self.server_timing = self.timing and getattr(
+            settings, 'DJANGO_TWILIO_SERVER_TIMING', False)
+        self.metrics = getattr(settings, 'DJANGO_TWILIO_METRICS', False)
+        # Whether twilio_view needs to time requests at all.
+        self.instrument = self.timing or self.metrics
+        try:
+            account_sid, auth_token = discover_twilio_credentials()
+        except AttributeError:
+            account_sid = auth_token = None
+        self.account_sid = account_sid
+        self.validator = get_validator(auth_token) if auth_token else None
+
+
+_webhook_settings = None
+
+
+def get_webhook_settings():
+    global _webhook_settings
+    if _webhook_settings is None:
+        _webhook_settings = WebhookSettings()
+    return _webhook_settings
+
 
-TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN = discover_twilio_credentials()
+def reset_webhook_settings():
+    global _webhook_settings
+    _webhook_settings = None
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+Signals sent by django_twilio, and the receivers that keep its in-process
+caches coherent.
+"""
+
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import (
+    blacklist, client, credentials, idempotency, ratelimit, status, twiml)
+from .models import BlacklistRule, Caller, Credential
+from .settings import reset_webhook_settings
+
+
+#: Sent by ``twilio_view`` after each request when ``DJANGO_TWILIO_TIMING`` is
+#: enabled (see :mod:`django_twilio.timing`), with these arguments:
+#:
+#: ``sender``
+#:     The view function, or ``TwilioWebhookMiddleware`` for the requests it
+#:     rejected.
+#: ``request``
+#:     The ``HttpRequest``.
+#: ``request_type``
+#:     ``'voice'``, ``'message'`` or ``'unknown'``.
+#: ``timings``
+#:     A dict of the nanoseconds spent in each stage, in the order they ran.
+#: ``total``
+#:     The nanoseconds spent in ``twilio_view`` altogether.
+webhook_timed = Signal()
+
+
+@receiver(post_save, sender=Caller)
+@receiver(post_delete, sender=Caller)
+def invalidate_blacklist_cache(sender, **kwargs):
+    # A saved caller may have changed its phone number as well as its
+    # blacklist status, so there is no single key we can safely evict.
+    blacklist.clear_cache()
+
+
+@receiver(post_save, sender=BlacklistRule)
+def update_blacklist_rules(sender, instance, **kwargs):
+    blacklist.update_rule(instance)
+
+
+@receiver(post_delete, sender=BlacklistRule)
+def discard_blacklist_rule(sender, instance, **kwargs):
+    blacklist.discard_rule(instance.pk)
+
+
+@receiver(post_save, sender=Credential)
+@receiver(post_delete, sender=Credential)
+def invalidate_credential_cache(sender, **kwargs):
+    credentials.clear_cache()
+
+
+@receiver(setting_changed)
+def reload_settings(sender, setting, **kwargs):
+    if setting == 'DEBUG' or setting.startswith(('DJANGO_TWILIO_', 'TWILIO_')):
+        reset_webhook_settings()
+    if setting.startswith(('DJANGO_TWILIO_HTTP_', 'DJANGO_TWILIO_CLIENT_')):
+        client.reset()
+        # Imported here to keep aiohttp out of projects that don't use it.
+        from . import async_client
+        async_client.reset()
+    if setting.startswith('DJANGO_TWILIO_BLACKLIST_'):
+        blacklist.reset()
+    if setting.startswith(('DJANGO_TWILIO_CREDENTIAL_', 'TWILIO_')):
+        credentials.reset()
+    if setting.startswith('DJANGO_TWILIO_IDEMPOTENCY_'):
+        idempotency.reset_store()
+    if setting.startswith('DJANGO_TWILIO_TWIML_CACHE_'):
+        twiml.reset_response_cache()
+    if setting.startswith('DJANGO_TWILIO_RATE_LIMIT'):
+        ratelimit.reset()
+    if setting.startswith('DJANGO_TWILIO_STATUS_'):
+        status.reset()
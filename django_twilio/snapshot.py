@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+A read-only, memory-mapped snapshot of the blacklist.
+
+The snapshot is a small binary file: a fixed-size header followed by a sorted
+array of blacklisted E.164 numbers, each stored as an unsigned 64 bit integer
+(``+15005550001`` is stored as ``15005550001``), and then the prefixes of the
+active blacklist rules, one per line. Every process maps the same file, so a
+fleet of prefork workers shares one copy in the page cache and answers
+blacklist lookups with a binary search instead of a database query.
+
+Snapshots are written with :func:`write_snapshot` (see the
+``twilio_blacklist_snapshot`` management command) into a temporary file which
+then atomically replaces the old one. Readers notice the new file by checking
+its inode and modification time at most once every ``check_interval``
+seconds.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from .trie import PrefixTrie
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DJTWBL2\n'
+
+# Magic, generation, number count, length of the rule prefixes. The header is
+# a multiple of 8 bytes long, so the number array that follows it stays
+# aligned.
+HEADER = struct.Struct('=8sQQQ')
+
+# E.164 numbers have at most 15 digits.
+MAX_DIGITS = 15
+
+
+def phone_number_to_int(phone_number):
+    """Return the integer key for an E.164 ``phone_number``, or ``None`` if
+    it isn't an E.164 number (for example ``client:alice``).
+    """
+    digits = phone_number[1:]
+    if (phone_number[:1] != '+' or not digits.isascii()
+            or not digits.isdigit() or len(digits) > MAX_DIGITS):
+        return None
+    return int(digits)
+
+
+def read_generation(path):
+    """Return the generation of the snapshot at ``path``, or ``0`` if there
+    is no readable snapshot there.
+    """
+    try:
+        with open(path, 'rb') as f:
+            magic, generation, _, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+
+def write_snapshot(path, phone_numbers, prefixes=()):
+    """Atomically replace the snapshot at ``path`` with one containing
+    ``phone_numbers`` and the blacklist rule ``prefixes``.
+
+    :param str path: Where to write the snapshot.
+    :param phone_numbers: An iterable of E.164 phone number strings. Numbers
+        which aren't valid E.164 are skipped.
+    :param prefixes: An iterable of E.164 prefixes (``+1555``, ``+44``...)
+        every number starting with is blacklisted. Invalid prefixes are
+        skipped.
+    :returns: The number of distinct phone numbers written.
+    """
+    numbers = array('Q')
+    for phone_number in phone_numbers:
+        number = phone_number_to_int(str(phone_number))
+        if number is not None:
+            numbers.append(number)
+    numbers = array('Q', sorted(set(numbers)))
+    rules = '\n'.join(sorted(set(
+        prefix for prefix in map(str, prefixes)
+        if phone_number_to_int(prefix) is not None
+    ))).encode('ascii')
+    generation = read_generation(path) + 1
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.blacklist-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, generation, len(numbers), len(rules)))
+            numbers.tofile(f)
+            f.write(rules)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(numbers)
+
+
+class BlacklistSnapshot(object):
+    """
+    Looks phone numbers up in the snapshot at ``path``.
+
+    :param str path: The snapshot file to map.
+    :param float check_interval: How often, in seconds, to check whether the
+        snapshot file has been replaced.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.generation = None
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._numbers = None
+        self._rules = None
+        self._next_check = 0
+
+    def __contains__(self, phone_number):
+        return bool(self.lookup(phone_number))
+
+    def lookup(self, phone_number):
+        """Return whether ``phone_number`` is in the snapshot, or ``None`` if
+        no snapshot could be loaded.
+        """
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        numbers = self._numbers
+        if numbers is None:
+            return None
+        number = phone_number_to_int(phone_number)
+        if number is None:
+            return False
+        i = bisect_left(numbers, number)
+        return i < len(numbers) and numbers[i] == number
+
+    def get_rules(self):
+        """Return a :class:`django_twilio.trie.PrefixTrie` of the rule
+        prefixes in the snapshot, or ``None`` if no snapshot could be loaded.
+        """
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._rules
+
+    def refresh(self):
+        """Map the snapshot file again if it has been replaced since we last
+        looked at it.
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                return
+            stat_key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+            if stat_key == self._stat_key:
+                return
+            try:
+                generation, numbers, rules = self._load()
+            except (OSError, ValueError) as e:
+                logger.warning(
+                    'Could not load blacklist snapshot %s: %s', self.path, e)
+                return
+            # Readers always see either the old or the new mapping. The old
+            # mapping is unmapped once the last reader drops its reference.
+            self._stat_key = stat_key
+            self.generation = generation
+            self._numbers = numbers
+            self._rules = rules
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < HEADER.size:
+            raise ValueError('truncated header')
+        magic, generation, count, rules_size = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            raise ValueError('bad magic number')
+        end = HEADER.size + count * 8
+        if len(mm) != end + rules_size:
+            raise ValueError('truncated snapshot')
+        # There are few rules, so they are parsed once rather than mapped.
+        prefixes = mm[end:].decode('ascii').split('\n') if rules_size else []
+        rules = PrefixTrie(enumerate(prefixes))
+        return generation, memoryview(mm)[HEADER.size:end].cast('Q'), rules
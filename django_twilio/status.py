@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""
+Buffered storage for Twilio status callbacks.
+
+Twilio sends a status callback every time a message or call changes state, so
+a busy account sends several of them for each message it sends, and saving
+each one with its own ``INSERT`` is what costs the most. The views in
+:mod:`django_twilio.views` hand the
+:class:`django_twilio.models.MessageStatus` and
+:class:`django_twilio.models.CallStatus` they build to a per-process
+:class:`StatusBuffer` instead and respond straight away. A background thread
+saves whatever has been buffered with ``bulk_create`` once
+``DJANGO_TWILIO_STATUS_BATCH_SIZE`` callbacks are waiting, or every
+``DJANGO_TWILIO_STATUS_FLUSH_INTERVAL`` seconds, whichever comes first.
+
+Buffered callbacks only live in memory until they are saved:
+
+    - The buffer is flushed when the process exits normally (including
+      gunicorn and uWSGI workers stopped with ``SIGTERM``), unless
+      ``DJANGO_TWILIO_STATUS_FLUSH_AT_EXIT = False``. A process that is
+      killed outright loses the callbacks it hasn't saved yet, at most a
+      flush interval's worth.
+
+    - Call :func:`flush` to save everything buffered so far, or :func:`close`
+      to flush and stop the background thread, from your own shutdown hooks.
+
+    - ``DJANGO_TWILIO_STATUS_BUFFER_SIZE = 0`` turns buffering off: each
+      callback is saved before the view responds.
+
+When the buffer is full, the request that doesn't fit saves everything
+buffered itself (``DJANGO_TWILIO_STATUS_OVERFLOW = 'flush'``, the default),
+or its callback is dropped and logged (``'drop'``).
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .cache import MISSING
+from .models import CallStatus, MessageStatus
+from .request import get_params
+
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+OVERFLOW_POLICIES = ('flush', 'drop')
+
+logger = logging.getLogger('django_twilio.status')
+
+_buffer = MISSING
+
+
+class StatusBuffer(object):
+    """
+    A bounded, thread-safe buffer of unsaved model instances, saved in bulk
+    by a background thread.
+
+    :param int max_size: The most instances to hold. ``0`` saves every
+        instance as soon as it is added.
+    :param int batch_size: Wake the background thread once this many
+        instances are waiting. Also the ``batch_size`` of ``bulk_create``.
+    :param float flush_interval: The longest, in seconds, an instance waits
+        to be saved.
+    :param str overflow: What :meth:`add` does when the buffer is full:
+        ``'flush'`` saves the buffer in the calling thread, ``'drop'``
+        discards the new instance.
+    :param str using: The database alias to save to.
+    """
+
+    def __init__(self, max_size=DEFAULT_BUFFER_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, overflow='flush',
+                 using=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of {}, not {!r}.'.format(
+                ', '.join(OVERFLOW_POLICIES), overflow))
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.using = using
+        #: The number of instances discarded because the buffer was full.
+        self.dropped = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._closed = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, instance):
+        """Buffer ``instance`` to be saved later."""
+        with self._lock:
+            if self._closed or not self.max_size:
+                batch = [instance]
+            elif len(self._pending) < self.max_size:
+                self._pending.append(instance)
+                if len(self._pending) >= self.batch_size:
+                    self._wakeup.notify()
+                self._start()
+                return
+            elif self.overflow == 'drop':
+                self.dropped += 1
+                logger.warning(
+                    'Status buffer is full, dropped %r.', instance)
+                return
+            else:
+                batch = self._take()
+                batch.append(instance)
+        self._save(batch)
+
+    def flush(self):
+        """Save everything buffered so far, in the calling thread."""
+        with self._lock:
+            batch = self._take()
+        self._save(batch)
+
+    def close(self, timeout=None):
+        """Flush the buffer and stop the background thread.
+
+        Anything added afterwards is saved straight away.
+
+        :param float timeout: The most seconds to wait for the background
+            thread to finish saving.
+        """
+        with self._lock:
+            self._closed = True
+            batch = self._take()
+            thread = self._thread
+            self._wakeup.notify()
+        # Let a save already in progress finish, so nothing is lost.
+        if thread is not None:
+            thread.join(timeout)
+        self._save(batch)
+
+    def _start(self):
+        # Called with the lock held.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='django-twilio-status', daemon=True)
+            self._thread.start()
+
+    def _take(self):
+        # Called with the lock held.
+        batch = list(self._pending)
+        self._pending.clear()
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if (not self._closed and
+                            len(self._pending) < self.batch_size):
+                        self._wakeup.wait(self.flush_interval)
+                    batch = self._take()
+                    closed = self._closed
+                if batch:
+                    close_old_connections()
+                    self._save(batch)
+                if closed:
+                    return
+        finally:
+            connections.close_all()
+
+    def _save(self, batch):
+        by_model = {}
+        for instance in batch:
+            by_model.setdefault(type(instance), []).append(instance)
+        for model, instances in by_model.items():
+            try:
+                with transaction.atomic(using=self.using):
+                    model._default_manager.using(self.using).bulk_create(
+                        instances, batch_size=self.batch_size)
+            except Exception:
+                logger.exception(
+                    'Could not save %d %s instances.',
+                    len(instances), model.__name__)
+
+
+def get_buffer():
+    """Return the status buffer for this process, configured by the
+    ``DJANGO_TWILIO_STATUS_*`` settings.
+    """
+    global _buffer
+    if _buffer is MISSING:
+        overflow = getattr(settings, 'DJANGO_TWILIO_STATUS_OVERFLOW', 'flush')
+        if overflow not in OVERFLOW_POLICIES:
+            raise ImproperlyConfigured(
+                'DJANGO_TWILIO_STATUS_OVERFLOW must be one of {}.'.format(
+                    ', '.join(repr(p) for p in OVERFLOW_POLICIES)))
+        buffer = StatusBuffer(
+            max_size=getattr(
+                settings, 'DJANGO_TWILIO_STATUS_BUFFER_SIZE',
+                DEFAULT_BUFFER_SIZE),
+            batch_size=getattr(
+                settings, 'DJANGO_TWILIO_STATUS_BATCH_SIZE',
+                DEFAULT_BATCH_SIZE),
+            flush_interval=getattr(
+                settings, 'DJANGO_TWILIO_STATUS_FLUSH_INTERVAL',
+                DEFAULT_FLUSH_INTERVAL),
+            overflow=overflow,
+            using=getattr(settings, 'DJANGO_TWILIO_STATUS_DATABASE', None),
+        )
+        if getattr(settings, 'DJANGO_TWILIO_STATUS_FLUSH_AT_EXIT', True):
+            atexit.register(buffer.close)
+        _buffer = buffer
+    return _buffer
+
+
+def flush():
+    """Save every status callback buffered by this process so far."""
+    if _buffer is not MISSING:
+        _buffer.flush()
+
+
+def close(timeout=None):
+    """Flush the status buffer and stop its background thread."""
+    if _buffer is not MISSING:
+        _buffer.close(timeout)
+
+
+def reset():
+    """Close the status buffer, so the next callback builds a new one from
+    the current settings.
+    """
+    global _buffer
+    if _buffer is not MISSING:
+        atexit.unregister(_buffer.close)
+        _buffer.close()
+    _buffer = MISSING
+
+
+def build_message_status(request):
+    """Return an unsaved :class:`django_twilio.models.MessageStatus` of the
+    status callback ``request``.
+    """
+    params = get_params(request)
+    return MessageStatus(
+        message_sid=params.get('MessageSid', params.get('SmsSid', '')),
+        account_sid=params.get('AccountSid', ''),
+        status=params.get('MessageStatus', params.get('SmsStatus', '')),
+        error_code=_to_int(params.get('ErrorCode')),
+        from_number=params.get('From', ''),
+        to_number=params.get('To', ''),
+        received_at=timezone.now(),
+    )
+
+
+def build_call_status(request):
+    """Return an unsaved :class:`django_twilio.models.CallStatus` of the
+    status callback ``request``.
+    """
+    params = get_params(request)
+    return CallStatus(
+        call_sid=params.get('CallSid', ''),
+        account_sid=params.get('AccountSid', ''),
+        status=params.get('CallStatus', ''),
+        call_duration=_to_int(params.get('CallDuration')),
+        sequence_number=_to_int(params.get('SequenceNumber')),
+        from_number=params.get('From', ''),
+        to_number=params.get('To', ''),
+        received_at=timezone.now(),
+    )
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-stage timing of requests handled by ``twilio_view``.
+
+Twilio gives up on a webhook after 15 seconds. With
+``DJANGO_TWILIO_TIMING = True``, ``twilio_view`` records how long each stage
+of a request took, so you can tell which one was slow:
+
+    ``forgery``
+        Checking the request signature.
+    ``blacklist``
+        Looking the caller up in the blacklist.
+    ``ratelimit``
+        Counting the request against the caller's rate limit.
+    ``idempotency``
+        Looking the request up in the idempotency store.
+    ``view``
+        Running your view.
+    ``render``
+        Turning what your view returned into an ``HttpResponse`` (and storing
+        it for ``idempotent`` views).
+
+Stages that don't run for a request (because forgery protection is off, or
+the request was rejected before it got there) are left out. The timings are
+sent with the :data:`django_twilio.signals.webhook_timed` signal, and are
+added to the response as a ``Server-Timing`` header if
+``DJANGO_TWILIO_SERVER_TIMING = True``. The same timer feeds
+:mod:`django_twilio.metrics`.
+
+:class:`django_twilio.middleware.TwilioWebhookMiddleware` times the requests
+it rejects in the same way.
+"""
+
+from time import perf_counter_ns
+
+from .metrics import record_request
+from .request import get_params, get_request_type
+from .signals import webhook_timed
+
+
+class StageTimer(object):
+    """
+    Records the time spent in consecutive stages of a request.
+
+    Each call to :meth:`mark` ends the current stage; the next one starts
+    straight away.
+    """
+
+    __slots__ = ('timings', '_start', '_last')
+
+    def __init__(self):
+        self.timings = {}
+        self._start = self._last = perf_counter_ns()
+
+    def mark(self, stage):
+        """End ``stage``, recording the nanoseconds since the previous mark."""
+        now = perf_counter_ns()
+        self.timings[stage] = now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        """Nanoseconds from the creation of this timer to the last mark."""
+        return self._last - self._start
+
+    def server_timing(self):
+        """Return the timings formatted for a ``Server-Timing`` header."""
+        metrics = ['{};dur={:.3f}'.format(stage, ns / 1e6)
+                   for stage, ns in self.timings.items()]
+        metrics.append('total;dur={:.3f}'.format(self.total / 1e6))
+        return ', '.join(metrics)
+
+    def finish(self, sender, request, response, webhook_settings):
+        """Report the timings of ``request``, returning ``response``.
+
+        :param sender: The view function that handled ``request``, or the
+            middleware class that rejected it.
+        :param webhook_settings: The
+            :class:`django_twilio.settings.WebhookSettings` in use, which say
+            where to report the timings.
+        """
+        twilio_request = getattr(request, 'twilio', None)
+        if twilio_request is not None:
+            request_type = twilio_request.type
+        else:
+            request_type = get_request_type(get_params(request))
+        if webhook_settings.timing:
+            webhook_timed.send(
+                sender=sender,
+                request=request,
+                request_type=request_type,
+                timings=dict(self.timings),
+                total=self.total,
+            )
+        if webhook_settings.metrics:
+            record_request(
+                sender, request, request_type, response, self.timings)
+        if webhook_settings.server_timing:
+            response['Server-Timing'] = self.server_timing()
+        return response
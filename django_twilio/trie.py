@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+A digit trie of E.164 number prefixes, used to match callers against
+:class:`django_twilio.models.BlacklistRule` objects.
+
+Each node is a dict mapping the next digit to the child node. A node that
+ends a prefix also maps ``''`` to that prefix. Matching a number walks at most
+one node per digit, so it costs the same however many prefixes the trie
+holds.
+"""
+
+import threading
+
+
+#: The key marking a node that ends a prefix.
+END = ''
+
+
+class PrefixTrie(object):
+    """
+    A set of E.164 prefixes (``+1555123``, ``+44`` and so on), each
+    belonging to a key such as the primary key of a rule.
+
+    Lookups don't take a lock: every change is a single dict operation, so a
+    concurrent lookup sees the trie either before or after it.
+    """
+
+    def __init__(self, prefixes=()):
+        self._root = {}
+        self._keys = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        for key, prefix in prefixes:
+            self.add(key, prefix)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, prefix):
+        node = self._find(prefix)
+        return node is not None and END in node
+
+    def add(self, key, prefix):
+        """Add ``prefix`` for ``key``, replacing the prefix ``key`` had
+        before. Prefixes that aren't a ``+`` followed by digits are ignored.
+        """
+        with self._lock:
+            self._discard(key)
+            digits = _digits(prefix)
+            if digits is None:
+                return
+            node = self._root
+            for digit in digits:
+                child = node.get(digit)
+                if child is None:
+                    child = node[digit] = {}
+                node = child
+            node[END] = prefix
+            self._keys[key] = prefix
+            self._counts[prefix] = self._counts.get(prefix, 0) + 1
+
+    def discard(self, key):
+        """Remove the prefix of ``key``, if it has one."""
+        with self._lock:
+            self._discard(key)
+
+    def match(self, phone_number):
+        """Return the shortest prefix of ``phone_number`` in the trie, or
+        ``None`` if there isn't one.
+        """
+        if phone_number[:1] != '+':
+            return None
+        node = self._root
+        for digit in phone_number[1:]:
+            node = node.get(digit)
+            if node is None:
+                return None
+            prefix = node.get(END)
+            if prefix is not None:
+                return prefix
+        return None
+
+    def _find(self, prefix):
+        digits = _digits(prefix)
+        if digits is None:
+            return None
+        node = self._root
+        for digit in digits:
+            node = node.get(digit)
+            if node is None:
+                return None
+        return node
+
+    def _discard(self, key):
+        # Called with the lock held.
+        prefix = self._keys.pop(key, None)
+        if prefix is None:
+            return
+        # Two keys may share a prefix; keep it while another one uses it.
+        count = self._counts.pop(prefix) - 1
+        if count:
+            self._counts[prefix] = count
+            return
+        path = [self._root]
+        for digit in _digits(prefix):
+            path.append(path[-1][digit])
+        del path[-1][END]
+        # Prune the nodes nothing passes through any more, deepest first.
+        for digit, parent, node in zip(
+                reversed(_digits(prefix)), reversed(path[:-1]),
+                reversed(path[1:])):
+            if node:
+                break
+            del parent[digit]
+
+
+def _digits(prefix):
+    digits = prefix[1:]
+    if (prefix[:1] != '+' or not digits or not digits.isascii()
+            or not digits.isdigit()):
+        return None
+    return digits
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+A fast serializer for ``twilio.twiml`` documents.
+
+``str(response)`` builds a whole ``xml.etree.ElementTree`` tree before
+serializing it. :func:`render` walks the TwiML objects directly instead, and
+writes escaped XML straight into a buffer. Its output is byte-for-byte what
+``str(response).encode('utf-8')`` returns.
+
+Every verb and noun in the twilio library (``<Say>``, ``<Play>``,
+``<Gather>``, ``<Dial>``, ``<Message>`` and so on) shares the same ``xml()``
+implementation, which is what this module reproduces. Documents using
+anything else (a subclass with its own ``xml()``, or a non-string value) are
+handed to the twilio library instead.
+"""
+
+# ElementTree's own escaping, which changed in Python 3.9 (attributes keep
+# "\r" as "&#13;" instead of turning it into "&#10;"), so the output matches
+# on every version.
+from xml.etree.ElementTree import _escape_attrib, _escape_cdata
+
+from django.conf import settings
+from twilio.twiml import TwiML
+
+from .cache import LRUCache, MISSING
+
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+DEFAULT_CACHE_SIZE = 1000
+
+_response_cache = MISSING
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def render(response):
+    """Serialize the TwiML document ``response`` to UTF-8 bytes.
+
+    :param response: Any ``twilio.twiml.TwiML`` object.
+    :returns: The same bytes as ``str(response).encode('utf-8')``.
+    """
+    out = [XML_DECLARATION]
+    try:
+        _write(response, out)
+    except _Unsupported:
+        return str(response).encode('utf-8')
+    # ElementTree replaces anything UTF-8 can't encode (lone surrogates) with
+    # character references.
+    return ''.join(out).encode('utf-8', 'xmlcharrefreplace')
+
+
+def get_response_cache():
+    """Return the cache of rendered responses used by
+    :func:`django_twilio.decorators.cache_twiml`, or ``None`` if it has been
+    disabled with ``DJANGO_TWILIO_TWIML_CACHE_SIZE = 0``.
+    """
+    global _response_cache
+    if _response_cache is MISSING:
+        size = getattr(
+            settings, 'DJANGO_TWILIO_TWIML_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        _response_cache = LRUCache(size) if size else None
+    return _response_cache
+
+
+def reset_response_cache():
+    global _response_cache
+    _response_cache = MISSING
+
+
+def _write(node, out):
+    if type(node).xml is not TwiML.xml:
+        raise _Unsupported()
+
+    name = node.name
+    out.append('<' + name)
+    attrs = node.attrs
+    for key in sorted(attrs):
+        value = attrs[key]
+        if isinstance(value, bool):
+            value = str(value).lower()
+        else:
+            value = str(value)
+        out.append(' ' + key + '="' + _escape_attrib(value) + '"')
+
+    # Mirror TwiML.xml(): strings nested in a node become its text until the
+    # first child node, and the tail of the previous child node after that.
+    # Later strings replace earlier ones.
+    text = node.value or None
+    if text is not None and not isinstance(text, str):
+        raise _Unsupported()
+    children = []
+    for verb in node.verbs:
+        if isinstance(verb, str):
+            if children:
+                children[-1][1] = verb
+            else:
+                text = verb
+        else:
+            children.append([verb, None])
+
+    if text or children:
+        out.append('>')
+        if text:
+            out.append(_escape_cdata(text))
+        for child, tail in children:
+            _write(child, out)
+            if tail:
+                out.append(_escape_cdata(tail))
+        out.append('</' + name + '>')
+    else:
+        out.append(' />')
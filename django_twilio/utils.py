@@ -1,9 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from twilio.twiml.messaging_response import Message
-
-from django_twilio.request import decompose
-
 """
 Useful utility functions.
 """
@@ -13,9 +9,10 @@ import os
 from django.http import HttpResponse
 from django.conf import settings
 
-from twilio.twiml.voice_response import VoiceResponse
-
-from .models import Caller, Credential
+from .blacklist import ais_blacklisted, get_rejection, is_blacklisted
+from .models import Credential
+from .ratelimit import get_limiter
+from .request import get_params, get_request_type
 
 
 def discover_twilio_credentials(user=None):
@@ -32,16 +29,21 @@ def discover_twilio_credentials(user=None):
 
         We recommend using environment variables were possible; it is the
         most secure option
+
+        This looks everything up again on every call. Code that needs the
+        credentials often (for every outbound message, say) should use the
+        cached :func:`django_twilio.credentials.resolve_twilio_credentials`
+        instead.
     """
 
     SID = 'TWILIO_ACCOUNT_SID'
     AUTH = 'TWILIO_AUTH_TOKEN'
 
     if user:
-        credentials = Credential.objects.filter(user=user.id)
-        if credentials.exists():
-            credentials = credentials[0]
-            return credentials.account_sid, credentials.auth_token
+        # Credential.user is one-to-one: a single query finds it, if any.
+        for credentials in Credential.objects.filter(
+                user=user.id).values_list('account_sid', 'auth_token')[:1]:
+            return credentials
 
     if SID in os.environ and AUTH in os.environ:
         return os.environ[SID], os.environ[AUTH]
@@ -69,28 +71,82 @@ def get_blacklisted_response(request):
         otherwise.
     """
     try:
-        # get the `From` data from the request's payload.
-        # Only supporting GET and POST.
-        data = request.GET if request.method == 'GET' else request.POST
-        frm = data['From']
-        caller = Caller.objects.get(phone_number=frm)
-        if caller.blacklisted:
-            twilio_request = decompose(request)
-            if twilio_request.type == 'voice':
-                r = VoiceResponse()
-                r.reject()
-            else:
-                # SMS does not allow to selectively reject SMS.
-                # So, we respond with nothing, and twilio does not forward
-                # the message back to the sender.
-                r = Message()
-            return HttpResponse(str(r), content_type='application/xml')
+        data = _get_data(request)
+        blacklisted = is_blacklisted(data['From'])
+    except Exception:
+        return None
+
+    if blacklisted:
+        return _blacklisted_response(data)
+    return None
+
+
+async def aget_blacklisted_response(request):
+    """Async version of :func:`get_blacklisted_response`, for use in
+    ``async def`` views.
+    """
+    try:
+        data = _get_data(request)
+        blacklisted = await ais_blacklisted(data['From'])
     except Exception:
-        pass
+        return None
 
+    if blacklisted:
+        return _blacklisted_response(data)
     return None
 
 
+def get_rate_limited_response(request):
+    """Count ``request`` against the rate limit of its ``From`` number, or
+    of its ``To`` number for calls you placed (see
+    :mod:`django_twilio.ratelimit`).
+
+    :returns: The same HttpResponse as :func:`get_blacklisted_response` if
+        the caller is over the limit, None otherwise.
+    """
+    limiter = get_limiter()
+    data = _get_data(request)
+    phone_number = _get_remote_number(data)
+    if limiter is None or not phone_number:
+        return None
+    if limiter.allow(phone_number):
+        return None
+    return _blacklisted_response(data)
+
+
+async def aget_rate_limited_response(request):
+    """Async version of :func:`get_rate_limited_response`, for use in
+    ``async def`` views.
+    """
+    limiter = get_limiter()
+    data = _get_data(request)
+    phone_number = _get_remote_number(data)
+    if limiter is None or not phone_number:
+        return None
+    if await limiter.aallow(phone_number):
+        return None
+    return _blacklisted_response(data)
+
+
+def _get_data(request):
+    # get the request's payload.
+    # Only supporting GET and POST.
+    return get_params(request)
+
+
+def _get_remote_number(data):
+    # The ``From`` of the calls you place (``outbound-api``, ``outbound-dial``)
+    # is your own number; the other party is the ``To``.
+    if data.get('Direction', '').startswith('outbound'):
+        return data.get('To')
+    return data.get('From')
+
+
+def _blacklisted_response(data):
+    content = get_rejection(get_request_type(data))
+    return HttpResponse(content, content_type='application/xml')
+
+
 def create_sub_account(user, twilio_client, friendly_name=None):
     new_account = twilio_client.api.accounts.create(friendly_name=friendly_name or user)
     new_credential = Credential.objects.create(user=user, account_sid=new_account.sid, auth_token=new_account.auth_token, name=new_account.friendly_name)
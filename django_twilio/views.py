@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 
+from django.http import HttpResponse
 from twilio.twiml.voice_response import VoiceResponse, Dial
 from twilio.twiml.messaging_response import MessagingResponse
 
-from .decorators import twilio_view
+from .decorators import cache_twiml, twilio_view
+from .metrics import REGISTRY, generate_text
+from .status import build_call_status, build_message_status, get_buffer
 
 
 @twilio_view
+@cache_twiml
 def say(request, text, voice=None, language=None, loop=None):
     """
 See: http://www.twilio.com/docs/api/twiml/say.
@@ -26,6 +30,7 @@ Usage::
 
 
 @twilio_view
+@cache_twiml
 def play(request, url, loop=None):
     """
     See: http://www.twilio.com/docs/api/twiml/play.
@@ -47,6 +52,7 @@ def play(request, url, loop=None):
 
 
 @twilio_view
+@cache_twiml
 def gather(request, action=None, method='POST', num_digits=None, timeout=None,
            finish_on_key=None):
     """
@@ -68,6 +74,7 @@ def gather(request, action=None, method='POST', num_digits=None, timeout=None,
 
 
 @twilio_view
+@cache_twiml
 def record(request, action=None, method='POST', timeout=None,
            finish_on_key=None, max_length=None, transcribe=None,
            transcribe_callback=None, play_beep=None):
@@ -92,6 +99,7 @@ def record(request, action=None, method='POST', timeout=None,
 
 
 @twilio_view
+@cache_twiml
 def sms(request, message, to=None, sender=None, action=None, method='POST',
         status_callback=None):
     """
@@ -116,6 +124,7 @@ def sms(request, message, to=None, sender=None, action=None, method='POST',
 
 
 @twilio_view
+@cache_twiml
 def message(request, message, to=None, sender=None, action=None,
             methods='POST', media=None, status_callback=None):
     """
@@ -143,6 +152,7 @@ def message(request, message, to=None, sender=None, action=None,
 
 
 @twilio_view
+@cache_twiml
 def dial(request, number, action=None, method='POST', timeout=None,
          hangup_on_star=None, time_limit=None, caller_id=None):
     """
@@ -165,6 +175,7 @@ def dial(request, number, action=None, method='POST', timeout=None,
 
 
 @twilio_view
+@cache_twiml
 def conference(request, name, muted=None, beep=None,
                start_conference_on_enter=None, end_conference_on_exit=None,
                wait_url=None, wait_method='POST', max_participants=None):
@@ -192,3 +203,70 @@ def conference(request, name, muted=None, beep=None,
                     )
     r.append(dial)
     return r
+
+
+def metrics(request):
+    """
+    Serve the metrics recorded with ``DJANGO_TWILIO_METRICS = True`` in the
+    Prometheus text format. See :mod:`django_twilio.metrics`.
+
+    This view isn't protected in any way, so only expose it where your
+    Prometheus server (and nobody else) can reach it.
+
+    Usage::
+
+        # urls.py
+        urlpatterns = [
+            # ...
+            path('metrics/', django_twilio.views.metrics),
+            # ...
+        ]
+    """
+    return HttpResponse(
+        generate_text(REGISTRY),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@twilio_view(rate_limit=False)
+def message_status(request):
+    """
+    Record a message status callback as a
+    :class:`django_twilio.models.MessageStatus`.
+
+    The callback is buffered and saved in bulk in the background, so this
+    view responds straight away. See :mod:`django_twilio.status`.
+
+    Usage::
+
+        # urls.py
+        urlpatterns = [
+            # ...
+            path('status/message/', django_twilio.views.message_status),
+            # ...
+        ]
+    """
+    get_buffer().add(build_message_status(request))
+    return HttpResponse(status=204)
+
+
+@twilio_view(rate_limit=False)
+def call_status(request):
+    """
+    Record a call status callback as a
+    :class:`django_twilio.models.CallStatus`.
+
+    The callback is buffered and saved in bulk in the background, so this
+    view responds straight away. See :mod:`django_twilio.status`.
+
+    Usage::
+
+        # urls.py
+        urlpatterns = [
+            # ...
+            path('status/call/', django_twilio.views.call_status),
+            # ...
+        ]
+    """
+    get_buffer().add(build_call_status(request))
+    return HttpResponse(status=204)
@@ -30,7 +30,10 @@ setup(
     # Package dependencies:
     install_requires=[
         'setuptools>=36.2',
-        'twilio>=7',
+        # 8.0 added the aiohttp based client async_client builds on.
+        'twilio>=8',
+        'aiohttp>=3.8.4',
+        'aiohttp-retry>=2.9',
         'django-phonenumber-field>=0.6',
         'phonenumbers>=8.10.22',
     ] + INSTALL_PYTHON_REQUIRES,
@@ -1,7 +1,22 @@
 # -*- coding: utf-8 -*-
 
+from .asgi import *
+from .async_client import *
+from .blacklist import *
+from .bulk import *
+from .cache import *
 from .client import *
 from .decorators import *
+from .idempotency import *
+from .metrics import *
+from .middleware import *
 from .models import *
 from .views import *
+from .ratelimit import *
 from .request import *
+from .snapshot import *
+from .status import *
+from .timing import *
+from .trie import *
+from .twiml import *
+from .validator import *
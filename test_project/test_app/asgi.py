@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from django_twilio.asgi import LifespanMiddleware
+
+
+class LifespanMiddlewareTestCase(SimpleTestCase):
+
+    async def run_lifespan(self, messages):
+        sent = []
+        messages = iter(messages)
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        app = mock.AsyncMock()
+        await LifespanMiddleware(app)({'type': 'lifespan'}, receive, send)
+        app.assert_not_called()
+        return sent
+
+    async def test_lifespan(self):
+        with mock.patch('django_twilio.async_client.aclose') as aclose:
+            sent = await self.run_lifespan([
+                {'type': 'lifespan.startup'},
+                {'type': 'lifespan.shutdown'},
+            ])
+        self.assertEqual(
+            sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        aclose.assert_awaited_once_with()
+
+    async def test_shutdown_failed(self):
+        with mock.patch('django_twilio.async_client.aclose',
+                        side_effect=OSError('Oops')):
+            sent = await self.run_lifespan([{'type': 'lifespan.shutdown'}])
+        self.assertEqual(sent, ['lifespan.shutdown.failed'])
+
+    async def test_other_connections(self):
+        app = mock.AsyncMock()
+        scope = {'type': 'http'}
+        await LifespanMiddleware(app)(scope, 'receive', 'send')
+        app.assert_awaited_once_with(scope, 'receive', 'send')
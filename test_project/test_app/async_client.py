@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import gc
+import threading
+import warnings
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio import async_client, credentials
+from django_twilio.models import Credential
+
+from .client import StubServer
+
+
+class AsyncClientTestCase(TestCase):
+
+    def setUp(self):
+        self.server = StubServer()
+        thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        credentials.reset()
+        self.addCleanup(credentials.reset)
+
+    async def test_request(self):
+        try:
+            client = async_client.get_client('AC1', 'token')
+            self.assertIs(async_client.get_client('AC1', 'token'), client)
+            self.assertTrue(client.http_client.is_async)
+            response = await client.request_async('GET', self.server.url)
+            self.assertEqual(response.status_code, 200)
+        finally:
+            await async_client.aclose()
+
+    async def test_connections_are_shared(self):
+        try:
+            for account_sid in ('AC1', 'AC2', 'AC1'):
+                await async_client.get_client(
+                    account_sid, 'token').request_async(
+                        'GET', self.server.url + account_sid)
+        finally:
+            await async_client.aclose()
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    @override_settings(DJANGO_TWILIO_HTTP_BACKOFF=0)
+    async def test_retry(self):
+        self.server.statuses = [503, 429]
+        try:
+            response = await async_client.get_client(
+                'AC1', 'token').request_async('GET', self.server.url)
+        finally:
+            await async_client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    @override_settings(DJANGO_TWILIO_HTTP_BACKOFF=0)
+    async def test_post_is_not_retried(self):
+        self.server.statuses = [503]
+        try:
+            response = await async_client.get_client(
+                'AC1', 'token').request_async(
+                    'POST', self.server.url, data={'To': '1'})
+        finally:
+            await async_client.aclose()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, [('POST', '/')])
+
+    async def test_aget_user_client(self):
+        user = await User.objects.acreate(username='test')
+        await Credential.objects.acreate(
+            name='Test', user=user, account_sid='AAA', auth_token='BBB')
+        try:
+            client = await async_client.aget_user_client(user)
+            self.assertEqual(client.auth, ('AAA', 'BBB'))
+            self.assertIs(await async_client.aget_user_client(user), client)
+            self.assertEqual(
+                (await async_client.aget_user_client()).auth,
+                (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+        finally:
+            await async_client.aclose()
+
+    async def test_aclose(self):
+        registry = async_client.get_registry()
+        # The aiohttp session, wrapped by aiohttp_retry.
+        session = registry.http_client.session._client
+        await async_client.aclose()
+        self.assertTrue(session.closed)
+        try:
+            self.assertIsNot(async_client.get_registry(), registry)
+        finally:
+            await async_client.aclose()
+
+    @override_settings(DJANGO_TWILIO_HTTP_POOL_SIZE=3,
+                       DJANGO_TWILIO_HTTP_TIMEOUT=7,
+                       DJANGO_TWILIO_CLIENT_CACHE_SIZE=1)
+    async def test_settings(self):
+        try:
+            registry = async_client.get_registry()
+            self.assertEqual(registry.maxsize, 1)
+            self.assertEqual(registry.http_client.timeout, 7)
+            self.assertEqual(
+                registry.http_client.session._client.connector.limit_per_host,
+                3)
+        finally:
+            await async_client.aclose()
+
+    def test_registry_per_event_loop(self):
+        async def registry():
+            try:
+                return async_client.get_registry()
+            finally:
+                await async_client.aclose()
+
+        self.assertIsNot(asyncio.run(registry()), asyncio.run(registry()))
+
+    def test_closed_on_loop_shutdown(self):
+        async def request():
+            # No aclose(), as with asyncio.run in a management command.
+            client = async_client.get_client('AC1', 'token')
+            await client.request_async('GET', self.server.url)
+            return async_client.get_registry().http_client.session._client
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            sessions = [asyncio.run(request()) for _ in range(5)]
+            gc.collect()
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(async_client._registries, {})
+        self.assertTrue(all(session.closed for session in sessions))
+        self.assertEqual(
+            [w for w in caught if issubclass(w.category, ResourceWarning)],
+            [])
+
+    def test_closed_loops_are_pruned(self):
+        async def session():
+            return async_client.get_registry().http_client.session._client
+
+        self.addCleanup(async_client.reset)
+        sessions = []
+        for _ in range(5):
+            # A loop closed without shutting its async generators down.
+            loop = asyncio.new_event_loop()
+            sessions.append(loop.run_until_complete(session()))
+            loop.close()
+            # Only the registry of the loop just closed is left.
+            self.assertEqual(len(async_client._registries), 1)
+        self.assertTrue(all(session.closed for session in sessions[:4]))
+        self.assertFalse(sessions[4].closed)
+        async_client.reset()
+        self.assertTrue(sessions[4].closed)
+        self.assertEqual(async_client._registries, {})
+
+    def test_requires_running_loop(self):
+        self.assertRaises(RuntimeError, async_client.get_client, 'AC1', 'tok')
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+from twilio.twiml.messaging_response import Message
+from twilio.twiml.voice_response import VoiceResponse
+
+from django_twilio import blacklist
+from django_twilio.models import BlacklistRule, Caller
+from django_twilio.utils import get_blacklisted_response
+
+from .utils import TwilioRequestFactory
+
+
+class BlacklistCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.caller = G(Caller, phone_number='+15005550001', blacklisted=True)
+
+    def test_lookup(self):
+        self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+        self.assertFalse(blacklist.is_blacklisted('+15005550002'))
+
+    def test_repeat_lookups_skip_the_database(self):
+        blacklist.is_blacklisted('+15005550001')
+        blacklist.is_blacklisted('+15005550002')
+        with self.assertNumQueries(0):
+            self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+            self.assertFalse(blacklist.is_blacklisted('+15005550002'))
+
+    async def test_async_lookup(self):
+        self.assertTrue(await blacklist.ais_blacklisted('+15005550001'))
+        self.assertFalse(await blacklist.ais_blacklisted('+15005550002'))
+        self.assertIn('+15005550001', blacklist.get_cache())
+
+    def test_save_invalidates(self):
+        self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+        self.caller.blacklisted = False
+        self.caller.save()
+        self.assertFalse(blacklist.is_blacklisted('+15005550001'))
+
+    def test_phone_number_change_invalidates(self):
+        self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+        self.caller.phone_number = '+15005550003'
+        self.caller.save()
+        self.assertFalse(blacklist.is_blacklisted('+15005550001'))
+        self.assertTrue(blacklist.is_blacklisted('+15005550003'))
+
+    def test_delete_invalidates(self):
+        self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+        self.caller.delete()
+        self.assertFalse(blacklist.is_blacklisted('+15005550001'))
+
+    def test_create_invalidates(self):
+        self.assertFalse(blacklist.is_blacklisted('+15005550002'))
+        G(Caller, phone_number='+15005550002', blacklisted=True)
+        self.assertTrue(blacklist.is_blacklisted('+15005550002'))
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_CACHE_SIZE=0)
+    def test_cache_can_be_disabled(self):
+        self.assertIsNone(blacklist.get_cache())
+        # The rule trie is loaded once, whether or not lookups are cached.
+        blacklist.get_rules()
+        with self.assertNumQueries(1):
+            self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+        with self.assertNumQueries(1):
+            self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        blacklist.is_blacklisted('+15005550001')
+        blacklist.is_blacklisted('+15005550002')
+        self.assertEqual(len(blacklist.get_cache()), 1)
+
+
+class RejectionTestCase(SimpleTestCase):
+
+    def test_default_rejections(self):
+        r = VoiceResponse()
+        r.reject()
+        self.assertEqual(blacklist.get_rejection('voice'), str(r).encode('utf-8'))
+        self.assertEqual(
+            blacklist.get_rejection('message'), str(Message()).encode('utf-8'))
+        self.assertEqual(
+            blacklist.get_rejection('unknown'), str(Message()).encode('utf-8'))
+
+    def test_rejections_are_precomputed(self):
+        self.assertIs(
+            blacklist.get_rejection('voice'), blacklist.get_rejection('voice'))
+
+    def test_reject_reason(self):
+        for reason in ('busy', 'rejected'):
+            with override_settings(DJANGO_TWILIO_BLACKLIST_REJECT_REASON=reason):
+                r = VoiceResponse()
+                r.reject(reason=reason)
+                self.assertEqual(
+                    blacklist.get_rejection('voice'), str(r).encode('utf-8'))
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_REJECT_REASON='hangup')
+    def test_invalid_reject_reason(self):
+        self.assertRaises(
+            ImproperlyConfigured, blacklist.get_rejection, 'voice')
+
+
+class BlacklistedResponseTestCase(TestCase):
+
+    def setUp(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_REJECT_REASON='busy')
+    def test_busy_voice_response(self):
+        request = self.factory.post(
+            '/', {'From': '+15005550001', 'CallSid': 'CA123'})
+        response = get_blacklisted_response(request)
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        self.assertIn(b'<Reject reason="busy" />', response.content)
+
+    def test_message_response(self):
+        request = self.factory.post(
+            '/', {'From': '+15005550001', 'MessageSid': 'SM123'})
+        self.assertEqual(
+            get_blacklisted_response(request).content,
+            str(Message()).encode('utf-8'),
+        )
+
+    def test_not_blacklisted(self):
+        request = self.factory.post('/', {'From': '+15005550002'})
+        self.assertIsNone(get_blacklisted_response(request))
+        self.assertIsNone(get_blacklisted_response(self.factory.post('/')))
+
+
+class BlacklistRuleTestCase(TestCase):
+
+    def setUp(self):
+        self.rule = G(BlacklistRule, prefix='+1555123', active=True)
+
+    def tearDown(self):
+        # Rules rolled back with the test transaction don't send signals.
+        blacklist.reset()
+
+    def test_prefix_is_blacklisted(self):
+        self.assertTrue(blacklist.is_blacklisted('+15551230000'))
+        self.assertTrue(blacklist.is_blacklisted('+15551239999'))
+        self.assertFalse(blacklist.is_blacklisted('+15551240000'))
+
+    def test_rules_are_loaded_once(self):
+        blacklist.is_blacklisted('+15551230000')
+        with self.assertNumQueries(0):
+            self.assertTrue(blacklist.is_blacklisted('+15551230001'))
+
+    def test_saved_rule_updates_trie(self):
+        blacklist.get_rules()
+        G(BlacklistRule, prefix='+44', active=True)
+        with self.assertNumQueries(0):
+            self.assertTrue(blacklist.is_blacklisted('+447700900123'))
+
+    def test_deactivated_rule_updates_trie(self):
+        blacklist.get_rules()
+        self.rule.active = False
+        self.rule.save()
+        self.assertFalse(blacklist.is_blacklisted('+15551230000'))
+
+    def test_changed_prefix_updates_trie(self):
+        blacklist.get_rules()
+        self.rule.prefix = '+1666'
+        self.rule.save()
+        self.assertFalse(blacklist.is_blacklisted('+15551230000'))
+        self.assertTrue(blacklist.is_blacklisted('+16660000000'))
+
+    def test_deleted_rule_updates_trie(self):
+        blacklist.get_rules()
+        self.rule.delete()
+        self.assertFalse(blacklist.is_blacklisted('+15551230000'))
+
+    def test_inactive_rules_are_not_loaded(self):
+        G(BlacklistRule, prefix='+44', active=False)
+        self.assertFalse(blacklist.is_blacklisted('+447700900123'))
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_RULES_TTL=0)
+    def test_rules_reload_after_ttl(self):
+        blacklist.get_rules()
+        # Another process's change, which sends no signal here.
+        BlacklistRule.objects.update(active=False)
+        self.assertFalse(blacklist.is_blacklisted('+15551230000'))
+
+    async def test_async(self):
+        self.assertTrue(await blacklist.ais_blacklisted('+15551230000'))
+        self.assertFalse(await blacklist.ais_blacklisted('+15551240000'))
+
+    def test_blacklisted_response(self):
+        factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        request = factory.post(
+            '/', {'From': '+15551230000', 'CallSid': 'CA123'})
+        self.assertIsNotNone(get_blacklisted_response(request))
+
+
+class NormalizePhoneNumberTestCase(SimpleTestCase):
+
+    def test_e164(self):
+        self.assertEqual(
+            blacklist.normalize_phone_number(' +15005550001 '), '+15005550001')
+
+    def test_national(self):
+        self.assertEqual(
+            blacklist.normalize_phone_number('(415) 555-2671', 'US'),
+            '+14155552671')
+
+    def test_international(self):
+        self.assertEqual(
+            blacklist.normalize_phone_number('+44 20 7946 0958'),
+            '+442079460958')
+
+    def test_invalid(self):
+        self.assertIsNone(blacklist.normalize_phone_number('not a number'))
+        self.assertIsNone(blacklist.normalize_phone_number('12', 'US'))
+
+
+class BlacklistImportExportTestCase(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write_csv(self, content):
+        path = os.path.join(self.dir, 'callers.csv')
+        with open(path, 'w', newline='') as f:
+            f.write(content)
+        return path
+
+    def import_csv(self, content, **options):
+        out = StringIO()
+        call_command(
+            'twilio_blacklist_import', self.write_csv(content), stdout=out,
+            stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def blacklisted(self):
+        return {
+            str(number): blacklisted
+            for number, blacklisted in Caller.objects.values_list(
+                'phone_number', 'blacklisted')
+        }
+
+    def test_import(self):
+        out = self.import_csv(
+            'phone_number\n+15005550001\n(415) 555-2671\nnonsense\n',
+            region='US')
+        self.assertIn('Imported 2 callers, skipped 1 rows.', out)
+        self.assertEqual(self.blacklisted(), {
+            '+15005550001': True,
+            '+14155552671': True,
+        })
+
+    def test_import_updates_existing_callers(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        G(Caller, phone_number='+15005550002', blacklisted=False)
+        self.import_csv(
+            'phone_number,blacklisted\n'
+            '+15005550001,false\n'
+            '+15005550002,true\n'
+            '+15005550003,\n')
+        self.assertEqual(self.blacklisted(), {
+            '+15005550001': False,
+            '+15005550002': True,
+            '+15005550003': True,
+        })
+
+    def test_import_duplicates_in_one_chunk(self):
+        self.import_csv(
+            'phone_number,blacklisted\n'
+            '+15005550001,true\n'
+            '+15005550001,false\n')
+        self.assertEqual(self.blacklisted(), {'+15005550001': False})
+
+    def test_import_in_chunks(self):
+        numbers = ['+1500555{:04d}'.format(i) for i in range(25)]
+        out = self.import_csv(
+            'phone_number\n' + '\n'.join(numbers) + '\n',
+            batch_size=3, chunk_size=10)
+        self.assertIn('Imported 25 callers', out)
+        self.assertEqual(Caller.objects.count(), 25)
+
+    def test_import_column(self):
+        self.import_csv(
+            'name,number\nAlice,+15005550001\n', column='number')
+        self.assertEqual(self.blacklisted(), {'+15005550001': True})
+
+    def test_import_no_header(self):
+        self.import_csv(
+            '+15005550001\n+15005550002,no\n', no_header=True)
+        self.assertEqual(self.blacklisted(), {
+            '+15005550001': True,
+            '+15005550002': False,
+        })
+
+    def test_import_missing_column(self):
+        with self.assertRaises(CommandError):
+            self.import_csv('number\n+15005550001\n')
+
+    def test_import_invalid_blacklisted_value(self):
+        out = self.import_csv('phone_number,blacklisted\n+15005550001,maybe\n')
+        self.assertIn('skipped 1 rows', out)
+        self.assertFalse(Caller.objects.exists())
+
+    def test_import_clears_blacklist_cache(self):
+        self.assertFalse(blacklist.is_blacklisted('+15005550001'))
+        self.import_csv('phone_number\n+15005550001\n')
+        self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+
+    def test_import_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'twilio_blacklist_import', os.path.join(self.dir, 'missing'))
+
+    def test_export(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        G(Caller, phone_number='+15005550002', blacklisted=False)
+        out = StringIO()
+        call_command('twilio_blacklist_export', stdout=out)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ['phone_number,blacklisted', '+15005550001,true'])
+
+    def test_export_all(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        G(Caller, phone_number='+15005550002', blacklisted=False)
+        out = StringIO()
+        call_command('twilio_blacklist_export', all=True, stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'phone_number,blacklisted',
+            '+15005550001,true',
+            '+15005550002,false',
+        ])
+
+    def test_round_trip(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        G(Caller, phone_number='+15005550002', blacklisted=False)
+        path = os.path.join(self.dir, 'export.csv')
+        out = StringIO()
+        call_command(
+            'twilio_blacklist_export', all=True, output=path, stdout=out)
+        self.assertIn('Exported 2 callers', out.getvalue())
+
+        Caller.objects.all().delete()
+        call_command('twilio_blacklist_import', path, stdout=StringIO())
+        self.assertEqual(self.blacklisted(), {
+            '+15005550001': True,
+            '+15005550002': False,
+        })
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from twilio.base.exceptions import TwilioRestException
+
+from django_twilio.bulk import (
+    BulkSender, TokenBucket, asend_bulk_messages, send_bulk_messages)
+
+
+class FakeMessages(object):
+    """Stands in for ``client.messages``, failing each message with the
+    statuses listed for its ``to`` in ``failures`` before sending it.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.created = []
+        self.lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self.lock:
+            statuses = self.failures.get(kwargs['to'])
+            if statuses:
+                raise TwilioRestException(
+                    statuses.pop(0), '/Messages.json', method='POST')
+            self.created.append(kwargs)
+            return SimpleNamespace(sid='SM{}'.format(len(self.created)))
+
+    async def create_async(self, **kwargs):
+        return self.create(**kwargs)
+
+
+def fake_client(failures=None):
+    return SimpleNamespace(messages=FakeMessages(failures))
+
+
+def messages(count, **kwargs):
+    for i in range(count):
+        yield dict(kwargs, to='+1500555{:04d}'.format(i), body='Hi!')
+
+
+FAST = {'rate': 10 ** 6, 'backoff': 0}
+
+
+class TokenBucketTestCase(SimpleTestCase):
+
+    def test_rate(self):
+        with mock.patch('django_twilio.bulk.time.monotonic',
+                        return_value=100):
+            bucket = TokenBucket(2)
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0.5)
+            self.assertEqual(bucket.reserve(), 1)
+
+    def test_refill(self):
+        with mock.patch('django_twilio.bulk.time.monotonic') as monotonic:
+            monotonic.return_value = 100
+            bucket = TokenBucket(2, burst=2)
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0.5)
+            # Idle time doesn't buy more than ``burst`` tokens.
+            monotonic.return_value = 200
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0.5)
+
+    def test_acquire_sleeps(self):
+        bucket = TokenBucket(1)
+        bucket.acquire()
+        with mock.patch('django_twilio.bulk.time.sleep') as sleep:
+            bucket.acquire()
+        self.assertAlmostEqual(sleep.call_args[0][0], 1, places=1)
+
+
+class BulkSenderTestCase(SimpleTestCase):
+
+    def test_retry_delay(self):
+        sender = BulkSender(fake_client(), retries=3, backoff=1, max_backoff=3)
+        error = TwilioRestException(429, '/')
+        with mock.patch('django_twilio.bulk.random.uniform',
+                        side_effect=lambda low, high: high):
+            self.assertEqual(
+                [sender.get_retry_delay(error, n) for n in (1, 2, 3, 4)],
+                [1, 2, 3, None])
+        self.assertIsNone(
+            sender.get_retry_delay(TwilioRestException(400, '/'), 1))
+        self.assertIsNone(sender.get_retry_delay(ValueError(), 1))
+
+    def test_senders_are_throttled_separately(self):
+        sender = BulkSender(fake_client(), rates={'+15005550001': 5})
+        _, first = sender.prepare({'to': '1', 'from_': '+15005550001'})
+        _, second = sender.prepare({'to': '1', 'from_': '+15005550002'})
+        _, service = sender.prepare(
+            {'to': '1', 'messaging_service_sid': 'MG1'})
+        self.assertIs(
+            sender.prepare({'to': '2', 'from_': '+15005550001'})[1], first)
+        self.assertEqual(
+            (first.rate, second.rate, service.rate), (5, 1, 1))
+
+    @override_settings(TWILIO_DEFAULT_CALLERID='+15005550006',
+                       DJANGO_TWILIO_BULK_RATE=3,
+                       DJANGO_TWILIO_BULK_RATES={'+15005550006': 30})
+    def test_settings(self):
+        sender = BulkSender(fake_client())
+        kwargs, bucket = sender.prepare({'to': '1'})
+        self.assertEqual(kwargs['from_'], '+15005550006')
+        self.assertEqual(bucket.rate, 30)
+        self.assertEqual(sender.prepare({'to': '1', 'from_': 'x'})[1].rate, 3)
+        self.assertNotIn(
+            'from_',
+            sender.prepare({'to': '1', 'messaging_service_sid': 'MG1'})[0])
+
+    def test_invalid_rate(self):
+        self.assertRaises(ValueError, BulkSender, fake_client(), rate=0)
+
+
+class SendBulkMessagesTestCase(SimpleTestCase):
+
+    def test_send(self):
+        client = fake_client()
+        results = list(send_bulk_messages(
+            messages(50, from_='+15005550006'), client, workers=4, **FAST))
+        self.assertEqual(len(results), 50)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(
+            {result.sid for result in results},
+            {'SM{}'.format(i) for i in range(1, 51)})
+        self.assertEqual(
+            sorted(m['to'] for m in client.messages.created),
+            sorted(m['to'] for m in messages(50)))
+
+    def test_retry(self):
+        client = fake_client({'+15005550001': [429, 503]})
+        results = {
+            result.message['to']: result
+            for result in send_bulk_messages(
+                messages(3, from_='+15005550006'), client, **FAST)
+        }
+        self.assertTrue(results['+15005550001'].ok)
+        self.assertEqual(results['+15005550001'].attempts, 3)
+        self.assertEqual(results['+15005550000'].attempts, 1)
+
+    def test_errors_are_reported(self):
+        client = fake_client({'+15005550001': [400], '+15005550002': [500]})
+        results = {
+            result.message['to']: result
+            for result in send_bulk_messages(
+                messages(3, from_='+15005550006'), client, retries=0, **FAST)
+        }
+        self.assertTrue(results['+15005550000'].ok)
+        self.assertEqual(results['+15005550001'].error.status, 400)
+        self.assertEqual(results['+15005550002'].error.status, 500)
+        self.assertIsNone(results['+15005550002'].sid)
+
+    def test_messages_are_read_lazily(self):
+        read = []
+
+        def recipients():
+            for message in messages(1000, from_='+15005550006'):
+                read.append(message)
+                yield message
+
+        results = send_bulk_messages(recipients(), fake_client(), workers=2,
+                                     **FAST)
+        next(results)
+        self.assertLessEqual(len(read), 5)
+        results.close()
+        self.assertLess(len(read), 10)
+
+    def test_throttled(self):
+        with mock.patch('django_twilio.bulk.TokenBucket.acquire') as acquire:
+            list(send_bulk_messages(
+                messages(5, from_='+15005550006'), fake_client()))
+        self.assertEqual(acquire.call_count, 5)
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            next(send_bulk_messages(messages(1), fake_client(), workers=0))
+
+
+class AsendBulkMessagesTestCase(SimpleTestCase):
+
+    async def test_send(self):
+        client = fake_client({'+15005550001': [429]})
+        results = [
+            result async for result in asend_bulk_messages(
+                messages(20, from_='+15005550006'), client, concurrency=3,
+                **FAST)
+        ]
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(len(client.messages.created), 20)
+
+    async def test_async_iterable(self):
+        async def recipients():
+            for message in messages(5, from_='+15005550006'):
+                await asyncio.sleep(0)
+                yield message
+
+        results = [
+            result async for result in asend_bulk_messages(
+                recipients(), fake_client(), **FAST)
+        ]
+        self.assertEqual(len(results), 5)
+
+    async def test_concurrency(self):
+        running = []
+        peak = []
+
+        class Messages(FakeMessages):
+            async def create_async(self, **kwargs):
+                running.append(kwargs)
+                peak.append(len(running))
+                await asyncio.sleep(0.001)
+                running.remove(kwargs)
+                return self.create(**kwargs)
+
+        client = SimpleNamespace(messages=Messages())
+        async for _ in asend_bulk_messages(
+                messages(20, from_='+15005550006'), client, concurrency=4,
+                **FAST):
+            pass
+        self.assertEqual(max(peak), 4)
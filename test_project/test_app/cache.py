@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from django_twilio.cache import LRUCache, MISSING
+
+
+class LRUCacheTestCase(SimpleTestCase):
+
+    def test_get_and_set(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIs(cache.get('b', MISSING), MISSING)
+        self.assertIn('a', cache)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+
+    def test_entries_expire(self):
+        cache = LRUCache(2, ttl=10)
+        with mock.patch('django_twilio.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('django_twilio.cache.time.monotonic', return_value=109):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('django_twilio.cache.time.monotonic', return_value=110):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_stale_generation_is_not_stored(self):
+        cache = LRUCache(2)
+        generation = cache.generation
+        cache.clear()
+        cache.set('a', 1, generation=generation)
+        self.assertNotIn('a', cache)
+        cache.set('a', 1, generation=cache.generation)
+        self.assertIn('a', cache)
+
+    def test_pop(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertIsNone(cache.pop('a'))
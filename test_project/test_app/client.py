@@ -1,13 +1,30 @@
 # -*- coding: utf-8 -*-
 
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.contrib.auth.models import User
 from django.conf import settings
 
 from twilio.rest import Client
 from django_dynamic_fixture import G
 
-from django_twilio.client import twilio_client
+import django_twilio
+from django_twilio import client as client_module
+from django_twilio import credentials as credentials_module
+from django_twilio.client import (
+    ClientRegistry, build_http_client, get_client, get_user_client,
+    twilio_client)
+from django_twilio.credentials import (
+    aresolve_twilio_credentials, resolve_twilio_credentials)
 from django_twilio.models import Credential
 from django_twilio.utils import discover_twilio_credentials
 
@@ -37,3 +54,352 @@ class TwilioClientTestCase(TestCase):
 
         self.assertEqual(credentials[0], self.credentials.account_sid)
         self.assertEqual(credentials[1], self.credentials.auth_token)
+
+
+class ResolveTwilioCredentialsTestCase(TestCase):
+
+    def setUp(self):
+        credentials_module.reset()
+        self.addCleanup(credentials_module.reset)
+        self.user = G(User, username='test', password='pass')
+        self.credential = G(
+            Credential,
+            name='Test Credentials',
+            account_sid='AAA',
+            auth_token='BBB',
+            user=self.user,
+        )
+
+    def test_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                resolve_twilio_credentials(self.user), ('AAA', 'BBB'))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolve_twilio_credentials(self.user), ('AAA', 'BBB'))
+
+    def test_same_result_as_discover(self):
+        self.assertEqual(
+            resolve_twilio_credentials(self.user),
+            discover_twilio_credentials(self.user))
+        self.assertEqual(
+            resolve_twilio_credentials(), discover_twilio_credentials())
+
+    def test_save_invalidates(self):
+        resolve_twilio_credentials(self.user)
+        self.credential.auth_token = 'CCC'
+        self.credential.save()
+        self.assertEqual(
+            resolve_twilio_credentials(self.user), ('AAA', 'CCC'))
+
+    def test_delete_falls_back(self):
+        resolve_twilio_credentials(self.user)
+        self.credential.delete()
+        self.assertEqual(
+            resolve_twilio_credentials(self.user),
+            (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+
+    def test_user_without_credential_is_cached(self):
+        other = G(User, username='other', password='pass')
+        with self.assertNumQueries(1):
+            resolve_twilio_credentials(other)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                resolve_twilio_credentials(other),
+                (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+        G(Credential, account_sid='DDD', auth_token='EEE', user=other)
+        self.assertEqual(resolve_twilio_credentials(other), ('DDD', 'EEE'))
+
+    def test_environ_fallback_is_cached(self):
+        patched = {'TWILIO_ACCOUNT_SID': 'env-sid',
+                   'TWILIO_AUTH_TOKEN': 'env-auth'}
+        with mock.patch.dict(os.environ, patched):
+            self.assertEqual(
+                resolve_twilio_credentials(), ('env-sid', 'env-auth'))
+        self.assertEqual(resolve_twilio_credentials(), ('env-sid', 'env-auth'))
+        credentials_module.reset()
+        self.assertEqual(
+            resolve_twilio_credentials(),
+            (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+
+    def test_settings_change_resets_fallback(self):
+        resolve_twilio_credentials()
+        with override_settings(TWILIO_ACCOUNT_SID='ACnew'):
+            self.assertEqual(resolve_twilio_credentials()[0], 'ACnew')
+
+    @override_settings()
+    def test_none(self):
+        del settings.TWILIO_AUTH_TOKEN
+        del settings.TWILIO_ACCOUNT_SID
+        self.assertRaises(AttributeError, resolve_twilio_credentials)
+
+    @override_settings(DJANGO_TWILIO_CREDENTIAL_CACHE_SIZE=0)
+    def test_cache_disabled(self):
+        with self.assertNumQueries(2):
+            resolve_twilio_credentials(self.user)
+            resolve_twilio_credentials(self.user)
+
+    async def test_async(self):
+        self.assertEqual(
+            await aresolve_twilio_credentials(self.user), ('AAA', 'BBB'))
+
+    async def test_async_without_async_queryset_iteration(self):
+        # What Django 4.0, which can't iterate over a QuerySet with
+        # ``async for``, runs instead.
+        with mock.patch(
+                'django_twilio.credentials._aquery_user_credentials',
+                sync_to_async(credentials_module._query_user_credentials)):
+            self.assertEqual(
+                await aresolve_twilio_credentials(self.user), ('AAA', 'BBB'))
+        self.assertEqual(
+            resolve_twilio_credentials(self.user), ('AAA', 'BBB'))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request with the next status in ``server.statuses``
+    (200 once they run out), recording the method, path and client port.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def handle_one_request(self):
+        self.server.connections.add(self.client_address)
+        super().handle_one_request()
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+            status = self.server.statuses.pop(0) if self.server.statuses \
+                else 200
+        body = json.dumps({'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.statuses = []
+        self.connections = set()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self.server_address[1])
+
+
+class ClientRegistryTestCase(TestCase):
+
+    def setUp(self):
+        self.server = StubServer()
+        thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.http_client = build_http_client(retries=2, backoff=0)
+        self.addCleanup(self.http_client.session.close)
+
+    def test_same_credentials_same_client(self):
+        registry = ClientRegistry(http_client=self.http_client)
+        client = registry.get('AC1', 'token')
+        self.assertIs(registry.get('AC1', 'token'), client)
+        self.assertIsNot(registry.get('AC1', 'other'), client)
+        self.assertEqual(client.auth, ('AC1', 'token'))
+        self.assertIs(client.http_client, self.http_client)
+
+    def test_eviction(self):
+        registry = ClientRegistry(2, self.http_client)
+        first = registry.get('AC1', 'token')
+        registry.get('AC2', 'token')
+        registry.get('AC1', 'token')
+        registry.get('AC3', 'token')
+        self.assertEqual(len(registry), 2)
+        self.assertIn(('AC1', 'token'), registry)
+        self.assertNotIn(('AC2', 'token'), registry)
+        self.assertIs(registry.get('AC1', 'token'), first)
+
+    def test_discard(self):
+        registry = ClientRegistry(http_client=self.http_client)
+        client = registry.get('AC1', 'token')
+        registry.discard('AC1', 'token')
+        self.assertIsNot(registry.get('AC1', 'token'), client)
+
+    def test_thread_safety(self):
+        registry = ClientRegistry(http_client=self.http_client)
+        clients = []
+        threads = [
+            threading.Thread(
+                target=lambda: clients.append(registry.get('AC1', 'token')))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    def test_connections_are_shared(self):
+        registry = ClientRegistry(http_client=self.http_client)
+        for account_sid in ('AC1', 'AC2', 'AC1', 'AC3'):
+            response = registry.get(account_sid, 'token').request(
+                'GET', self.server.url + account_sid)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 4)
+        # Every client went through the same kept-alive connection.
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_retry(self):
+        self.server.statuses = [503, 429]
+        client = ClientRegistry(http_client=self.http_client).get(
+            'AC1', 'token')
+        response = client.request('GET', self.server.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_retries_run_out(self):
+        self.server.statuses = [503, 503, 503, 503]
+        client = ClientRegistry(http_client=self.http_client).get(
+            'AC1', 'token')
+        response = client.request('GET', self.server.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_post_is_not_retried(self):
+        self.server.statuses = [503]
+        client = ClientRegistry(http_client=self.http_client).get(
+            'AC1', 'token')
+        response = client.request('POST', self.server.url, data={'To': '1'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, [('POST', '/')])
+
+
+class GetClientTestCase(TestCase):
+
+    def setUp(self):
+        client_module.reset()
+        self.addCleanup(client_module.reset)
+        credentials_module.reset()
+        self.addCleanup(credentials_module.reset)
+
+    def test_get_client(self):
+        client = get_client('AC1', 'token')
+        self.assertIs(get_client('AC1', 'token'), client)
+        self.assertIs(client.http_client, client_module.get_http_client())
+
+    def test_get_user_client(self):
+        user = G(User, username='test', password='pass')
+        G(Credential, account_sid='AAA', auth_token='BBB', user=user)
+        self.assertEqual(get_user_client(user).auth, ('AAA', 'BBB'))
+        self.assertEqual(
+            get_user_client().auth,
+            (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+
+    @override_settings(DJANGO_TWILIO_HTTP_POOL_SIZE=3,
+                       DJANGO_TWILIO_HTTP_RETRIES=5,
+                       DJANGO_TWILIO_HTTP_TIMEOUT=7,
+                       DJANGO_TWILIO_CLIENT_CACHE_SIZE=1)
+    def test_settings(self):
+        http_client = client_module.get_http_client()
+        adapter = http_client.session.get_adapter('https://api.twilio.com')
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertEqual(http_client.timeout, 7)
+        self.assertEqual(client_module.get_registry().maxsize, 1)
+
+    def test_settings_change_resets(self):
+        client = get_client('AC1', 'token')
+        with override_settings(DJANGO_TWILIO_CLIENT_CACHE_SIZE=5):
+            self.assertIsNot(get_client('AC1', 'token'), client)
+
+
+# Sets up Django with the Twilio credentials nowhere to be found, and imports
+# everything a webhook-only project would.
+IMPORT_SCRIPT = """
+import django
+from django.conf import settings
+
+settings.configure(
+    INSTALLED_APPS=[
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'django_twilio',
+    ],
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3'}},
+)
+django.setup()
+
+import django_twilio.client
+import django_twilio.decorators
+import django_twilio.settings
+import django_twilio.utils
+import django_twilio.views
+
+assert not hasattr(django_twilio.settings, 'TWILIO_ACCOUNT_SID')
+"""
+
+
+def import_times():
+    """Run ``IMPORT_SCRIPT`` with ``-X importtime``, returning the
+    cumulative microseconds spent importing each module.
+    """
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(('TWILIO_', 'DJANGO_SETTINGS_MODULE'))}
+    env['PYTHONPATH'] = os.path.dirname(
+        os.path.dirname(os.path.abspath(django_twilio.__file__)))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+        env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+class LazyImportTestCase(TestCase):
+
+    def test_import_without_credentials(self):
+        times = import_times()
+        self.assertIn('django_twilio.client', times)
+        # The REST client, and requests, wait until a client is built.
+        self.assertNotIn('twilio.rest', times)
+        self.assertNotIn('twilio.http.http_client', times)
+        self.assertNotIn('requests', times)
+
+    def test_twilio_client_is_lazy(self):
+        client_module.reset()
+        self.addCleanup(client_module.reset)
+        with mock.patch('django_twilio.client.get_client') as get_client:
+            client = client_module.SimpleLazyObject(
+                client_module._get_default_client)
+            get_client.assert_not_called()
+            client.auth
+            get_client.assert_called_once_with(
+                settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def test_settings_credentials(self):
+        from django_twilio import settings as twilio_settings
+        self.assertEqual(
+            twilio_settings.TWILIO_ACCOUNT_SID, settings.TWILIO_ACCOUNT_SID)
+        self.assertEqual(
+            twilio_settings.TWILIO_AUTH_TOKEN, settings.TWILIO_AUTH_TOKEN)
+        with override_settings(TWILIO_AUTH_TOKEN='changed'):
+            self.assertEqual(twilio_settings.TWILIO_AUTH_TOKEN, 'changed')
+        with self.assertRaises(AttributeError):
+            twilio_settings.TWILIO_DEFAULT_CALLERID
@@ -2,19 +2,24 @@
 
 import os
 
+from asgiref.sync import iscoroutinefunction
 from unittest import mock
 from django.conf import settings
 from django.http import HttpResponse
-from django.test import Client, TestCase
+from django.test import AsyncClient, Client, TestCase
 from django.test.utils import override_settings
 from django_dynamic_fixture import G
 from twilio.twiml.messaging_response import Message
 from twilio.twiml.voice_response import VoiceResponse
 
-from django_twilio.models import Caller
+from django.contrib.auth.models import User
+
+from django_twilio.models import Caller, Credential
 from django_twilio.utils import discover_twilio_credentials
 from .utils import TwilioRequestFactory
 from .views import (response_view, str_view, bytes_view, verb_view,
+                    async_str_view, async_verb_view,
+                    tenant_view, async_tenant_view,
                     BytesView, StrView, VerbView, ResponseView)
 
 
@@ -89,6 +94,23 @@ class TwilioViewTestCase(TestCase):
         request = self.factory.get(self.str_uri)
         self.assertEqual(str_view(request).status_code, 200)
 
+    @override_settings(DEBUG=False)
+    def test_allows_urlencoded_post(self):
+        request = self.factory.post_form(
+            self.str_uri, {'CallSid': 'CA1', 'From': '+15005550000'})
+        self.assertEqual(str_view(request).status_code, 200)
+
+        request = self.factory.post_form(
+            self.str_uri, {'CallSid': 'CA1', 'From': '+15005550000'},
+            HTTP_X_TWILIO_SIGNATURE='forged')
+        self.assertEqual(str_view(request).status_code, 403)
+
+    @override_settings(DEBUG=False)
+    def test_blacklist_urlencoded_post(self):
+        request = self.factory.post_form(
+            self.str_uri, {'CallSid': 'CA1', 'From': '+15005550001'})
+        self.assertIn(b'<Reject', str_view(request).content)
+
     def test_class_view_allows_post(self):
         request = self.factory.post(self.str_class_uri)
         self.assertEqual(StrView.as_view()(request).status_code, 200)
@@ -344,6 +366,154 @@ class TwilioViewTestCase(TestCase):
             self.assertEqual(StrView.as_view()(request).status_code, 403)
 
 
+class AsyncTwilioViewTestCase(TestCase):
+
+    def setUp(self):
+        self.blocked_caller = G(Caller, phone_number='+15005550001', blacklisted=True)
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        self.str_uri = '/test_app/decorators/async_str_view/'
+        self.verb_uri = '/test_app/decorators/async_verb_view/'
+
+    def test_decorator_returns_coroutine_function(self):
+        self.assertTrue(iscoroutinefunction(async_str_view))
+        self.assertEqual(async_str_view.__name__, 'async_str_view')
+        self.assertTrue(async_str_view.csrf_exempt)
+
+    async def test_allows_post(self):
+        request = self.factory.post(self.str_uri)
+        response = await async_str_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/xml')
+
+    async def test_allows_get(self):
+        request = self.factory.get(self.str_uri)
+        self.assertEqual((await async_str_view(request)).status_code, 200)
+
+    async def test_decorator_modifies_verb(self):
+        request = self.factory.post(self.verb_uri)
+        response = await async_verb_view(request)
+        self.assertIsInstance(response, HttpResponse)
+        r = VoiceResponse()
+        r.reject()
+        self.assertEqual(response.content, str(r).encode('utf-8'))
+
+    async def test_incorrect_signature_returns_forbidden(self):
+        request = self.factory.post(
+            self.str_uri,
+            HTTP_X_TWILIO_SIGNATURE='fake_signature',
+        )
+        with override_settings(DEBUG=False):
+            self.assertEqual((await async_str_view(request)).status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual((await async_str_view(request)).status_code, 200)
+
+    async def test_requires_get_or_post(self):
+        c = AsyncClient(enforce_csrf_checks=True)
+        with override_settings(DEBUG=False):
+            self.assertEqual((await c.post(self.str_uri)).status_code, 403)
+            self.assertEqual((await c.put(self.str_uri)).status_code, 405)
+        with override_settings(DEBUG=True):
+            self.assertEqual((await c.post(self.str_uri)).status_code, 200)
+
+    async def test_blacklist_works(self):
+        with override_settings(DEBUG=False):
+            request = self.factory.post(
+                self.str_uri, {'From': str(self.blocked_caller.phone_number)})
+            response = await async_str_view(request)
+            self.assertEqual(response.content, str(Message()).encode('utf-8'))
+
+            request = self.factory.post(
+                self.str_uri, {'From': str(self.blocked_caller.phone_number),
+                               'callsid': 'some-call-sid'})
+            response = await async_str_view(request)
+            r = VoiceResponse()
+            r.reject()
+            self.assertEqual(response.content, str(r).encode('utf-8'))
+
+    async def test_from_field_no_caller(self):
+        request = self.factory.post(self.str_uri, {'From': '+12222222222'})
+        response = await async_str_view(request)
+        self.assertEqual(
+            response.content, b'<Response><Message>Hi!</Message></Response>')
+
+
+@override_settings(DEBUG=False)
+class MultiTenantTwilioViewTestCase(TestCase):
+
+    def setUp(self):
+        self.uri = '/test_app/decorators/tenant_view/'
+        self.credential = G(
+            Credential,
+            name='Tenant',
+            account_sid='AC' + 'T' * 32,
+            auth_token='Z' * 32,
+            user=G(User, username='tenant'),
+        )
+        self.tenant_factory = TwilioRequestFactory(token=self.credential.auth_token)
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    def test_tenant_request_is_allowed(self):
+        request = self.tenant_factory.post(
+            self.uri, {'AccountSid': self.credential.account_sid})
+        self.assertEqual(tenant_view(request).status_code, 200)
+
+    def test_main_account_request_is_allowed(self):
+        request = self.factory.post(
+            self.uri, {'AccountSid': settings.TWILIO_ACCOUNT_SID})
+        self.assertEqual(tenant_view(request).status_code, 200)
+
+    def test_wrong_token_is_forbidden(self):
+        request = self.factory.post(
+            self.uri, {'AccountSid': self.credential.account_sid})
+        self.assertEqual(tenant_view(request).status_code, 403)
+
+    def test_unknown_account_is_forbidden(self):
+        request = self.tenant_factory.post(self.uri, {'AccountSid': 'ACunknown'})
+        self.assertEqual(tenant_view(request).status_code, 403)
+
+    def test_missing_account_is_forbidden(self):
+        request = self.tenant_factory.post(self.uri)
+        self.assertEqual(tenant_view(request).status_code, 403)
+
+    def test_steady_state_costs_no_queries(self):
+        data = {'AccountSid': self.credential.account_sid}
+        tenant_view(self.tenant_factory.post(self.uri, data))
+        request = self.tenant_factory.post(self.uri, data)
+        with self.assertNumQueries(0), \
+                override_settings(DJANGO_TWILIO_BLACKLIST_CHECK=False):
+            self.assertEqual(tenant_view(request).status_code, 200)
+
+    def test_credential_change_invalidates_cache(self):
+        data = {'AccountSid': self.credential.account_sid}
+        tenant_view(self.tenant_factory.post(self.uri, data))
+        self.credential.auth_token = 'N' * 32
+        self.credential.save()
+        self.assertEqual(
+            tenant_view(self.tenant_factory.post(self.uri, data)).status_code,
+            403,
+        )
+        factory = TwilioRequestFactory(token=self.credential.auth_token)
+        self.assertEqual(
+            tenant_view(factory.post(self.uri, data)).status_code, 200)
+
+    def test_credential_delete_invalidates_cache(self):
+        data = {'AccountSid': self.credential.account_sid}
+        tenant_view(self.tenant_factory.post(self.uri, data))
+        self.credential.delete()
+        self.assertEqual(
+            tenant_view(self.tenant_factory.post(self.uri, data)).status_code,
+            403,
+        )
+
+    async def test_async_tenant_view(self):
+        request = self.tenant_factory.post(
+            self.uri, {'AccountSid': self.credential.account_sid})
+        self.assertEqual((await async_tenant_view(request)).status_code, 200)
+        request = self.factory.post(
+            self.uri, {'AccountSid': self.credential.account_sid})
+        self.assertEqual((await async_tenant_view(request)).status_code, 403)
+
+
 class TwilioUtilTest(TestCase):
     def test_discover_twilio_credentials_environ(self):
         SID = 'TWILIO_ACCOUNT_SID'
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from django_twilio.decorators import twilio_view
+from django_twilio.idempotency import (
+    CacheResponseStore, LocMemResponseStore, from_entry, get_idempotency_key,
+    get_store, reset_store, to_entry)
+
+from .utils import TwilioRequestFactory
+from .views import async_idempotent_view, idempotent_view
+
+
+class IdempotencyKeyTestCase(TestCase):
+
+    def setUp(self):
+        self.uri = '/test_app/decorators/idempotent_view/'
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    def test_keys_on_sid_and_signature(self):
+        for name in ('CallSid', 'MessageSid', 'SmsSid'):
+            request = self.factory.post(self.uri, {name: 'XX123'})
+            self.assertEqual(
+                get_idempotency_key(request),
+                'XX123:' + request.headers['x-twilio-signature'],
+            )
+
+    def test_no_sid_no_key(self):
+        self.assertIsNone(get_idempotency_key(self.factory.post(self.uri)))
+
+    def test_unsigned_requests(self):
+        key = get_idempotency_key(
+            self.factory.post(self.uri, {'CallSid': 'CA1'},
+                              HTTP_X_TWILIO_SIGNATURE=''))
+        self.assertEqual(key, get_idempotency_key(
+            self.factory.post(self.uri, {'CallSid': 'CA1'},
+                              HTTP_X_TWILIO_SIGNATURE='')))
+        self.assertNotEqual(key, get_idempotency_key(
+            self.factory.post(self.uri, {'CallSid': 'CA1', 'Digits': '1'},
+                              HTTP_X_TWILIO_SIGNATURE='')))
+
+
+class ResponseStoreTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_entries(self):
+        response = HttpResponse(b'<Response/>', content_type='application/xml')
+        entry = to_entry(response)
+        rebuilt = from_entry(entry)
+        self.assertEqual(rebuilt.content, b'<Response/>')
+        self.assertEqual(rebuilt['Content-Type'], 'application/xml')
+        self.assertIsNone(to_entry(HttpResponse(status=500)))
+        self.assertIsNone(to_entry(StreamingHttpResponse([b'x'])))
+
+    def test_stores(self):
+        for store in (LocMemResponseStore(), CacheResponseStore()):
+            self.assertIsNone(store.get('key'))
+            store.set('key', (200, 'application/xml', b'<Response/>'))
+            self.assertEqual(
+                store.get('key'), (200, 'application/xml', b'<Response/>'))
+
+    async def test_async_stores(self):
+        for store in (LocMemResponseStore(), CacheResponseStore()):
+            self.assertIsNone(await store.aget('key'))
+            await store.aset('key', (200, 'application/xml', b'<Response/>'))
+            self.assertEqual(
+                await store.aget('key'), (200, 'application/xml', b'<Response/>'))
+
+    def test_claims(self):
+        for store in (LocMemResponseStore(), CacheResponseStore()):
+            self.assertTrue(store.claim('key'))
+            self.assertFalse(store.claim('key'))
+            self.assertIsNone(store.get('key'))
+            store.release('key')
+            self.assertTrue(store.claim('key'))
+            store.set('key', (200, 'application/xml', b'<Response/>'))
+            self.assertFalse(store.claim('key'))
+            self.assertEqual(
+                store.get('key'), (200, 'application/xml', b'<Response/>'))
+
+    def test_claims_expire(self):
+        for store in (LocMemResponseStore(claim_timeout=0),
+                      CacheResponseStore(claim_timeout=0.001)):
+            self.assertTrue(store.claim('key'))
+            with mock.patch('time.monotonic', return_value=1e12), \
+                    mock.patch('time.time', return_value=1e12):
+                self.assertTrue(store.claim('key'))
+
+    async def test_async_claims(self):
+        for store in (LocMemResponseStore(), CacheResponseStore()):
+            self.assertTrue(await store.aclaim('key'))
+            self.assertFalse(await store.aclaim('key'))
+            self.assertIsNone(await store.aget('key'))
+            await store.arelease('key')
+            self.assertTrue(await store.aclaim('key'))
+
+    def test_store_is_configurable(self):
+        self.assertIsInstance(get_store(), LocMemResponseStore)
+        with override_settings(
+                DJANGO_TWILIO_IDEMPOTENCY_STORE='django_twilio.idempotency.CacheResponseStore',
+                DJANGO_TWILIO_IDEMPOTENCY_STORE_OPTIONS={'timeout': 60}):
+            self.assertIsInstance(get_store(), CacheResponseStore)
+            self.assertEqual(get_store().timeout, 60)
+
+
+class IdempotentTwilioViewTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_store()
+        self.uri = '/test_app/decorators/idempotent_view/'
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    def test_retries_get_the_stored_response(self):
+        first = idempotent_view(self.factory.post(self.uri, {'CallSid': 'CA1'}))
+        retry = idempotent_view(self.factory.post(self.uri, {'CallSid': 'CA1'}))
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Content-Type'], 'application/xml')
+
+    def test_new_deliveries_run_the_view(self):
+        first = idempotent_view(self.factory.post(self.uri, {'CallSid': 'CA2'}))
+        other = idempotent_view(self.factory.post(self.uri, {'CallSid': 'CA3'}))
+        self.assertNotEqual(first.content, other.content)
+        digits = idempotent_view(
+            self.factory.post(self.uri, {'CallSid': 'CA2', 'Digits': '1'}))
+        self.assertNotEqual(first.content, digits.content)
+
+    def test_requests_without_sid_always_run_the_view(self):
+        first = idempotent_view(self.factory.post(self.uri))
+        second = idempotent_view(self.factory.post(self.uri))
+        self.assertNotEqual(first.content, second.content)
+
+    @override_settings(
+        DJANGO_TWILIO_IDEMPOTENCY_STORE='django_twilio.idempotency.CacheResponseStore')
+    def test_cache_backend_store(self):
+        first = idempotent_view(self.factory.post(self.uri, {'MessageSid': 'SM1'}))
+        retry = idempotent_view(self.factory.post(self.uri, {'MessageSid': 'SM1'}))
+        self.assertEqual(retry.content, first.content)
+
+    @override_settings(DEBUG=False)
+    def test_forged_retries_are_still_rejected(self):
+        idempotent_view(self.factory.post(self.uri, {'CallSid': 'CA4'}))
+        request = self.factory.post(
+            self.uri, {'CallSid': 'CA4'}, HTTP_X_TWILIO_SIGNATURE='fake')
+        self.assertEqual(idempotent_view(request).status_code, 403)
+
+    async def test_async_view(self):
+        first = await async_idempotent_view(
+            self.factory.post(self.uri, {'CallSid': 'CA5'}))
+        retry = await async_idempotent_view(
+            self.factory.post(self.uri, {'CallSid': 'CA5'}))
+        self.assertEqual(retry.content, first.content)
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_CHECK=False)
+    def test_overlapping_deliveries_run_the_view_once(self):
+        started, finish, polled = (
+            threading.Event(), threading.Event(), threading.Event())
+        calls = []
+
+        @twilio_view(idempotent=True)
+        def view(request):
+            calls.append(request)
+            started.set()
+            finish.wait(5)
+            return '<Response><Message>{}</Message></Response>'.format(
+                len(calls))
+
+        responses = {}
+
+        def deliver(name):
+            responses[name] = view(
+                self.factory.post(self.uri, {'CallSid': 'CA6'}))
+
+        first = threading.Thread(target=deliver, args=('first',))
+        first.start()
+        self.assertTrue(started.wait(5))
+
+        store = get_store()
+        get = store.get
+
+        def spy(key):
+            polled.set()
+            return get(key)
+
+        with mock.patch.object(store, 'get', spy):
+            retry = threading.Thread(target=deliver, args=('retry',))
+            retry.start()
+            # The retry is waiting for the first delivery's response.
+            self.assertTrue(polled.wait(5))
+            finish.set()
+            first.join(5)
+            retry.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(responses['retry'].status_code, 200)
+        self.assertEqual(
+            responses['retry'].content, responses['first'].content)
+
+    @override_settings(DJANGO_TWILIO_IDEMPOTENCY_WAIT=0)
+    def test_overlapping_delivery_gives_up_waiting(self):
+        request = self.factory.post(self.uri, {'CallSid': 'CA7'})
+        self.assertTrue(get_store().claim(get_idempotency_key(request)))
+        self.assertEqual(idempotent_view(request).status_code, 503)
+
+    def test_failed_deliveries_release_their_claim(self):
+        @twilio_view(idempotent=True)
+        def failing_view(request):
+            raise ValueError
+
+        @twilio_view(idempotent=True)
+        def error_view(request):
+            return HttpResponse(status=500)
+
+        request = self.factory.post(self.uri, {'CallSid': 'CA8'})
+        key = get_idempotency_key(request)
+        with self.assertRaises(ValueError):
+            failing_view(request)
+        self.assertTrue(get_store().claim(key))
+        get_store().release(key)
+        self.assertEqual(error_view(request).status_code, 500)
+        self.assertTrue(get_store().claim(key))
+
+    @override_settings(DJANGO_TWILIO_BLACKLIST_CHECK=False)
+    async def test_async_overlapping_deliveries_run_the_view_once(self):
+        started, finish, polled = (
+            asyncio.Event(), asyncio.Event(), asyncio.Event())
+        calls = []
+
+        @twilio_view(idempotent=True)
+        async def view(request):
+            calls.append(request)
+            started.set()
+            await finish.wait()
+            return '<Response><Message>{}</Message></Response>'.format(
+                len(calls))
+
+        first = asyncio.ensure_future(
+            view(self.factory.post(self.uri, {'CallSid': 'CA9'})))
+        await started.wait()
+
+        store = get_store()
+        aget = store.aget
+
+        async def spy(key):
+            polled.set()
+            return await aget(key)
+
+        with mock.patch.object(store, 'aget', spy):
+            retry = asyncio.ensure_future(
+                view(self.factory.post(self.uri, {'CallSid': 'CA9'})))
+            await polled.wait()
+            finish.set()
+            first, retry = await asyncio.gather(first, retry)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from django.conf import settings
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio.metrics import REGISTRY, Registry, generate_text
+from django_twilio.models import Caller
+
+from .utils import TwilioRequestFactory
+from .views import str_view
+
+
+class RegistryTestCase(TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter(self):
+        counter = self.registry.counter('calls_total', 'Calls.', ('type',))
+        counter.inc('voice')
+        counter.inc('voice', amount=2)
+        counter.inc('message')
+        self.assertEqual(
+            generate_text(self.registry),
+            '# HELP calls_total Calls.\n'
+            '# TYPE calls_total counter\n'
+            'calls_total{type="message"} 1\n'
+            'calls_total{type="voice"} 3\n',
+        )
+
+    def test_histogram(self):
+        histogram = self.registry.histogram(
+            'latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(
+            generate_text(self.registry),
+            '# HELP latency_seconds Latency.\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{le="0.1"} 2\n'
+            'latency_seconds_bucket{le="1.0"} 3\n'
+            'latency_seconds_bucket{le="+Inf"} 4\n'
+            'latency_seconds_sum 2.65\n'
+            'latency_seconds_count 4\n',
+        )
+
+    def test_shards_are_merged(self):
+        counter = self.registry.counter('calls_total', 'Calls.')
+        histogram = self.registry.histogram(
+            'latency_seconds', 'Latency.', buckets=(1.0,))
+
+        def record():
+            for _ in range(1000):
+                counter.inc()
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        record()
+
+        # The shards of the threads that exited were folded into the
+        # registry's totals.
+        self.assertEqual(len(self.registry._shards), 1)
+        text = generate_text(self.registry)
+        self.assertIn('calls_total 5000\n', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 5000\n', text)
+        self.assertIn('latency_seconds_count 5000\n', text)
+
+    def test_exited_threads_are_retired(self):
+        counter = self.registry.counter('calls_total', 'Calls.', ('type',))
+        histogram = self.registry.histogram(
+            'latency_seconds', 'Latency.', buckets=(1.0,))
+
+        def record():
+            counter.inc('voice')
+            histogram.observe(2.0)
+
+        for _ in range(1000):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(self.registry._shards), 0)
+        text = generate_text(self.registry)
+        self.assertIn('calls_total{type="voice"} 1000\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1000\n', text)
+        self.assertIn('latency_seconds_sum 2000.0\n', text)
+
+        self.registry.clear()
+        self.assertNotIn('calls_total{', generate_text(self.registry))
+
+    def test_escaping(self):
+        counter = self.registry.counter(
+            'calls_total', 'Calls\\with\nnewlines.', ('path',))
+        counter.inc('a"b\\c\nd')
+        self.assertEqual(
+            generate_text(self.registry),
+            '# HELP calls_total Calls\\\\with\\nnewlines.\n'
+            '# TYPE calls_total counter\n'
+            'calls_total{path="a\\"b\\\\c\\nd"} 1\n',
+        )
+
+    def test_duplicate_names(self):
+        self.registry.counter('calls_total', 'Calls.')
+        with self.assertRaises(ValueError):
+            self.registry.histogram('calls_total', 'Calls.')
+
+    def test_clear(self):
+        counter = self.registry.counter('calls_total', 'Calls.')
+        counter.inc()
+        self.registry.clear()
+        self.assertEqual(
+            generate_text(self.registry),
+            '# HELP calls_total Calls.\n# TYPE calls_total counter\n',
+        )
+
+
+@override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=True,
+                   DJANGO_TWILIO_METRICS=True)
+class TwilioViewMetricsTestCase(TestCase):
+
+    def setUp(self):
+        self.uri = '/test_app/decorators/str_view/'
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        REGISTRY.clear()
+
+    def tearDown(self):
+        REGISTRY.clear()
+
+    def metrics(self):
+        response = Client().get('/test_app/metrics/')
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8',
+        )
+        return response.content.decode('utf-8')
+
+    def test_responses(self):
+        str_view(self.factory.post(self.uri, {'CallSid': 'CA1'}))
+        str_view(self.factory.post(self.uri, {'MessageSid': 'SM1'}))
+        str_view(self.factory.post(self.uri, {'MessageSid': 'SM2'}))
+        text = self.metrics()
+        self.assertIn(
+            'django_twilio_responses_total'
+            '{request_type="message",status="200"} 2\n', text)
+        self.assertIn(
+            'django_twilio_responses_total'
+            '{request_type="voice",status="200"} 1\n', text)
+
+    def test_forged_requests(self):
+        str_view(self.factory.post(self.uri, HTTP_X_TWILIO_SIGNATURE='forged'))
+        text = self.metrics()
+        self.assertIn('django_twilio_forged_requests_total 1\n', text)
+        self.assertIn(
+            'django_twilio_responses_total'
+            '{request_type="unknown",status="403"} 1\n', text)
+
+    def test_blacklisted_requests(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        str_view(self.factory.post(
+            self.uri, {'CallSid': 'CA1', 'From': '+15005550001'}))
+        text = self.metrics()
+        self.assertIn(
+            'django_twilio_blacklisted_requests_total'
+            '{request_type="voice"} 1\n', text)
+        self.assertNotIn('django_twilio_forged_requests_total 1', text)
+
+    def test_view_duration(self):
+        str_view(self.factory.post(self.uri))
+        self.assertIn(
+            'django_twilio_view_duration_seconds_count'
+            '{view="test_project.test_app.views.str_view"} 1\n',
+            self.metrics(),
+        )
+
+    @override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=False)
+    def test_view_duration_by_url_name(self):
+        Client().post('/test_app/decorators/named_str_view/')
+        self.assertIn(
+            'django_twilio_view_duration_seconds_count'
+            '{view="named_str_view"} 1\n',
+            self.metrics(),
+        )
+
+    @override_settings(DJANGO_TWILIO_METRICS=False)
+    def test_disabled(self):
+        str_view(self.factory.post(self.uri))
+        self.assertNotIn('django_twilio_responses_total{', self.metrics())
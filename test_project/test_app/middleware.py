@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio import blacklist
+from django_twilio.metrics import REGISTRY
+from django_twilio.middleware import TwilioWebhookMiddleware
+from django_twilio.models import Caller, Credential
+from django_twilio.request import decompose
+from django_twilio.signals import webhook_timed
+
+from .utils import TwilioRequestFactory
+from .views import str_view
+
+
+MIDDLEWARE = settings.MIDDLEWARE + [
+    'django_twilio.middleware.TwilioWebhookMiddleware',
+]
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE,
+                   DJANGO_TWILIO_FORGERY_PROTECTION=True,
+                   DJANGO_TWILIO_WEBHOOK_PREFIXES=['/test_app/webhooks/'])
+class TwilioWebhookMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        self.client = Client(enforce_csrf_checks=True)
+
+    def post(self, uri, data=None, **extra):
+        # Sign the request with the factory, then send it through the full
+        # middleware stack.
+        request = self.factory.post(uri, data or {}, **extra)
+        return self.client.post(
+            uri, data or {},
+            HTTP_X_TWILIO_SIGNATURE=request.headers['x-twilio-signature'])
+
+    def test_not_used_without_prefixes(self):
+        with override_settings(DJANGO_TWILIO_WEBHOOK_PREFIXES=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                TwilioWebhookMiddleware(lambda request: HttpResponse())
+
+    def test_valid_request(self):
+        response = self.post(
+            '/test_app/webhooks/echo/', {'From': '+15005550000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content,
+            b'<Response><Message>+15005550000</Message></Response>',
+        )
+
+    def test_class_based_view(self):
+        response = self.post('/test_app/webhooks/class/', {'CallSid': 'CA1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<Response><Say>voice</Say></Response>')
+
+    def test_forged_request(self):
+        response = self.client.post(
+            '/test_app/webhooks/echo/', {'From': '+15005550000'},
+            HTTP_X_TWILIO_SIGNATURE='forged')
+        self.assertEqual(response.status_code, 403)
+
+    def test_unsigned_request(self):
+        response = self.client.post('/test_app/webhooks/echo/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_blacklisted_caller(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        response = self.post(
+            '/test_app/webhooks/echo/',
+            {'CallSid': 'CA1', 'From': '+15005550001'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<Reject', response.content)
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(1, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+    def test_rate_limited_caller(self):
+        data = {'CallSid': 'CA1', 'From': '+15005550009'}
+        response = self.post('/test_app/webhooks/echo/', data)
+        self.assertEqual(
+            response.content,
+            b'<Response><Message>+15005550009</Message></Response>')
+        response = self.post('/test_app/webhooks/echo/', data)
+        self.assertIn(b'<Reject', response.content)
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(1, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+    def test_status_callbacks_are_not_rate_limited(self):
+        for i in range(5):
+            response = self.post('/test_app/webhooks/echo/', {
+                'MessageSid': 'SM{}'.format(i),
+                'MessageStatus': 'delivered',
+                'From': '+15005550008',
+            })
+            self.assertEqual(
+                response.content,
+                b'<Response><Message>+15005550008</Message></Response>')
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(1, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+    def test_outbound_calls_are_limited_by_recipient(self):
+        for to in ('+15005550101', '+15005550102', '+15005550101'):
+            response = self.post('/test_app/webhooks/echo/', {
+                'CallSid': 'CA1',
+                'CallStatus': 'in-progress',
+                'Direction': 'outbound-api',
+                'From': '+15005550007',
+                'To': to,
+            })
+        self.assertIn(b'<Reject', response.content)
+        response = self.post('/test_app/webhooks/echo/', {
+            'CallSid': 'CA2',
+            'Direction': 'outbound-api',
+            'From': '+15005550007',
+            'To': '+15005550103',
+        })
+        self.assertEqual(
+            response.content,
+            b'<Response><Message>+15005550007</Message></Response>')
+
+    def test_other_paths_are_untouched(self):
+        # The CSRF middleware still protects everything else.
+        response = self.client.post('/test_app/decorators/response_view/')
+        self.assertEqual(response.status_code, 403)
+        with mock.patch('django_twilio.middleware._check_forgery') as check:
+            self.client.get('/test_app/metrics/')
+        check.assert_not_called()
+
+    def test_twilio_view_skips_checks(self):
+        with mock.patch('django_twilio.decorators._check_forgery') as check:
+            response = self.post('/test_app/webhooks/str_view/')
+        self.assertEqual(response.status_code, 200)
+        check.assert_not_called()
+
+    @override_settings(DJANGO_TWILIO_WEBHOOK_MULTI_TENANT=True)
+    def test_multi_tenant(self):
+        credential = G(Credential, account_sid='AC' + 'b' * 32,
+                       auth_token='b' * 32)
+        data = {'AccountSid': credential.account_sid, 'From': '+15005550000'}
+        request = TwilioRequestFactory(token=credential.auth_token).post(
+            '/test_app/webhooks/echo/', data)
+        response = self.client.post(
+            '/test_app/webhooks/echo/', data,
+            HTTP_X_TWILIO_SIGNATURE=request.headers['x-twilio-signature'])
+        self.assertEqual(response.status_code, 200)
+
+        response = self.post('/test_app/webhooks/echo/', data)
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE,
+                   DJANGO_TWILIO_FORGERY_PROTECTION=True,
+                   DJANGO_TWILIO_WEBHOOK_PREFIXES=['/test_app/webhooks/'],
+                   DJANGO_TWILIO_METRICS=True,
+                   DJANGO_TWILIO_TIMING=True)
+class TwilioWebhookMiddlewareInstrumentationTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        self.received = []
+        webhook_timed.connect(self.receiver)
+        self.addCleanup(webhook_timed.disconnect, self.receiver)
+        REGISTRY.clear()
+        self.addCleanup(REGISTRY.clear)
+        self.addCleanup(blacklist.clear_cache)
+
+    def receiver(self, **kwargs):
+        self.received.append(kwargs)
+
+    def post(self, uri, data):
+        request = self.factory.post(uri, data)
+        return Client().post(
+            uri, data,
+            HTTP_X_TWILIO_SIGNATURE=request.headers['x-twilio-signature'])
+
+    def metrics(self):
+        return Client().get('/test_app/metrics/').content.decode('utf-8')
+
+    def test_forged_requests(self):
+        response = Client().post(
+            '/test_app/webhooks/echo/', {'CallSid': 'CA1'},
+            HTTP_X_TWILIO_SIGNATURE='forged')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('django_twilio_forged_requests_total 1\n', self.metrics())
+        self.assertEqual(len(self.received), 1)
+        self.assertIs(self.received[0]['sender'], TwilioWebhookMiddleware)
+        self.assertEqual(list(self.received[0]['timings']), ['forgery'])
+
+    def test_blacklisted_requests(self):
+        G(Caller, phone_number='+15005550011', blacklisted=True)
+        self.post('/test_app/webhooks/echo/',
+                  {'CallSid': 'CA1', 'From': '+15005550011'})
+        self.assertIn(
+            'django_twilio_blacklisted_requests_total'
+            '{request_type="voice"} 1\n', self.metrics())
+        self.assertEqual(
+            list(self.received[0]['timings']), ['forgery', 'blacklist'])
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(1, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+    def test_rate_limited_requests(self):
+        data = {'MessageSid': 'SM1', 'From': '+15005550012'}
+        self.post('/test_app/webhooks/echo/', data)
+        self.post('/test_app/webhooks/echo/', data)
+        text = self.metrics()
+        self.assertIn(
+            'django_twilio_rate_limited_requests_total'
+            '{request_type="message"} 1\n', text)
+        self.assertIn(
+            'django_twilio_responses_total'
+            '{request_type="message",status="200"} 1\n', text)
+        # Only the rejected request is timed by the middleware; the echo
+        # view isn't decorated.
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(
+            list(self.received[0]['timings']),
+            ['forgery', 'blacklist', 'ratelimit'])
+
+    @override_settings(DJANGO_TWILIO_METRICS=False,
+                       DJANGO_TWILIO_TIMING=False)
+    def test_disabled(self):
+        with mock.patch('django_twilio.middleware.StageTimer') as timer:
+            Client().post('/test_app/webhooks/echo/',
+                          HTTP_X_TWILIO_SIGNATURE='forged')
+        timer.assert_not_called()
+        self.assertEqual(self.received, [])
+
+
+class DecomposeTestCase(TestCase):
+
+    @override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=True)
+    def test_decompose_does_not_skip_checks(self):
+        # Only the middleware marks a request as checked; a view decomposing
+        # a request first doesn't.
+        request = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN).post(
+            '/test_app/decorators/str_view/', {'From': '+15005550000'},
+            HTTP_X_TWILIO_SIGNATURE='forged')
+        decompose(request)
+        self.assertEqual(str_view(request).status_code, 403)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio import blacklist, ratelimit
+from django_twilio.metrics import REGISTRY, generate_text
+from django_twilio.models import Caller
+from django_twilio.ratelimit import PromotionBuffer, RateLimiter
+
+from .utils import TwilioRequestFactory
+from .views import async_str_view, str_view
+
+
+CALLER = '+15005550099'
+
+
+def at(seconds):
+    return mock.patch('django_twilio.ratelimit.time.time',
+                      return_value=seconds)
+
+
+class RateLimiterTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_local(self):
+        limiter = RateLimiter(3, 60, cache_alias=None)
+        with at(10):
+            self.assertEqual(
+                [limiter.allow(CALLER) for _ in range(4)],
+                [True, True, True, False])
+            self.assertTrue(limiter.allow('+15005550002'))
+
+    def test_shared(self):
+        limiter = RateLimiter(3, 60)
+        with at(10):
+            self.assertEqual(
+                [limiter.allow(CALLER) for _ in range(4)],
+                [True, True, True, False])
+
+    def test_shared_between_processes(self):
+        first, second = RateLimiter(3, 60), RateLimiter(3, 60)
+        with at(10):
+            self.assertTrue(first.allow(CALLER))
+            self.assertTrue(second.allow(CALLER))
+            self.assertTrue(first.allow(CALLER))
+            self.assertFalse(second.allow(CALLER))
+
+    def test_blocked_callers_skip_the_cache(self):
+        limiter = RateLimiter(1, 60)
+        with at(10):
+            limiter.allow(CALLER)
+            self.assertFalse(limiter.allow(CALLER))
+            cache.clear()
+            self.assertFalse(limiter.allow(CALLER))
+
+    def test_block_ends_with_the_window(self):
+        limiter = RateLimiter(1, 60, cache_alias=None)
+        with at(10):
+            limiter.allow(CALLER)
+            self.assertFalse(limiter.allow(CALLER))
+        # Two windows later, nothing is carried over.
+        with at(130):
+            self.assertTrue(limiter.allow(CALLER))
+
+    def test_sliding_window(self):
+        limiter = RateLimiter(3, 60, cache_alias=None)
+        with at(50):
+            for _ in range(3):
+                self.assertTrue(limiter.allow(CALLER))
+        # 10 seconds into the next window, the previous one still counts
+        # 3 * 50 / 60 = 2.5 requests.
+        with at(70):
+            self.assertFalse(limiter.allow(CALLER))
+
+    def test_sliding_window_decays(self):
+        limiter = RateLimiter(3, 60, cache_alias=None)
+        with at(50):
+            for _ in range(3):
+                limiter.allow(CALLER)
+        # 50 seconds in, the previous window only counts 0.5 requests.
+        with at(110):
+            self.assertTrue(limiter.allow(CALLER))
+            self.assertTrue(limiter.allow(CALLER))
+            self.assertFalse(limiter.allow(CALLER))
+
+    def test_sliding_window_shared(self):
+        limiter = RateLimiter(3, 60)
+        with at(50):
+            for _ in range(3):
+                limiter.allow(CALLER)
+        with at(70):
+            self.assertFalse(RateLimiter(3, 60).allow(CALLER))
+
+    async def test_async_local(self):
+        limiter = RateLimiter(2, 60, cache_alias=None)
+        with at(10):
+            self.assertTrue(await limiter.aallow(CALLER))
+            self.assertTrue(await limiter.aallow(CALLER))
+            self.assertFalse(await limiter.aallow(CALLER))
+
+    async def test_async_shared(self):
+        limiter = RateLimiter(2, 60)
+        with at(10):
+            self.assertTrue(await limiter.aallow(CALLER))
+            self.assertTrue(limiter.allow(CALLER))
+            self.assertFalse(await limiter.aallow(CALLER))
+
+    def test_blacklist_after(self):
+        promotions = PromotionBuffer(flush_interval=3600)
+        self.addCleanup(promotions.close)
+        # The blacklist cache outlives the test transaction.
+        self.addCleanup(blacklist.clear_cache)
+        limiter = RateLimiter(
+            1, 60, cache_alias=None, blacklist_after=2, promotions=promotions)
+        G(Caller, phone_number=CALLER, blacklisted=False)
+        self.assertFalse(blacklist.is_blacklisted(CALLER))
+        with at(10):
+            limiter.allow(CALLER)
+            limiter.allow(CALLER)
+            self.assertEqual(len(promotions), 0)
+            limiter.allow(CALLER)
+            limiter.allow(CALLER)
+        self.assertEqual(len(promotions), 1)
+
+        promotions.flush()
+        self.assertTrue(Caller.objects.get(phone_number=CALLER).blacklisted)
+        self.assertTrue(blacklist.is_blacklisted(CALLER))
+
+    def test_promotions_are_deduplicated(self):
+        promotions = PromotionBuffer(flush_interval=3600)
+        self.addCleanup(promotions.close)
+        promotions.add(Caller(phone_number=CALLER, blacklisted=True))
+        promotions.add(Caller(phone_number=CALLER, blacklisted=True))
+        promotions.add(Caller(phone_number='+15005550002', blacklisted=True))
+        promotions.flush()
+        self.assertEqual(Caller.objects.filter(blacklisted=True).count(), 2)
+
+
+class GetLimiterTestCase(TestCase):
+
+    def tearDown(self):
+        ratelimit.reset()
+
+    def test_off_by_default(self):
+        self.assertIsNone(ratelimit.get_limiter())
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(30, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None,
+                       DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_AFTER=5,
+                       DJANGO_TWILIO_RATE_LIMIT_BLACKLIST_BATCH_SIZE=10)
+    def test_settings(self):
+        limiter = ratelimit.get_limiter()
+        self.assertIs(ratelimit.get_limiter(), limiter)
+        self.assertEqual((limiter.limit, limiter.period), (30, 60))
+        self.assertIsNone(limiter.cache_alias)
+        self.assertEqual(limiter.blacklist_after, 5)
+        self.assertEqual(limiter.promotions.batch_size, 10)
+
+
+@override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=True,
+                   DJANGO_TWILIO_RATE_LIMIT=(2, 60),
+                   DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+class TwilioViewRateLimitTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    def tearDown(self):
+        ratelimit.reset()
+
+    def request(self, **data):
+        return self.factory.post(
+            '/test_app/decorators/str_view/', dict(From=CALLER, **data))
+
+    def test_over_limit(self):
+        for _ in range(2):
+            response = str_view(self.request(CallSid='CA1'))
+            self.assertIn(b'<Message>Hi!</Message>', response.content)
+        response = str_view(self.request(CallSid='CA1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, blacklist.get_rejection('voice'))
+
+    def test_over_limit_message(self):
+        for _ in range(3):
+            response = str_view(self.request(MessageSid='SM1'))
+        self.assertEqual(response.content, blacklist.get_rejection('message'))
+
+    def test_outbound_calls(self):
+        # Outbound calls come From our own number; each recipient has a
+        # limit of its own.
+        for i in range(4):
+            response = str_view(self.factory.post(
+                '/test_app/decorators/str_view/', {
+                    'CallSid': 'CA{}'.format(i),
+                    'CallStatus': 'in-progress',
+                    'Direction': 'outbound-api',
+                    'From': CALLER,
+                    'To': '+1500555010{}'.format(i),
+                }))
+            self.assertIn(b'<Message>Hi!</Message>', response.content)
+
+        for _ in range(2):
+            response = str_view(self.factory.post(
+                '/test_app/decorators/str_view/', {
+                    'CallSid': 'CA9',
+                    'Direction': 'outbound-dial',
+                    'From': CALLER,
+                    'To': '+15005550100',
+                }))
+        self.assertEqual(response.content, blacklist.get_rejection('voice'))
+
+    def test_without_from(self):
+        for _ in range(3):
+            response = str_view(self.factory.post(
+                '/test_app/decorators/str_view/', {'CallSid': 'CA1'}))
+        self.assertIn(b'<Message>Hi!</Message>', response.content)
+
+    async def test_async_view(self):
+        for _ in range(2):
+            await async_str_view(self.request(CallSid='CA1'))
+        response = await async_str_view(self.request(CallSid='CA1'))
+        self.assertEqual(response.content, blacklist.get_rejection('voice'))
+
+    @override_settings(DJANGO_TWILIO_METRICS=True)
+    def test_metrics(self):
+        REGISTRY.clear()
+        self.addCleanup(REGISTRY.clear)
+        for _ in range(3):
+            str_view(self.request(CallSid='CA1'))
+        self.assertIn(
+            'django_twilio_rate_limited_requests_total'
+            '{request_type="voice"} 1\n',
+            generate_text(REGISTRY))
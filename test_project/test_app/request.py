@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
+from django.core.exceptions import TooManyFieldsSent
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.conf import settings
 
 from .utils import TwilioRequestFactory
 
-from django_twilio.request import decompose, TwilioRequest
+from django_twilio.request import (
+    decompose, get_params, get_request_type, is_status_callback,
+    TwilioRequest, WebhookParams)
+from django_twilio.validator import get_validator
 from django_twilio.exceptions import NotDjangoRequestException
 
 
@@ -72,3 +77,189 @@ class TestDecompose(TestRequestBase):
     def test_raises_not_django_request_exception(self):
         request = {}
         self.assertRaises(NotDjangoRequestException, decompose, request)
+
+    def test_decompose_is_memoized(self):
+        request = self.factory.post(
+            '/test_app/decorators/verb_view', self.call_dict)
+        response = decompose(request)
+        self.assertIs(request.twilio, response)
+        self.assertIs(decompose(request), response)
+
+    def test_unsupported_method_decompose_function(self):
+        request = self.factory.put('/test_app/decorators/verb_view')
+        self.assertIsNone(decompose(request))
+        self.assertFalse(hasattr(request, 'twilio'))
+
+
+class TestGetRequestType(TestRequestBase):
+
+    def test_request_types(self):
+        self.assertEqual(get_request_type(self.call_dict), 'voice')
+        self.assertEqual(get_request_type(self.message_dict), 'message')
+        self.assertEqual(get_request_type({}), 'unknown')
+        self.assertEqual(get_request_type({'CallSid': ''}), 'unknown')
+
+    def test_parameter_names_are_case_insensitive(self):
+        self.assertEqual(get_request_type({'callsid': 'CA1'}), 'voice')
+        self.assertEqual(get_request_type({'messageSid': 'SM1'}), 'message')
+
+    def test_matches_twilio_request(self):
+        for parameters in (self.call_dict, self.message_dict, {}):
+            self.assertEqual(
+                get_request_type(parameters), TwilioRequest(parameters).type)
+
+
+class TestIsStatusCallback(TestRequestBase):
+
+    def test_incoming_requests(self):
+        self.assertFalse(is_status_callback(self.call_dict))
+        self.assertFalse(is_status_callback(self.message_dict))
+        self.assertFalse(is_status_callback({}))
+        self.assertFalse(is_status_callback(
+            {'MessageSid': 'SM1', 'SmsStatus': 'received'}))
+        self.assertFalse(is_status_callback(
+            {'CallSid': 'CA1', 'CallStatus': 'ringing'}))
+        self.assertFalse(is_status_callback(
+            {'CallSid': 'CA1', 'CallStatus': 'in-progress', 'Digits': '1'}))
+
+    def test_status_callbacks(self):
+        self.assertTrue(is_status_callback(
+            {'MessageSid': 'SM1', 'MessageStatus': 'delivered',
+             'SmsStatus': 'delivered'}))
+        self.assertTrue(is_status_callback(
+            {'SmsSid': 'SM1', 'SmsStatus': 'sent'}))
+        self.assertTrue(is_status_callback(
+            {'CallSid': 'CA1', 'CallStatus': 'completed'}))
+        self.assertTrue(is_status_callback(
+            {'CallSid': 'CA1', 'CallStatus': 'ringing',
+             'CallbackSource': 'call-progress-events'}))
+
+    def test_parameter_names_are_case_insensitive(self):
+        self.assertTrue(is_status_callback({'messagestatus': 'failed'}))
+        self.assertTrue(is_status_callback({'CALLSTATUS': 'busy'}))
+
+
+class TestTwilioRequest(TestRequestBase):
+
+    def test_parameters_are_strings(self):
+        twilio_request = TwilioRequest(self.message_dict)
+        self.assertEqual(twilio_request.messagesid, 'MSXXXX')
+        self.assertEqual(twilio_request.from_, '+1123456789')
+        self.assertEqual(twilio_request.nummedia, '0')
+
+    def test_typed_fields(self):
+        twilio_request = TwilioRequest({
+            'MessageSid': 'MM1',
+            'NumMedia': '2',
+            'NumSegments': '1',
+            'MediaUrl0': 'https://example.com/0',
+            'MediaContentType0': 'image/png',
+            'MediaUrl1': 'https://example.com/1',
+            'MediaContentType1': 'image/gif',
+            'Latitude': '37.7749',
+            'Longitude': '-122.4194',
+        })
+        self.assertEqual(twilio_request.num_media, 2)
+        self.assertEqual(twilio_request.num_segments, 1)
+        self.assertEqual(
+            twilio_request.media_urls,
+            ['https://example.com/0', 'https://example.com/1'],
+        )
+        self.assertEqual(
+            twilio_request.media_content_types, ['image/png', 'image/gif'])
+        self.assertEqual(twilio_request.coordinates, (37.7749, -122.4194))
+        self.assertEqual(twilio_request.latitude, '37.7749')
+        self.assertIsNone(twilio_request.call_duration)
+
+    def test_typed_fields_are_converted_once(self):
+        twilio_request = TwilioRequest({'CallSid': 'CA1', 'CallDuration': '42'})
+        self.assertEqual(twilio_request.call_duration, 42)
+        twilio_request.callduration = '43'
+        self.assertEqual(twilio_request.call_duration, 42)
+
+    def test_typed_field_defaults(self):
+        twilio_request = TwilioRequest({'NumMedia': 'lots', 'Latitude': ''})
+        self.assertEqual(twilio_request.num_media, 0)
+        self.assertEqual(twilio_request.media_urls, [])
+        self.assertIsNone(twilio_request.num_segments)
+        self.assertIsNone(twilio_request.coordinates)
+
+
+class TestWebhookParams(TestRequestBase):
+
+    def test_parse(self):
+        params = WebhookParams.parse(b'From=%2B15005550001&Body=hi+there&Empty=')
+        self.assertEqual(
+            dict(params),
+            {'From': '+15005550001', 'Body': 'hi there', 'Empty': ''},
+        )
+        self.assertEqual(params.getlist('Body'), ['hi there'])
+        self.assertEqual(params.getlist('Missing'), [])
+
+    def test_repeated_keys(self):
+        params = WebhookParams.parse('a=1&b=2&a=3')
+        self.assertEqual(params['a'], '3')
+        self.assertEqual(params.getlist('a'), ['1', '3'])
+        self.assertEqual(list(params.lists()), [('a', ['1', '3']), ('b', ['2'])])
+        self.assertEqual(params.dict(), {'a': '3', 'b': '2'})
+
+    def test_immutable(self):
+        params = WebhookParams.parse('a=1')
+        with self.assertRaises(TypeError):
+            params['a'] = '2'
+        with self.assertRaises(AttributeError):
+            params.foo = 'bar'
+
+    def test_invalid_encoding(self):
+        self.assertEqual(WebhookParams.parse(b'a=\xe9')['a'], '\xe9')
+
+    @override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=2)
+    def test_too_many_fields(self):
+        with self.assertRaises(TooManyFieldsSent):
+            WebhookParams.parse('a=1&b=2&c=3')
+
+
+class TestGetParams(TestRequestBase):
+
+    def test_urlencoded_body(self):
+        request = self.factory.post_form('/test_app/', self.call_dict)
+        params = get_params(request)
+        self.assertIsInstance(params, WebhookParams)
+        self.assertEqual(dict(params), request.POST.dict())
+        # Parsed from the body, without building request.POST.
+        request = self.factory.post_form('/test_app/', self.call_dict)
+        get_params(request)
+        self.assertFalse(hasattr(request, '_post'))
+
+    def test_multipart_body(self):
+        request = self.factory.post('/test_app/', self.call_dict)
+        self.assertEqual(dict(get_params(request)), request.POST.dict())
+
+    def test_get(self):
+        request = self.factory.get(
+            '/test_app/', {'CallSid': 'CA1', 'a': ['1', '2']},
+            HTTP_X_TWILIO_SIGNATURE='unchecked')
+        params = get_params(request)
+        self.assertEqual(params.getlist('a'), ['1', '2'])
+        self.assertEqual(params['CallSid'], 'CA1')
+
+    def test_memoized(self):
+        request = self.factory.post_form('/test_app/', self.call_dict)
+        self.assertIs(get_params(request), get_params(request))
+
+    def test_validates(self):
+        uri = '/test_app/decorators/str_view/'
+        validator = get_validator(settings.TWILIO_AUTH_TOKEN)
+        signature = validator.compute_signature(
+            'http://testserver' + uri,
+            WebhookParams([('a', '1'), ('a', '2'), ('b', 'x')]))
+        request = self.factory.post_form(
+            uri, {'a': ['1', '2'], 'b': 'x'},
+            HTTP_X_TWILIO_SIGNATURE=signature)
+        self.assertTrue(validator.validate(
+            request.build_absolute_uri(), get_params(request),
+            request.headers['x-twilio-signature']))
+
+    def test_decompose(self):
+        request = self.factory.post_form('/test_app/', self.call_dict)
+        self.assertEqual(decompose(request).from_, '+44123456789')
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio import blacklist
+from django_twilio.models import BlacklistRule, Caller
+from django_twilio.snapshot import (
+    BlacklistSnapshot, phone_number_to_int, read_generation, write_snapshot)
+
+
+class SnapshotTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'blacklist.bin')
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_phone_number_to_int(self):
+        self.assertEqual(phone_number_to_int('+15005550001'), 15005550001)
+        self.assertIsNone(phone_number_to_int('15005550001'))
+        self.assertIsNone(phone_number_to_int('client:alice'))
+        self.assertIsNone(phone_number_to_int('+'))
+        self.assertIsNone(phone_number_to_int('+1234567890123456'))
+
+    def test_lookup(self):
+        count = write_snapshot(
+            self.path, ['+15005550003', '+15005550001', '+15005550001', 'x'])
+        self.assertEqual(count, 2)
+        snapshot = BlacklistSnapshot(self.path)
+        self.assertTrue(snapshot.lookup('+15005550001'))
+        self.assertTrue(snapshot.lookup('+15005550003'))
+        self.assertFalse(snapshot.lookup('+15005550002'))
+        self.assertFalse(snapshot.lookup('+15005550004'))
+        self.assertFalse(snapshot.lookup('client:alice'))
+        self.assertIn('+15005550001', snapshot)
+
+    def test_rules(self):
+        write_snapshot(
+            self.path, ['+15005550001'], ['+44', '+1555', '44', '+44'])
+        snapshot = BlacklistSnapshot(self.path)
+        rules = snapshot.get_rules()
+        self.assertEqual(len(rules), 2)
+        self.assertEqual(rules.match('+447700900123'), '+44')
+        self.assertEqual(rules.match('+15551234567'), '+1555')
+        self.assertIsNone(rules.match('+15005550001'))
+        self.assertTrue(snapshot.lookup('+15005550001'))
+
+    def test_no_rules(self):
+        write_snapshot(self.path, ['+15005550001'])
+        self.assertEqual(len(BlacklistSnapshot(self.path).get_rules()), 0)
+        self.assertIsNone(BlacklistSnapshot(
+            os.path.join(self.dir, 'missing.bin')).get_rules())
+
+    def test_empty_snapshot(self):
+        write_snapshot(self.path, [])
+        self.assertIs(BlacklistSnapshot(self.path).lookup('+15005550001'), False)
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(BlacklistSnapshot(self.path).lookup('+15005550001'))
+
+    def test_corrupt_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot at all!!!')
+        with self.assertLogs('django_twilio.snapshot', 'WARNING'):
+            self.assertIsNone(
+                BlacklistSnapshot(self.path).lookup('+15005550001'))
+
+    def test_reloads_replaced_snapshot(self):
+        write_snapshot(self.path, ['+15005550001'])
+        snapshot = BlacklistSnapshot(self.path, check_interval=0)
+        self.assertTrue(snapshot.lookup('+15005550001'))
+        self.assertEqual(snapshot.generation, 1)
+
+        write_snapshot(self.path, ['+15005550002'])
+        self.assertFalse(snapshot.lookup('+15005550001'))
+        self.assertTrue(snapshot.lookup('+15005550002'))
+        self.assertEqual(snapshot.generation, 2)
+        self.assertEqual(read_generation(self.path), 2)
+
+    def test_waits_for_check_interval(self):
+        write_snapshot(self.path, ['+15005550001'])
+        snapshot = BlacklistSnapshot(self.path, check_interval=3600)
+        self.assertTrue(snapshot.lookup('+15005550001'))
+        write_snapshot(self.path, [])
+        self.assertTrue(snapshot.lookup('+15005550001'))
+
+
+class SnapshotCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'blacklist.bin')
+        self.addCleanup(shutil.rmtree, self.dir)
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        G(Caller, phone_number='+15005550002', blacklisted=False)
+
+    def test_command_writes_blacklisted_callers(self):
+        out = StringIO()
+        call_command('twilio_blacklist_snapshot', output=self.path, stdout=out)
+        self.assertIn('Wrote 1 blacklisted numbers', out.getvalue())
+        snapshot = BlacklistSnapshot(self.path)
+        self.assertTrue(snapshot.lookup('+15005550001'))
+        self.assertFalse(snapshot.lookup('+15005550002'))
+
+    def test_command_writes_active_rules(self):
+        G(BlacklistRule, prefix='+1555', active=True)
+        G(BlacklistRule, prefix='+44', active=False)
+        call_command('twilio_blacklist_snapshot', output=self.path,
+                     stdout=StringIO())
+        rules = BlacklistSnapshot(self.path).get_rules()
+        self.assertEqual(rules.match('+15551234567'), '+1555')
+        self.assertIsNone(rules.match('+447700900123'))
+
+    def test_command_requires_output(self):
+        with self.assertRaises(CommandError):
+            call_command('twilio_blacklist_snapshot')
+
+    def test_is_blacklisted_uses_snapshot(self):
+        with override_settings(DJANGO_TWILIO_BLACKLIST_SNAPSHOT=self.path):
+            call_command('twilio_blacklist_snapshot', stdout=StringIO())
+            with self.assertNumQueries(0):
+                self.assertTrue(blacklist.is_blacklisted('+15005550001'))
+                self.assertFalse(blacklist.is_blacklisted('+15005550002'))
+                self.assertFalse(blacklist.is_blacklisted('+15005550003'))
+
+    def test_is_blacklisted_uses_snapshot_rules(self):
+        G(BlacklistRule, prefix='+1555', active=True)
+        with override_settings(DJANGO_TWILIO_BLACKLIST_SNAPSHOT=self.path):
+            call_command('twilio_blacklist_snapshot', stdout=StringIO())
+            with self.assertNumQueries(0):
+                self.assertTrue(blacklist.is_blacklisted('+15551234567'))
+                snapshot = blacklist.get_snapshot()
+                self.assertIs(blacklist.get_rules(), snapshot.get_rules())
+
+    def test_is_blacklisted_falls_back_without_snapshot(self):
+        with override_settings(DJANGO_TWILIO_BLACKLIST_SNAPSHOT=self.path):
+            self.assertTrue(blacklist.is_blacklisted('+15005550001'))
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from django_twilio import status
+from django_twilio.models import CallStatus, MessageStatus
+from django_twilio.status import StatusBuffer
+from django_twilio.views import call_status, message_status
+
+from .utils import TwilioRequestFactory
+
+
+def message(sid='SM1', state='delivered'):
+    return MessageStatus(
+        message_sid=sid, account_sid='AC1', status=state,
+        received_at=timezone.now())
+
+
+class StatusBufferTestCase(TestCase):
+
+    def setUp(self):
+        # A long interval keeps the background thread from saving anything
+        # while the test runs.
+        self.buffer = StatusBuffer(
+            max_size=3, batch_size=100, flush_interval=3600)
+
+    def tearDown(self):
+        self.buffer.close()
+
+    def test_add_buffers(self):
+        self.buffer.add(message())
+        self.assertEqual(len(self.buffer), 1)
+        self.assertEqual(MessageStatus.objects.count(), 0)
+
+    def test_flush(self):
+        self.buffer.add(message('SM1'))
+        self.buffer.add(message('SM2'))
+        self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(
+            set(MessageStatus.objects.values_list('message_sid', flat=True)),
+            {'SM1', 'SM2'})
+
+    def test_flush_mixed_models(self):
+        self.buffer.add(message())
+        self.buffer.add(CallStatus(
+            call_sid='CA1', account_sid='AC1', status='completed',
+            received_at=timezone.now()))
+        self.buffer.flush()
+        self.assertEqual(MessageStatus.objects.count(), 1)
+        self.assertEqual(CallStatus.objects.count(), 1)
+
+    def test_unbuffered(self):
+        buffer = StatusBuffer(max_size=0)
+        buffer.add(message())
+        self.assertEqual(MessageStatus.objects.count(), 1)
+
+    def test_overflow_flush(self):
+        for i in range(4):
+            self.buffer.add(message('SM{}'.format(i)))
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(MessageStatus.objects.count(), 4)
+
+    def test_overflow_drop(self):
+        buffer = StatusBuffer(max_size=2, flush_interval=3600, overflow='drop')
+        for i in range(3):
+            buffer.add(message('SM{}'.format(i)))
+        self.assertEqual(buffer.dropped, 1)
+        buffer.close()
+        self.assertEqual(MessageStatus.objects.count(), 2)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            StatusBuffer(overflow='block')
+
+    def test_close(self):
+        self.buffer.add(message())
+        self.buffer.close()
+        self.assertEqual(MessageStatus.objects.count(), 1)
+        # Callbacks added after closing are saved straight away.
+        self.buffer.add(message())
+        self.assertEqual(MessageStatus.objects.count(), 2)
+
+    def test_save_error_is_logged(self):
+        self.buffer.add(MessageStatus(message_sid='SM1'))
+        with self.assertLogs('django_twilio.status', 'ERROR'):
+            self.buffer.flush()
+
+
+class StatusBufferThreadTestCase(TransactionTestCase):
+
+    def wait_for(self, model, count):
+        deadline = time.monotonic() + 5
+        while model.objects.count() < count:
+            if time.monotonic() > deadline:
+                self.fail('The buffer was not flushed.')
+            time.sleep(0.01)
+
+    def test_flush_on_batch_size(self):
+        buffer = StatusBuffer(batch_size=2, flush_interval=3600)
+        buffer.add(message('SM1'))
+        buffer.add(message('SM2'))
+        self.wait_for(MessageStatus, 2)
+        buffer.close()
+
+    def test_flush_on_interval(self):
+        buffer = StatusBuffer(batch_size=100, flush_interval=0.05)
+        buffer.add(message())
+        self.wait_for(MessageStatus, 1)
+        buffer.close()
+
+
+class StatusSettingsTestCase(TestCase):
+
+    def tearDown(self):
+        status.reset()
+
+    @override_settings(DJANGO_TWILIO_STATUS_BUFFER_SIZE=5,
+                       DJANGO_TWILIO_STATUS_BATCH_SIZE=2,
+                       DJANGO_TWILIO_STATUS_FLUSH_INTERVAL=10,
+                       DJANGO_TWILIO_STATUS_OVERFLOW='drop')
+    def test_get_buffer(self):
+        buffer = status.get_buffer()
+        self.assertIs(status.get_buffer(), buffer)
+        self.assertEqual(buffer.max_size, 5)
+        self.assertEqual(buffer.batch_size, 2)
+        self.assertEqual(buffer.flush_interval, 10)
+        self.assertEqual(buffer.overflow, 'drop')
+
+    @override_settings(DJANGO_TWILIO_STATUS_OVERFLOW='block')
+    def test_invalid_overflow(self):
+        with self.assertRaises(ImproperlyConfigured):
+            status.get_buffer()
+
+    def test_setting_change_flushes(self):
+        with override_settings(DJANGO_TWILIO_STATUS_FLUSH_INTERVAL=3600):
+            buffer = status.get_buffer()
+            buffer.add(message())
+        self.assertEqual(MessageStatus.objects.count(), 1)
+        self.assertIsNot(status.get_buffer(), buffer)
+
+
+@override_settings(DJANGO_TWILIO_STATUS_FLUSH_INTERVAL=3600)
+class StatusViewTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+
+    def tearDown(self):
+        status.reset()
+
+    def test_message_status(self):
+        request = self.factory.post_form('/test_app/status/message/', {
+            'AccountSid': 'AC1',
+            'MessageSid': 'SM1',
+            'MessageStatus': 'undelivered',
+            'ErrorCode': '30003',
+            'From': '+15005550006',
+            'To': '+15005550001',
+        })
+        response = message_status(request)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(MessageStatus.objects.count(), 0)
+
+        status.flush()
+        saved = MessageStatus.objects.get()
+        self.assertEqual(saved.message_sid, 'SM1')
+        self.assertEqual(saved.account_sid, 'AC1')
+        self.assertEqual(saved.status, 'undelivered')
+        self.assertEqual(saved.error_code, 30003)
+        self.assertEqual(saved.from_number, '+15005550006')
+        self.assertEqual(saved.to_number, '+15005550001')
+        self.assertIsNotNone(saved.received_at)
+
+    def test_call_status(self):
+        request = self.factory.post_form('/test_app/status/call/', {
+            'AccountSid': 'AC1',
+            'CallSid': 'CA1',
+            'CallStatus': 'completed',
+            'CallDuration': '42',
+            'SequenceNumber': '3',
+        })
+        response = call_status(request)
+        self.assertEqual(response.status_code, 204)
+
+        status.flush()
+        saved = CallStatus.objects.get()
+        self.assertEqual(saved.call_sid, 'CA1')
+        self.assertEqual(saved.status, 'completed')
+        self.assertEqual(saved.call_duration, 42)
+        self.assertEqual(saved.sequence_number, 3)
+
+    @override_settings(DJANGO_TWILIO_STATUS_BUFFER_SIZE=0)
+    def test_unbuffered(self):
+        request = self.factory.post_form('/test_app/status/message/', {
+            'MessageSid': 'SM1', 'MessageStatus': 'sent'})
+        message_status(request)
+        self.assertEqual(MessageStatus.objects.count(), 1)
+
+    def test_forged(self):
+        request = self.factory.post_form(
+            '/test_app/status/message/', {'MessageSid': 'SM1'},
+            HTTP_X_TWILIO_SIGNATURE='forged')
+        self.assertEqual(message_status(request).status_code, 403)
+
+    @override_settings(DJANGO_TWILIO_RATE_LIMIT=(5, 60),
+                       DJANGO_TWILIO_RATE_LIMIT_CACHE=None)
+    def test_status_callbacks_are_not_rate_limited(self):
+        # Every callback for the messages and calls we send comes From our
+        # own number.
+        for i in range(20):
+            request = self.factory.post_form('/test_app/status/message/', {
+                'MessageSid': 'SM{}'.format(i),
+                'MessageStatus': 'delivered',
+                'From': '+15005550006',
+            })
+            self.assertEqual(message_status(request).status_code, 204)
+            request = self.factory.post_form('/test_app/status/call/', {
+                'CallSid': 'CA{}'.format(i),
+                'CallStatus': 'completed',
+                'From': '+15005550006',
+            })
+            self.assertEqual(call_status(request).status_code, 204)
+
+        status.flush()
+        self.assertEqual(MessageStatus.objects.count(), 20)
+        self.assertEqual(CallStatus.objects.count(), 20)
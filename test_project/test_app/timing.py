@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import inspect
+
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from django_twilio.models import Caller
+from django_twilio.signals import webhook_timed
+from django_twilio.timing import StageTimer
+
+from .utils import TwilioRequestFactory
+from .views import async_verb_view, str_view, verb_view
+
+
+class StageTimerTestCase(TestCase):
+
+    def test_marks(self):
+        timer = StageTimer()
+        timer.mark('forgery')
+        timer.mark('view')
+        self.assertEqual(list(timer.timings), ['forgery', 'view'])
+        self.assertEqual(sum(timer.timings.values()), timer.total)
+
+    def test_server_timing(self):
+        timer = StageTimer()
+        timer.timings = {'forgery': 1500000, 'view': 2000}
+        timer._last = timer._start + 3000000
+        self.assertEqual(
+            timer.server_timing(),
+            'forgery;dur=1.500, view;dur=0.002, total;dur=3.000',
+        )
+
+
+@override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=True,
+                   DJANGO_TWILIO_TIMING=True)
+class TwilioViewTimingTestCase(TestCase):
+
+    def setUp(self):
+        self.uri = '/test_app/decorators/str_view/'
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        self.received = []
+        webhook_timed.connect(self.receiver)
+
+    def tearDown(self):
+        webhook_timed.disconnect(self.receiver)
+
+    def receiver(self, **kwargs):
+        self.received.append(kwargs)
+
+    def test_signal(self):
+        request = self.factory.post(self.uri, {'CallSid': 'CA1'})
+        response = verb_view(request)
+        self.assertEqual(len(self.received), 1)
+        received = self.received[0]
+        self.assertIs(received['sender'], inspect.unwrap(verb_view))
+        self.assertIs(received['request'], request)
+        self.assertEqual(received['request_type'], 'voice')
+        self.assertEqual(
+            list(received['timings']),
+            ['forgery', 'blacklist', 'view', 'render'],
+        )
+        self.assertEqual(
+            sum(received['timings'].values()), received['total'])
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_message_request_type(self):
+        str_view(self.factory.post(self.uri, {'MessageSid': 'SM1'}))
+        self.assertEqual(self.received[0]['request_type'], 'message')
+
+    def test_rejected_requests(self):
+        G(Caller, phone_number='+15005550001', blacklisted=True)
+        str_view(self.factory.post(self.uri, {'From': '+15005550001'}))
+        self.assertEqual(
+            list(self.received[0]['timings']), ['forgery', 'blacklist'])
+
+        str_view(self.factory.post(
+            self.uri, HTTP_X_TWILIO_SIGNATURE='forged'))
+        self.assertEqual(list(self.received[1]['timings']), ['forgery'])
+
+    @override_settings(DJANGO_TWILIO_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = str_view(self.factory.post(self.uri))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^forgery;dur=\d+\.\d{3}, blacklist;dur=\d+\.\d{3}, '
+            r'view;dur=\d+\.\d{3}, render;dur=\d+\.\d{3}, '
+            r'total;dur=\d+\.\d{3}$',
+        )
+
+    @override_settings(DJANGO_TWILIO_TIMING=False,
+                       DJANGO_TWILIO_SERVER_TIMING=True)
+    def test_disabled(self):
+        response = str_view(self.factory.post(self.uri))
+        self.assertEqual(self.received, [])
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(DJANGO_TWILIO_SERVER_TIMING=True)
+    async def test_async_view(self):
+        response = await async_verb_view(
+            self.factory.post(self.uri, {'CallSid': 'CA1'}))
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(self.received[0]['request_type'], 'voice')
+        self.assertEqual(
+            list(self.received[0]['timings']),
+            ['forgery', 'blacklist', 'view', 'render'],
+        )
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from django.test import SimpleTestCase
+
+from django_twilio.trie import PrefixTrie
+
+
+class PrefixTrieTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.trie = PrefixTrie([(1, '+1555123'), (2, '+44')])
+
+    def test_match(self):
+        self.assertEqual(self.trie.match('+15551230000'), '+1555123')
+        self.assertEqual(self.trie.match('+447700900123'), '+44')
+        self.assertIsNone(self.trie.match('+15551240000'))
+        self.assertIsNone(self.trie.match('+1555'))
+
+    def test_match_whole_number(self):
+        self.trie.add(3, '+15005550001')
+        self.assertEqual(self.trie.match('+15005550001'), '+15005550001')
+        self.assertIsNone(self.trie.match('+15005550002'))
+
+    def test_match_shortest_prefix(self):
+        self.trie.add(3, '+1555')
+        self.assertEqual(self.trie.match('+15551230000'), '+1555')
+
+    def test_match_non_e164(self):
+        self.assertIsNone(self.trie.match('client:alice'))
+        self.assertIsNone(self.trie.match('44'))
+        self.assertIsNone(self.trie.match(''))
+
+    def test_invalid_prefix_is_ignored(self):
+        self.trie.add(3, '1555')
+        self.trie.add(4, '+')
+        self.trie.add(5, '+1-555')
+        self.assertEqual(len(self.trie), 2)
+
+    def test_contains(self):
+        self.assertIn('+1555123', self.trie)
+        self.assertNotIn('+1555', self.trie)
+        self.assertNotIn('+15551234', self.trie)
+
+    def test_add_replaces_prefix_of_key(self):
+        self.trie.add(1, '+1666')
+        self.assertIsNone(self.trie.match('+15551230000'))
+        self.assertEqual(self.trie.match('+16660000000'), '+1666')
+        self.assertEqual(len(self.trie), 2)
+
+    def test_discard(self):
+        self.trie.discard(1)
+        self.assertIsNone(self.trie.match('+15551230000'))
+        self.assertEqual(len(self.trie), 1)
+        # Discarding an unknown key does nothing.
+        self.trie.discard(1)
+        self.trie.discard(99)
+
+    def test_discard_prunes_nodes(self):
+        self.trie.discard(1)
+        self.trie.discard(2)
+        self.assertEqual(self.trie._root, {})
+
+    def test_discard_keeps_longer_prefixes(self):
+        self.trie.add(3, '+155512345')
+        self.trie.discard(1)
+        self.assertIsNone(self.trie.match('+15551230000'))
+        self.assertEqual(self.trie.match('+15551234500'), '+155512345')
+
+    def test_discard_shared_prefix(self):
+        self.trie.add(3, '+44')
+        self.trie.discard(2)
+        self.assertEqual(self.trie.match('+447700900123'), '+44')
+        self.trie.discard(3)
+        self.assertIsNone(self.trie.match('+447700900123'))
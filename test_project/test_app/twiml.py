@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+from django.test import SimpleTestCase
+from twilio.twiml import GenericNode, TwiML
+from twilio.twiml.messaging_response import Body, Media, Message, MessagingResponse
+from twilio.twiml.voice_response import Dial, Gather, Say, VoiceResponse
+
+from django_twilio.twiml import render
+
+
+class CustomNode(TwiML):
+
+    def xml(self):
+        el = super(CustomNode, self).xml()
+        el.set('custom', 'true')
+        return el
+
+
+class RenderTestCase(SimpleTestCase):
+    """
+    Differential tests: ``render`` must produce exactly the bytes the twilio
+    library does.
+    """
+
+    TEXTS = [
+        'hello, world!',
+        '',
+        'Fish & <Chips> "quoted" \'single\'',
+        'tabs\tnew\nlines\r\nand carriage returns',
+        'Ünïcödé, 日本語 and emoji ☎📞',
+        'a lone surrogate \ud800 in here',
+        ']]> looks like CDATA',
+    ]
+
+    def assertRendersLikeTwilio(self, response):
+        self.assertEqual(render(response), str(response).encode('utf-8'))
+
+    def test_empty_responses(self):
+        self.assertRendersLikeTwilio(VoiceResponse())
+        self.assertRendersLikeTwilio(MessagingResponse())
+        self.assertRendersLikeTwilio(Message())
+
+    def test_say(self):
+        for text in self.TEXTS:
+            r = VoiceResponse()
+            r.say(text, voice='alice', language='en-GB', loop=2)
+            self.assertRendersLikeTwilio(r)
+
+    def test_play(self):
+        r = VoiceResponse()
+        r.play('http://example.com/a.wav?x=1&y=2', loop=0)
+        r.play(digits='ww1234')
+        self.assertRendersLikeTwilio(r)
+
+    def test_gather(self):
+        r = VoiceResponse()
+        g = r.gather(action='/next?a=1&b="2"', method='POST', num_digits=1,
+                     timeout=5, finish_on_key='#', input='dtmf speech',
+                     speech_timeout='auto', enhanced=True, profanity_filter=False)
+        g.say('Press 1 <now>')
+        g.pause(length=1)
+        g.play('http://example.com/a.wav')
+        r.redirect('/retry')
+        self.assertRendersLikeTwilio(r)
+
+    def test_record(self):
+        r = VoiceResponse()
+        r.record(action='/done', method='POST', timeout=10, finish_on_key='*',
+                 max_length=30, transcribe=True, transcribe_callback='/t',
+                 play_beep=False)
+        r.hangup()
+        self.assertRendersLikeTwilio(r)
+
+    def test_message(self):
+        for text in self.TEXTS:
+            r = MessagingResponse()
+            r.message(text, to='+15005550006', from_='+15005550001',
+                      action='/status', method='POST',
+                      status_callback='/cb?x=1&y=2')
+            self.assertRendersLikeTwilio(r)
+
+    def test_message_with_body_and_media(self):
+        r = MessagingResponse()
+        m = Message()
+        m.append(Body('Store & <forward>'))
+        m.append(Media('https://example.com/cat.gif'))
+        m.media('https://example.com/dog.gif')
+        r.append(m)
+        self.assertRendersLikeTwilio(r)
+
+    def test_dial(self):
+        r = VoiceResponse()
+        r.dial(number='+18182223333', action='/dial', method='POST',
+               timeout=20, hangup_on_star=True, time_limit=60,
+               caller_id='+15005550006')
+        d = Dial(record='record-from-answer')
+        d.number('+15005550006', send_digits='wwww1928')
+        d.client('alice')
+        d.sip('sip:bob@example.com?x-foo=bar&y=1')
+        r.append(d)
+        self.assertRendersLikeTwilio(r)
+
+    def test_conference(self):
+        r = VoiceResponse()
+        d = Dial()
+        d.conference('Room <1> & 2', muted=False, beep='onEnter',
+                     start_conference_on_enter=True,
+                     end_conference_on_exit=False,
+                     wait_url='http://twimlets.com/holdmusic?Bucket=x&y=z',
+                     wait_method='POST', max_participants=10)
+        r.append(d)
+        self.assertRendersLikeTwilio(r)
+
+    def test_reject(self):
+        for reason in (None, 'busy', 'rejected'):
+            r = VoiceResponse()
+            r.reject(reason=reason)
+            self.assertRendersLikeTwilio(r)
+
+    def test_ssml(self):
+        r = VoiceResponse()
+        s = Say('Hello ', voice='Polly.Joanna')
+        s.break_(strength='x-weak', time='100ms')
+        s.emphasis('world', level='strong')
+        s.lang('bonjour', xml_lang='fr-FR')
+        s.say_as('12345', interpret_as='spell-out')
+        r.append(s)
+        self.assertRendersLikeTwilio(r)
+
+    def test_mixed_text_and_tails(self):
+        r = VoiceResponse()
+        s = Say()
+        s.append('first text')
+        s.append('second text replaces the first')
+        s.break_(time='1s')
+        s.append('a tail & more')
+        s.append('a later tail replaces it')
+        s.emphasis('x')
+        s.append('')
+        r.append(s)
+        self.assertRendersLikeTwilio(r)
+
+        g = Gather()
+        g.append('text only')
+        self.assertRendersLikeTwilio(g)
+
+        g = Gather()
+        g.append('')
+        self.assertRendersLikeTwilio(g)
+
+    def test_generic_nodes(self):
+        r = VoiceResponse()
+        node = r.add_child('Custom', 'value & <stuff>', some_attr='a"b',
+                           other_attr=1.5)
+        node.add_child('Nested', None, flag=True)
+        r.append(GenericNode('Empty', ''))
+        self.assertRendersLikeTwilio(r)
+
+    def test_attribute_escaping(self):
+        for text in self.TEXTS:
+            r = VoiceResponse()
+            r.redirect('/next', method=text)
+            self.assertRendersLikeTwilio(r)
+
+    def test_falls_back_for_custom_nodes(self):
+        r = VoiceResponse()
+        r.append(CustomNode())
+        self.assertIn(b'custom="true"', render(r))
+        self.assertRendersLikeTwilio(r)
+
+    def test_falls_back_for_dict_values(self):
+        r = VoiceResponse()
+        r.add_child('Parameter', {'key': 'a & b'})
+        expected = str(r).encode('utf-8')
+        r = VoiceResponse()
+        r.add_child('Parameter', {'key': 'a & b'})
+        self.assertEqual(render(r), expected)
@@ -2,6 +2,8 @@
 
 from django.urls import path
 
+from django_twilio.views import call_status, message_status, metrics
+
 from . import views
 
 # Test URLs for our ``django_twilio.decorators`` module.
@@ -13,5 +15,14 @@ urlpatterns = [
     path('decorators/bytes_view/', views.bytes_view),
     path('decorators/bytes_class_view/', views.BytesView.as_view()),
     path('decorators/verb_view/', views.verb_view),
-    path('decorators/verb_class_view/', views.VerbView.as_view())
+    path('decorators/verb_class_view/', views.VerbView.as_view()),
+    path('decorators/async_str_view/', views.async_str_view),
+    path('decorators/async_verb_view/', views.async_verb_view),
+    path('decorators/named_str_view/', views.str_view, name='named_str_view'),
+    path('metrics/', metrics),
+    path('status/message/', message_status),
+    path('status/call/', call_status),
+    path('webhooks/echo/', views.webhook_view),
+    path('webhooks/class/', views.WebhookView.as_view()),
+    path('webhooks/str_view/', views.str_view),
 ]
\ No newline at end of file
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from twilio.request_validator import RequestValidator
+
+from django_twilio.settings import get_webhook_settings
+from django_twilio.validator import PreparedRequestValidator, get_validator
+
+
+class PreparedRequestValidatorTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.token = 'YYYYYYYYYYYYYYYYYYYYYYYYYYYYYYYY'
+        self.uri = 'https://example.com/twilio/voice/?foo=bar'
+
+    def assertSameSignature(self, params):
+        self.assertEqual(
+            PreparedRequestValidator(self.token).compute_signature(
+                self.uri, params),
+            RequestValidator(self.token).compute_signature(self.uri, params),
+        )
+
+    def test_matches_twilio_validator(self):
+        self.assertSameSignature({})
+        self.assertSameSignature(None)
+        self.assertSameSignature({'CallSid': 'CA123', 'From': '+15005550001'})
+        self.assertSameSignature({'Body': 'Ünïcödé ☎'})
+        self.assertSameSignature(QueryDict('b=2&a=1&a=0&a=1'))
+
+    def test_is_reusable(self):
+        validator = PreparedRequestValidator(self.token)
+        params = {'CallSid': 'CA123'}
+        signature = RequestValidator(self.token).compute_signature(
+            self.uri, params)
+        for _ in range(3):
+            self.assertTrue(validator.validate(self.uri, params, signature))
+        self.assertFalse(validator.validate(self.uri, params, 'fake'))
+
+    def test_validate_matches_twilio_validator(self):
+        ours = PreparedRequestValidator(self.token)
+        theirs = RequestValidator(self.token)
+        params = {'CallSid': 'CA123', 'From': '+15005550001'}
+        body = '{"property": "value", "boolean": true}'
+        body_uri = 'https://example.com/json?bodySHA256=' + theirs.compute_hash(body)
+        cases = [
+            ('https://example.com/voice/', params),
+            ('https://example.com:443/voice/', params),
+            ('http://example.com:8000/voice/', params),
+            (body_uri, body),
+            (body_uri, '{"tampered": true}'),
+        ]
+        for uri, data in cases:
+            signature = theirs.compute_signature(
+                uri.replace(':443', ''), {} if isinstance(data, str) else data)
+            for candidate in (signature, 'fake', signature[:-1] + 'é'):
+                self.assertEqual(
+                    ours.validate(uri, data, candidate),
+                    theirs.validate(uri, data, candidate),
+                    (uri, data, candidate),
+                )
+
+    def test_get_validator_is_shared_per_token(self):
+        self.assertIs(get_validator('a'), get_validator('a'))
+        self.assertIsNot(get_validator('a'), get_validator('b'))
+
+
+class WebhookSettingsTestCase(SimpleTestCase):
+
+    def test_settings_are_shared(self):
+        self.assertIs(get_webhook_settings(), get_webhook_settings())
+
+    def test_setting_changed_reloads_settings(self):
+        with override_settings(DEBUG=False):
+            self.assertTrue(get_webhook_settings().forgery_protection)
+        with override_settings(DEBUG=True):
+            self.assertFalse(get_webhook_settings().forgery_protection)
+        with override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=True):
+            self.assertTrue(get_webhook_settings().forgery_protection)
+        with override_settings(DJANGO_TWILIO_BLACKLIST_CHECK=False):
+            self.assertFalse(get_webhook_settings().blacklist_check)
+
+    def test_missing_token_disables_validator(self):
+        with override_settings(TWILIO_ACCOUNT_SID=None, TWILIO_AUTH_TOKEN=None):
+            self.assertIsNone(get_webhook_settings().validator)
+        self.assertIsNotNone(get_webhook_settings().validator)
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 
+from itertools import count
+
 from django.conf import settings
 from django.http import HttpResponse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from twilio.twiml.voice_response import VoiceResponse
 
-from django_twilio.decorators import twilio_view
+from django_twilio import twiml
+from django_twilio.decorators import cache_twiml, twilio_view
 from django.views.generic import View
 from django.utils.decorators import method_decorator
 
@@ -115,6 +118,99 @@ class VerbView(View):
         return r
 
 
+@twilio_view
+async def async_str_view(request):
+    """
+    A simple async test view that returns a string.
+    """
+    return '<Response><Message>Hi!</Message></Response>'
+
+
+@twilio_view
+async def async_verb_view(request):
+    """
+    A simple async test view that returns a ``twilio.Verb`` object.
+    """
+    r = VoiceResponse()
+    r.reject()
+    return r
+
+
+@twilio_view(multi_tenant=True)
+def tenant_view(request):
+    """
+    A simple test view that accepts requests for any known Twilio account.
+    """
+    return '<Response><Message>Hi!</Message></Response>'
+
+
+@twilio_view(multi_tenant=True)
+async def async_tenant_view(request):
+    """
+    An async test view that accepts requests for any known Twilio account.
+    """
+    return '<Response><Message>Hi!</Message></Response>'
+
+
+_idempotent_calls = count(1)
+
+
+@twilio_view(idempotent=True)
+def idempotent_view(request):
+    """
+    A test view that returns a different response every time it runs.
+    """
+    return '<Response><Message>{}</Message></Response>'.format(
+        next(_idempotent_calls))
+
+
+@twilio_view(idempotent=True)
+async def async_idempotent_view(request):
+    """
+    An async test view that returns a different response every time it runs.
+    """
+    return '<Response><Message>{}</Message></Response>'.format(
+        next(_idempotent_calls))
+
+
+def webhook_view(request):
+    """
+    An undecorated view for TwilioWebhookMiddleware to handle, which echoes
+    the caller back.
+    """
+    return HttpResponse(
+        '<Response><Message>{}</Message></Response>'.format(
+            request.twilio.from_),
+        content_type='application/xml',
+    )
+
+
+class WebhookView(View):
+    """
+    An undecorated class-based view for TwilioWebhookMiddleware to handle.
+    """
+
+    def post(self, request):
+        return HttpResponse(
+            '<Response><Say>{}</Say></Response>'.format(request.twilio.type),
+            content_type='application/xml',
+        )
+
+
+_cached_calls = count()
+
+
+@cache_twiml
+def cached_view(request, text):
+    """
+    A view wrapped in cache_twiml that records how often it actually runs.
+    """
+    next(_cached_calls)
+    r = VoiceResponse()
+    r.say(str(text))
+    return r
+
+
 class SayTestCase(TestCase):
 
     def setUp(self):
@@ -275,3 +371,70 @@ class ConferenceTestCase(TestCase):
             conference(request, name='a').status_code,
             200,
         )
+
+
+class CacheTwimlTestCase(TestCase):
+
+    def setUp(self):
+        self.uri = '/test_app/views/say/'
+        self.factory = TwilioRequestFactory(token=settings.TWILIO_AUTH_TOKEN)
+        twiml.reset_response_cache()
+
+    def tearDown(self):
+        twiml.reset_response_cache()
+
+    def calls(self):
+        return next(_cached_calls)
+
+    def test_renders_once_per_arguments(self):
+        before = self.calls()
+        first = cached_view(self.factory.post(self.uri), text='hi')
+        second = cached_view(self.factory.post(self.uri), text='hi')
+        cached_view(self.factory.post(self.uri), text='bye')
+        self.assertEqual(self.calls(), before + 3)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Type'], 'application/xml')
+
+    def test_matches_uncached_view(self):
+        r = VoiceResponse()
+        r.say('hi')
+        response = cached_view(self.factory.post(self.uri), text='hi')
+        self.assertEqual(response.content, str(r).encode('utf-8'))
+
+    def test_post_has_no_etag(self):
+        response = cached_view(self.factory.post(self.uri), text='hi')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_get_has_etag(self):
+        response = cached_view(self.factory.get(self.uri), text='hi')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_get_if_none_match(self):
+        etag = cached_view(self.factory.get(self.uri), text='hi')['ETag']
+        request = self.factory.get(self.uri, HTTP_IF_NONE_MATCH=etag)
+        response = cached_view(request, text='hi')
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(DJANGO_TWILIO_TWIML_CACHE_MAX_AGE=300)
+    def test_get_cache_control(self):
+        response = cached_view(self.factory.get(self.uri), text='hi')
+        self.assertEqual(response['Cache-Control'], 'max-age=300')
+
+    def test_unhashable_arguments(self):
+        before = self.calls()
+        cached_view(self.factory.post(self.uri), text=['hi'])
+        cached_view(self.factory.post(self.uri), text=['hi'])
+        self.assertEqual(self.calls(), before + 3)
+
+    @override_settings(DJANGO_TWILIO_TWIML_CACHE_SIZE=0)
+    def test_disabled(self):
+        self.assertIsNone(twiml.get_response_cache())
+        before = self.calls()
+        cached_view(self.factory.post(self.uri), text='hi')
+        cached_view(self.factory.post(self.uri), text='hi')
+        self.assertEqual(self.calls(), before + 3)
+
+    def test_builtin_views_are_cached(self):
+        say(self.factory.post(self.uri), text='cached')
+        self.assertEqual(len(twiml.get_response_cache()), 1)